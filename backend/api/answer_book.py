@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Risposte FAQ pre-generate per Villa Celi
+Le domande non riconosciute che si ripetono (parcheggio, animali, orari di
+check-in, navetta per la spiaggia...) vengono estratte dai log, raggruppate
+per testo normalizzato e risposte una volta sola off-line: il file JSON
+pubblicato viene consultato prima di chiamare Ollama
+
+Uso (da backend/api):
+    python answer_book.py /app/logs/paguro.log --top 50 --output /app/cache/answer_book.json
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Riga scritta da analyze_message per ogni messaggio finito a Ollama
+UNKNOWN_LINE = re.compile(r"Messaggio non riconosciuto: '(.*)'\s*$")
+
+
+def parse_unknown_questions(lines):
+    """Domande degli ospiti dalle righe di log 'Messaggio non riconosciuto'"""
+    for line in lines:
+        match = UNKNOWN_LINE.search(line)
+        if match and match.group(1).strip():
+            yield match.group(1).strip()
+
+
+def cluster_questions(questions, normalize, min_count=2):
+    """
+    Gruppi di domande con lo stesso testo normalizzato, dal più frequente:
+    lista di (chiave, domanda più scritta nel gruppo, occorrenze)
+    """
+    groups = defaultdict(Counter)
+    for question in questions:
+        key = normalize(question)
+        if key:
+            groups[key][question] += 1
+    clusters = [
+        (key, variants.most_common(1)[0][0], sum(variants.values()))
+        for key, variants in groups.items()
+    ]
+    clusters = [cluster for cluster in clusters if cluster[2] >= min_count]
+    clusters.sort(key=lambda cluster: (-cluster[2], cluster[0]))
+    return clusters
+
+
+def build_answer_book(clusters, answer):
+    """Voci del file: answer(domanda) -> (testo già post-processato, tipo) oppure None se fallita"""
+    entries = {}
+    for key, question, count in clusters:
+        result = answer(question)
+        if result is None:
+            logger.warning(f"⚠️ Nessuna risposta per '{question}', esclusa")
+            continue
+        text, response_type = result
+        entries[key] = {"question": question, "answer": text, "type": response_type, "count": count}
+    return entries
+
+
+def publish_answer_book(entries, path):
+    """Scrittura atomica: il server non legge mai un file a metà"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {"generated": datetime.now().isoformat(timespec='seconds'), "entries": entries}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    logger.info(f"📚 Answer book pubblicato: {path} ({len(entries)} risposte)")
+
+
+class AnswerBook:
+    """Risposte pubblicate, ricaricate quando il file cambia (controllo ogni reload_interval secondi)"""
+
+    def __init__(self, path, reload_interval=60, clock=time.monotonic):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._clock = clock
+        self._entries = {}
+        self._mtime = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def _refresh(self):
+        now = self._clock()
+        if self._checked_at is not None and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._entries, self._mtime = {}, None  # file non ancora pubblicato
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._entries = json.load(f).get("entries", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Answer book illeggibile, lo ignoro: {e}")
+            self._entries = {}
+        self._mtime = mtime
+        self._stats["reloads"] += 1
+        logger.info(f"📚 Answer book caricato: {len(self._entries)} risposte")
+
+    def lookup(self, key):
+        """Voce pubblicata per la chiave normalizzata, None se assente"""
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(key)
+            self._stats["hits" if entry else "misses"] += 1
+            return entry
+
+    def stats(self):
+        """Contatori per il monitoraggio"""
+        with self._lock:
+            return dict(self._stats, path=self.path, size=len(self._entries))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-genera le risposte alle domande non riconosciute più frequenti")
+    parser.add_argument('logs', nargs='+', help="file di log del backend (LOG_FILE)")
+    parser.add_argument('--top', type=int, default=50, help="numero di gruppi di domande da rispondere")
+    parser.add_argument('--min-count', type=int, default=2, help="occorrenze minime di una domanda")
+    parser.add_argument('--output', help="file pubblicato (default: ANSWER_BOOK_PATH)")
+    args = parser.parse_args(argv)
+
+    # Stesso prompt, post-processing e normalizzazione del server
+    import main as paguro
+
+    questions = []
+    for log_path in args.logs:
+        with open(log_path, encoding='utf-8', errors='replace') as f:
+            questions.extend(parse_unknown_questions(f))
+    clusters = cluster_questions(questions, paguro.normalize_key, args.min_count)[:args.top]
+    logger.info(f"🔎 {len(questions)} domande non riconosciute, {len(clusters)} gruppi da rispondere")
+
+    def answer(question):
+        text = paguro.generate_ollama_response(paguro.build_context_prompt(question))
+        if not text:
+            return None
+        response_type = paguro.classify_response_type(question)
+        return paguro.post_process_response(text, response_type), response_type
+
+    publish_answer_book(build_answer_book(clusters, answer), args.output or paguro.Config.ANSWER_BOOK_PATH)
+
+
+if __name__ == '__main__':
+    main()
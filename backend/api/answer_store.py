@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Cache persistente delle risposte Ollama per Villa Celi
+File SQLite nel volume /app/cache: le risposte sopravvivono ai riavvii.
+Aperto solo al primo utilizzo, con limite di voci, TTL e compattazione
+(VACUUM completo solo nella manutenzione all'avvio, mai dentro una richiesta)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Pagine liberate per compattazione: la put() che la esegue resta veloce
+INCREMENTAL_VACUUM_PAGES = 256
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS risposte (
+    chiave TEXT PRIMARY KEY,
+    risposta TEXT NOT NULL,
+    creata REAL NOT NULL,
+    usata REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_risposte_usata ON risposte (usata);
+'''
+
+
+class PersistentAnswerCache:
+    """Risposte su disco: LRU per data di ultimo utilizzo, scadenza per data di creazione"""
+
+    def __init__(self, path, maxsize=5000, ttl=30 * 24 * 3600, compact_every=200, clock=time.time):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl  # secondi, None = nessuna scadenza
+        self.compact_every = compact_every  # compattazione ogni N inserimenti
+        self._clock = clock
+        self._conn = None
+        self._lock = threading.Lock()
+        self._puts_since_compaction = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "removed": 0, "errors": 0}
+
+    def _connection(self):
+        """Apertura lazy: niente I/O su disco finché non serve una risposta"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            # Prima di journal_mode: vale solo per i file nuovi, gli altri la adottano con vacuum()
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            count = conn.execute("SELECT COUNT(*) FROM risposte").fetchone()[0]
+            logger.info(f"💾 Cache risposte persistente aperta: {self.path} ({count} risposte)")
+            self._compact_locked()
+        return self._conn
+
+    def get(self, key):
+        """Risposta salvata per la chiave, None se assente, scaduta o in caso di errore"""
+        now = self._clock()
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute("SELECT risposta, creata FROM risposte WHERE chiave = ?", (key,)).fetchone()
+                if row is None or (self.ttl is not None and row[1] + self.ttl <= now):
+                    self._stats["misses"] += 1
+                    return None
+                conn.execute("UPDATE risposte SET usata = ? WHERE chiave = ?", (now, key))
+                self._stats["hits"] += 1
+                return row[0]
+            except (sqlite3.Error, OSError) as e:
+                self._stats["errors"] += 1
+                logger.warning(f"⚠️ Lettura cache risposte fallita: {e}")
+                return None
+
+    def put(self, key, answer):
+        """Salva (o rinnova) una risposta; ogni compact_every inserimenti compatta il file"""
+        now = self._clock()
+        with self._lock:
+            try:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO risposte (chiave, risposta, creata, usata) VALUES (?, ?, ?, ?)",
+                    (key, answer, now, now)
+                )
+                self._stats["writes"] += 1
+                self._puts_since_compaction += 1
+                if self._puts_since_compaction >= self.compact_every:
+                    self._compact_locked()
+            except (sqlite3.Error, OSError) as e:
+                self._stats["errors"] += 1
+                logger.warning(f"⚠️ Scrittura cache risposte fallita: {e}")
+
+    def compact(self):
+        """Elimina le risposte scadute e quelle oltre maxsize (meno usate di recente)"""
+        with self._lock:
+            self._connection()
+            return self._compact_locked()
+
+    def _compact_locked(self):
+        conn = self._conn
+        removed = 0
+        if self.ttl is not None:
+            removed += conn.execute("DELETE FROM risposte WHERE creata <= ?", (self._clock() - self.ttl,)).rowcount
+        removed += conn.execute('''
+            DELETE FROM risposte WHERE chiave IN (
+                SELECT chiave FROM risposte ORDER BY usata DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.maxsize,)).rowcount
+        if removed:
+            # Restituisce al filesystem un numero limitato di pagine libere, senza riscrivere il file
+            conn.execute(f"PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES})").fetchall()
+            logger.info(f"🧹 Cache risposte compattata: rimosse {removed} risposte")
+        self._puts_since_compaction = 0
+        self._stats["removed"] += removed
+        return removed
+
+    def vacuum(self):
+        """
+        Manutenzione (avvio o cron): compatta, riscrive il file con auto_vacuum
+        incrementale e svuota il WAL. Blocca la cache per tutta la durata
+        """
+        with self._lock:
+            try:
+                conn = self._connection()
+                removed = self._compact_locked()
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            except (sqlite3.Error, OSError) as e:
+                # Es. un altro worker sta già eseguendo il VACUUM: la cache resta utilizzabile
+                self._stats["errors"] += 1
+                logger.warning(f"⚠️ Manutenzione cache risposte fallita: {e}")
+                return 0
+            logger.info(f"🧹 Cache risposte: VACUUM completato ({os.path.getsize(self.path)} byte)")
+            return removed
+
+    def clear(self):
+        """Svuota la cache (es. dopo un cambio di prompt)"""
+        with self._lock:
+            self._connection().execute("DELETE FROM risposte")
+
+    def stats(self):
+        """Contatori per il monitoraggio (non apre il file se non è ancora stato usato)"""
+        with self._lock:
+            stats = dict(self._stats, path=self.path, maxsize=self.maxsize, ttl=self.ttl)
+            if self._conn is not None:
+                stats["size"] = self._conn.execute("SELECT COUNT(*) FROM risposte").fetchone()[0]
+            return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Registro nomi appartamenti per Villa Celi
+Nomi caricati una volta dal DB e compilati in un'unica alternanza regex:
+l'appartamento citato nel messaggio si trova con una sola passata.
+Per i nomi scritti male ("coralo") un BK-tree sulla distanza di Levenshtein
+limita i confronti a pochi nomi anche con un catalogo grande
+"""
+
+import logging
+import re
+import threading
+
+try:
+    from Levenshtein import distance as edit_distance
+except ImportError:
+    def edit_distance(a, b):
+        """Distanza di Levenshtein (fallback senza python-Levenshtein)"""
+        previous = list(range(len(b) + 1))
+        for i, char_a in enumerate(a, 1):
+            current = [i]
+            for j, char_b in enumerate(b, 1):
+                current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+            previous = current
+        return previous[-1]
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+
+
+def similarity(a, b):
+    """1 - distanza / lunghezza maggiore: 1.0 = identici"""
+    longest = max(len(a), len(b))
+    return 1.0 - edit_distance(a, b) / longest if longest else 1.0
+
+
+class BKTree:
+    """Albero BK: la disuguaglianza triangolare scarta i sottoalberi troppo distanti"""
+
+    def __init__(self, words=()):
+        self._root = None  # (parola, {distanza: nodo figlio})
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self._root is None:
+            self._root = (word, {})
+            self.size = 1
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, word, radius):
+        """Parole entro distanza radius: lista di (distanza, parola)"""
+        if self._root is None:
+            return []
+        found, stack = [], [self._root]
+        while stack:
+            candidate, children = stack.pop()
+            distance = edit_distance(word, candidate)
+            if distance <= radius:
+                found.append((distance, candidate))
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class ApartmentRegistry:
+    """Nomi appartamenti in cache, ricaricati solo quando la firma del DB cambia"""
+
+    def __init__(self, load_names, signature, fuzzy_threshold=0.8, fuzzy_min_length=4):
+        self._load_names = load_names  # callable -> lista nomi dal DB
+        self._signature_func = signature  # callable -> firma dei dati
+        self.fuzzy_threshold = fuzzy_threshold  # similarità minima per un nome scritto male
+        self.fuzzy_min_length = fuzzy_min_length  # parole più corte non vengono corrette
+        # (firma, nome minuscolo -> nome nel DB, pattern compilato, BK-tree, parole per nome al massimo)
+        self._state = (None, {}, None, BKTree(), 0)
+        self._lock = threading.Lock()
+
+    def _ensure_fresh(self):
+        signature = self._signature_func()
+        if signature is not None and signature == self._state[0]:
+            return self._state
+        with self._lock:
+            if signature is not None and signature == self._state[0]:
+                return self._state
+            names = {name.lower(): name for name in sorted(self._load_names()) if name}
+            # Nomi più lunghi prima: "corallo blu" vince su "corallo"
+            alternation = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+            pattern = re.compile(r'\b(?:' + alternation + r')\b') if names else None
+            max_words = max((len(name.split()) for name in names), default=0)
+            self._state = (signature, names, pattern, BKTree(names), max_words)
+            logger.info(f"🏠 Registro appartamenti caricato: {len(names)} nomi")
+            return self._state
+
+    def names(self):
+        """Nomi appartamenti (minuscoli, ordine alfabetico)"""
+        return sorted(self._ensure_fresh()[1])
+
+    def canonical(self, name_lower):
+        """Nome esatto nel DB (es. 'Corallo Blu') per un nome minuscolo, None se sconosciuto"""
+        return self._ensure_fresh()[1].get(name_lower)
+
+    def find(self, message_lower):
+        """Primo appartamento citato nel messaggio (minuscolo), None se assente"""
+        pattern = self._ensure_fresh()[2]
+        if pattern is None:
+            return None
+        match = pattern.search(message_lower)
+        return match.group(0) if match else None
+
+    def find_fuzzy(self, message_lower):
+        """
+        Come find, ma tollera errori di battitura: se nessun nome compare esatto,
+        il nome più simile (>= fuzzy_threshold) a una sequenza di parole del messaggio
+        """
+        exact = self.find(message_lower)
+        if exact:
+            return exact
+        _, _, _, tree, max_words = self._ensure_fresh()
+        words = _WORD.findall(message_lower)
+        best = None
+        for size in range(1, max_words + 1):
+            for start in range(len(words) - size + 1):
+                window = ' '.join(words[start:start + size])
+                if len(window) < self.fuzzy_min_length:
+                    continue
+                # sim >= t implica distanza <= (1 - t) / t × lunghezza della finestra
+                radius = int((1 - self.fuzzy_threshold) * len(window) / self.fuzzy_threshold)
+                for _, name in tree.search(window, radius):
+                    score = similarity(window, name)
+                    if score >= self.fuzzy_threshold and (best is None or score > best[0]):
+                        best = (score, name)
+        if best:
+            logger.info(f"🏠 Appartamento riconosciuto per somiglianza: {best[1]} ({best[0]:.2f})")
+            return best[1]
+        return None
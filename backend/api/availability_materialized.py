@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Settimane libere materializzate per Villa Celi
+La tabella settimane_libere è mantenuta dai trigger su appartamenti (vedi
+migrations.py): la ricerca disponibilità diventa una lettura su indice.
+L'orizzonte di calendario_sabati viene esteso all'avvio (extend_calendar)
+"""
+
+import json
+import logging
+import threading
+from datetime import date, datetime, timedelta
+
+from availability_sql import FREE_WEEKS_QUERY, SqlAvailabilityEngine
+
+logger = logging.getLogger(__name__)
+
+HORIZON_YEARS = 3  # anni di sabati materializzati oltre la data odierna
+
+LOOKUP_ALL_QUERY = """
+SELECT appartamento, week_start, week_end FROM settimane_libere
+WHERE week_start BETWEEN ? AND ?
+ORDER BY appartamento, week_start;
+"""
+
+LOOKUP_APARTMENTS_QUERY = """
+SELECT appartamento, week_start, week_end FROM settimane_libere
+WHERE appartamento IN (SELECT value FROM json_each(?)) AND week_start BETWEEN ? AND ?
+ORDER BY appartamento, week_start;
+"""
+
+
+# Query calde della disponibilità (controllate con migrations.full_table_scans)
+HOT_QUERIES = {
+    "settimane_libere_sql": (FREE_WEEKS_QUERY, {'start': '2025-07-01', 'end': '2025-07-31', 'apartments': None}),
+    "settimane_libere_tutte": (LOOKUP_ALL_QUERY, ('2025-06-28', '2025-07-31')),
+    "settimane_libere_appartamento": (LOOKUP_APARTMENTS_QUERY, ('["Corallo"]', '2025-06-28', '2025-07-31')),
+}
+
+
+SATURDAY = 5
+
+
+def _first_saturday(start_date):
+    return start_date - timedelta(days=(start_date.weekday() - SATURDAY) % 7)
+
+
+def week_starts(start_date, end_date):
+    """Sabati di inizio settimana: dal sabato precedente (o uguale) a start_date fino a end_date"""
+    current_saturday = _first_saturday(start_date)
+    saturdays = []
+    while current_saturday <= end_date:
+        saturdays.append(current_saturday)
+        current_saturday += timedelta(days=7)
+    return saturdays
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def calendar_horizon(conn):
+    """(primo, ultimo) sabato di calendario_sabati, None se il calendario è vuoto"""
+    first, last = conn.execute("SELECT MIN(week_start), MAX(week_start) FROM calendario_sabati;").fetchone()
+    if first is None:
+        return None
+    return _parse_date(first), _parse_date(last)
+
+
+def extend_calendar(conn, today=None, years=HORIZON_YEARS):
+    """
+    Manutenzione all'avvio: aggiunge i sabati fino a today + years anni e le
+    relative settimane libere (connessione in autocommit). Settimane aggiunte
+    """
+    today = today or date.today()
+    target = _first_saturday(today.replace(year=today.year + years, day=1)) + timedelta(days=7)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        horizon = calendar_horizon(conn)
+        start = horizon[1] + timedelta(days=7) if horizon else _first_saturday(today)
+        if start > target:
+            conn.execute("COMMIT")
+            return 0
+        saturdays = []
+        while start <= target:
+            saturdays.append((start.isoformat(), (start + timedelta(days=7)).isoformat()))
+            start += timedelta(days=7)
+        conn.executemany("INSERT OR IGNORE INTO calendario_sabati (week_start, week_end) VALUES (?, ?);", saturdays)
+        conn.executemany(
+            "INSERT OR IGNORE INTO settimane_libere (appartamento, week_start, week_end) VALUES (?, ?, ?);",
+            conn.execute(FREE_WEEKS_QUERY, {'start': saturdays[0][0], 'end': saturdays[-1][0], 'apartments': None}).fetchall()
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    logger.info(f"📆 calendario_sabati esteso fino al {saturdays[-1][0]} (+{len(saturdays)} settimane)")
+    return len(saturdays)
+
+
+class MaterializedAvailabilityEngine:
+    """Lettura su settimane_libere; fuori dall'orizzonte del calendario ricalcola in SQL"""
+
+    def __init__(self):
+        self._connection_factory = None
+        self._fallback = SqlAvailabilityEngine()
+        self._horizon = None  # (primo, ultimo sabato) letti da calendario_sabati
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self, signature, connection_factory):
+        """Nessuna struttura da ricostruire (ci pensano i trigger): rilegge solo l'orizzonte"""
+        self._connection_factory = connection_factory
+        self._fallback.ensure_fresh(signature, connection_factory)
+        if signature is not None and signature == self._signature and self._horizon is not None:
+            return False
+        with self._lock:
+            conn = connection_factory()
+            try:
+                self._horizon = calendar_horizon(conn)
+            finally:
+                conn.close()
+            self._signature = signature
+        return False
+
+    def apartments(self):
+        """Appartamenti presenti nel DB, in ordine alfabetico"""
+        return self._fallback.apartments()
+
+    def free_weeks(self, start_date, end_date, apartments=None):
+        """Settimane sabato-sabato libere come tuple (appartamento, inizio, fine)"""
+        first = _first_saturday(start_date)
+        horizon = self._horizon
+        if horizon is None or first < horizon[0] or end_date > horizon[1]:
+            logger.info(f"📆 Periodo {start_date} - {end_date} fuori orizzonte, ricalcolo in SQL")
+            return self._fallback.free_weeks(start_date, end_date, apartments)
+
+        conn = self._connection_factory()
+        try:
+            if apartments is None:
+                rows = conn.execute(LOOKUP_ALL_QUERY, (first.isoformat(), end_date.isoformat())).fetchall()
+            else:
+                rows = conn.execute(LOOKUP_APARTMENTS_QUERY, (
+                    json.dumps(list(apartments)), first.isoformat(), end_date.isoformat()
+                )).fetchall()
+        finally:
+            conn.close()
+
+        return [(apt_name, _parse_date(week_start), _parse_date(week_end)) for apt_name, week_start, week_end in rows]
+
+
+def _expected_free_weeks(conn):
+    """Ricalcolo completo delle settimane libere sull'orizzonte del calendario"""
+    horizon = calendar_horizon(conn)
+    if horizon is None:
+        return []
+    return conn.execute(FREE_WEEKS_QUERY, {
+        'start': horizon[0].isoformat(),
+        'end': horizon[1].isoformat(),
+        'apartments': None
+    }).fetchall()
+
+
+def check_consistency(conn):
+    """Confronta settimane_libere con un ricalcolo completo: (mancanti, in eccesso)"""
+    expected = set(_expected_free_weeks(conn))
+    actual = set(conn.execute("SELECT appartamento, week_start, week_end FROM settimane_libere;").fetchall())
+    missing, extra = sorted(expected - actual), sorted(actual - expected)
+    if missing or extra:
+        logger.warning(f"⚠️ settimane_libere incoerente: {len(missing)} mancanti, {len(extra)} in eccesso")
+    else:
+        logger.info(f"✅ settimane_libere coerente ({len(actual)} settimane)")
+    return missing, extra
+
+
+def rebuild_free_weeks(conn):
+    """Ricostruisce da zero settimane_libere (riparazione dopo un controllo fallito)"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM settimane_libere;")
+        conn.executemany(
+            "INSERT INTO settimane_libere (appartamento, week_start, week_end) VALUES (?, ?, ?);",
+            _expected_free_weeks(conn)
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    logger.info("🔧 settimane_libere ricostruita")
+
+
+def maintain_free_weeks(conn, today=None):
+    """Avvio: estende l'orizzonte e ricostruisce settimane_libere se non coerente con le prenotazioni"""
+    extend_calendar(conn, today)
+    missing, extra = check_consistency(conn)
+    if missing or extra:
+        rebuild_free_weeks(conn)
+        if check_consistency(conn) != ([], []):
+            raise RuntimeError("settimane_libere ancora incoerente dopo la ricostruzione")
+    return missing, extra
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Motore disponibilità set-based per Villa Celi
+Un'unica query SQL: i sabati candidati arrivano da una CTE ricorsiva e le
+settimane occupate vengono escluse con un anti-join sulle prenotazioni
+"""
+
+import json
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+FREE_WEEKS_QUERY = """
+WITH RECURSIVE
+    settimane(week_start) AS (
+        -- Sabato precedente (o uguale) alla data di inizio
+        SELECT date(:start, '-' || ((CAST(strftime('%w', :start) AS INTEGER) + 1) % 7) || ' days')
+        UNION ALL
+        SELECT date(week_start, '+7 days') FROM settimane
+        WHERE date(week_start, '+7 days') <= :end
+    ),
+    unita(appartamento) AS (
+        SELECT DISTINCT appartamento FROM appartamenti WHERE :apartments IS NULL
+        UNION ALL
+        SELECT value FROM json_each(:apartments)
+    )
+SELECT u.appartamento, s.week_start, date(s.week_start, '+7 days') AS week_end
+FROM unita u
+CROSS JOIN settimane s
+WHERE NOT EXISTS (
+    SELECT 1 FROM appartamenti
+    WHERE appartamenti.appartamento = u.appartamento
+      AND appartamenti.check_in < date(s.week_start, '+7 days')
+      AND appartamenti.check_out > s.week_start
+      AND appartamenti.check_out > appartamenti.check_in
+)
+ORDER BY u.appartamento, s.week_start;
+"""
+
+
+class SqlAvailabilityEngine:
+    """Settimane libere calcolate interamente da SQLite, senza stato in memoria"""
+
+    def __init__(self):
+        self._connection_factory = None
+
+    def ensure_fresh(self, signature, connection_factory):
+        """Nessuna struttura da ricostruire: memorizza solo come aprire la connessione"""
+        self._connection_factory = connection_factory
+        return False
+
+    def apartments(self):
+        """Appartamenti presenti nel DB, in ordine alfabetico"""
+        conn = self._connection_factory()
+        try:
+            cursor = conn.execute("SELECT DISTINCT appartamento FROM appartamenti ORDER BY appartamento;")
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def free_weeks(self, start_date, end_date, apartments=None):
+        """Settimane sabato-sabato libere come tuple (appartamento, inizio, fine)"""
+        params = {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'apartments': json.dumps(list(apartments)) if apartments is not None else None
+        }
+        conn = self._connection_factory()
+        try:
+            rows = conn.execute(FREE_WEEKS_QUERY, params).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            (apt_name,
+             datetime.strptime(week_start, '%Y-%m-%d').date(),
+             datetime.strptime(week_end, '%Y-%m-%d').date())
+            for apt_name, week_start, week_end in rows
+        ]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Cache in memoria per Villa Celi
+Cache LRU thread-safe con limite di dimensione, scadenza (TTL) opzionale,
+contatori hit/miss/evictions e chiavi normalizzate per i messaggi degli ospiti
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_MISSING = object()
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_key(text):
+    """Messaggio normalizzato: minuscolo, senza accenti, punteggiatura e spazi doppi"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    without_accents = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub(' ', without_accents).strip()
+
+
+class LRUCache:
+    """Cache LRU: oltre maxsize elimina la voce usata meno di recente; con ttl le voci scadono"""
+
+    def __init__(self, maxsize=128, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl  # secondi, None = nessuna scadenza
+        self._clock = clock
+        self._data = OrderedDict()  # chiave -> (valore, scadenza)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, expires_at):
+        return expires_at is not None and expires_at <= self._clock()
+
+    def get(self, key, default=None):
+        """Valore in cache (marcato come usato di recente), default se assente o scaduto"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and self._expired(entry[1]):
+                del self._data[key]
+                self.expirations += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Inserisce o aggiorna una voce, eliminando le meno recenti se serve"""
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Rimuove una voce e ne restituisce il valore"""
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def purge_expired(self):
+        """Elimina le voci scadute, restituisce quante"""
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items() if self._expired(expires_at)]
+            for key in expired:
+                del self._data[key]
+            self.expirations += len(expired)
+            return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and not self._expired(entry[1])
+
+    def stats(self):
+        """Contatori per il monitoraggio"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
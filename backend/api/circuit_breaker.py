@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Circuit breaker per le chiamate Ollama di Villa Celi
+Chiuso -> aperto quando, nelle ultime chiamate, errori e chiamate lente superano
+la soglia; dopo un periodo di pausa una sola chiamata di prova (semiaperto)
+decide se richiudere. Il timeout si adatta al p95 delle latenze osservate
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    """Breaker a finestra mobile: errori + chiamate lente su un numero fisso di chiamate recenti"""
+
+    def __init__(self, window=20, min_calls=5, failure_rate=0.5, slow_call_ms=8000,
+                 open_seconds=30, min_timeout=3.0, max_timeout=10.0, timeout_factor=2.0,
+                 clock=time.monotonic):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate  # quota di chiamate fallite o lente che apre il circuito
+        self.slow_call_ms = slow_call_ms
+        self.open_seconds = open_seconds
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor  # margine sul p95
+        self._clock = clock
+        self._calls = deque(maxlen=window)  # (riuscita, latenza ms)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._stats = {"rejected": 0, "opened": 0}
+
+    def allow(self):
+        """True se la chiamata può partire; False = usa subito il fallback"""
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True  # una sola chiamata di prova alla volta
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self, latency_ms):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._close()
+            self._calls.append((True, latency_ms))
+            self._evaluate()
+
+    def record_failure(self, latency_ms=None):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._calls.append((False, latency_ms))
+            self._evaluate()
+
+    def cancel(self):
+        """La chiamata autorizzata da allow() non è partita: libera la prova del semiaperto"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _evaluate(self):
+        if self._state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        bad = sum(1 for ok, latency in self._calls if not ok or (latency or 0) > self.slow_call_ms)
+        if bad / len(self._calls) >= self.failure_rate:
+            self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        self._stats["opened"] += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._calls.clear()
+        self._probe_in_flight = False
+
+    def _p95(self):
+        latencies = sorted(latency for ok, latency in self._calls if ok and latency is not None)
+        if len(latencies) < self.min_calls:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def timeout(self):
+        """Timeout di lettura (s): p95 delle latenze riuscite × margine, entro [min, max]"""
+        with self._lock:
+            p95 = self._p95()
+        if p95 is None:
+            return self.max_timeout
+        return round(min(self.max_timeout, max(self.min_timeout, p95 / 1000 * self.timeout_factor)), 2)
+
+    def state(self):
+        """Stato per il monitoraggio"""
+        with self._lock:
+            calls = len(self._calls)
+            failures = sum(1 for ok, _ in self._calls if not ok)
+            p95 = self._p95()
+            state = self._state
+            if state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                state = HALF_OPEN
+            snapshot = dict(
+                self._stats,
+                state=state,
+                window_calls=calls,
+                error_rate=round(failures / calls, 3) if calls else 0.0,
+                p95_ms=round(p95, 1) if p95 is not None else None,
+            )
+        snapshot["timeout_s"] = self.timeout()
+        return snapshot
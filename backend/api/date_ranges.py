@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Riconoscimento periodi di disponibilità per Villa Celi
+Trasforma richieste come "luglio e agosto", "dal 10 luglio al 20 agosto"
+o "estate 2026" in intervalli di date da cercare in un'unica passata
+"""
+
+import calendar
+import re
+from datetime import date
+
+# Stagioni: (mese iniziale, mese finale); se il finale è minore la stagione scavalca l'anno
+SEASONS = {
+    'primavera': (3, 5),
+    'estate': (6, 9),
+    'autunno': (9, 11),
+    'inverno': (12, 2),
+}
+
+YEAR_PATTERN = re.compile(r'202[4-9]|20[3-9]\d')
+
+
+def _month_end(year, month):
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _safe_date(year, month, day):
+    """Data valida, limitando il giorno alla fine del mese (es. 31 febbraio)"""
+    return date(year, month, max(1, min(day, calendar.monthrange(year, month)[1])))
+
+
+def _infer_year(month, explicit_year, today):
+    """Anno esplicito o, se assente, il prossimo in cui il mese non è ancora passato"""
+    if explicit_year:
+        return explicit_year
+    return today.year + 1 if month < today.month else today.year
+
+
+def merge_ranges(ranges):
+    """Ordina e unisce intervalli (inizio, fine) sovrapposti o contigui"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start.toordinal() <= merged[-1][1].toordinal() + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PeriodParser:
+    """Estrae dal messaggio uno o più periodi (date range, stagione, più mesi)"""
+
+    def __init__(self, month_map):
+        self.month_map = month_map
+        months = '|'.join(sorted(month_map, key=len, reverse=True))
+        self.date_range = re.compile(
+            r'\bdal\s+(\d{1,2})(?:\s+(' + months + r'))?(?:\s+(\d{4}))?\s+(?:al|fino al)\s+'
+            r'(\d{1,2})\s+(' + months + r')(?:\s+(\d{4}))?'
+        )
+        self.month_range = re.compile(r'\bda\s+(' + months + r')\s+a\s+(' + months + r')\b')
+        self.season = re.compile(r'\b(' + '|'.join(SEASONS) + r')\b')
+        self.month = re.compile(r'(' + months + r')(?:\s+(\d{4}))?')
+
+    def has_date_range(self, message_lower):
+        """True se il messaggio contiene un intervallo esplicito 'dal ... al ...'"""
+        return self.date_range.search(message_lower) is not None
+
+    def parse(self, message_lower, today=None):
+        """Lista di intervalli (inizio, fine) ordinati, None se c'è al massimo un mese singolo"""
+        today = today or date.today()
+        year_match = YEAR_PATTERN.search(message_lower)
+        explicit_year = int(year_match.group(0)) if year_match else None
+
+        match = self.date_range.search(message_lower)
+        if match:
+            start_day, start_month_name, start_year, end_day, end_month_name, end_year = match.groups()
+            end_month = self.month_map[end_month_name]
+            start_month = self.month_map[start_month_name] if start_month_name else end_month
+            end_year = int(end_year) if end_year else None
+            start_year = int(start_year) if start_year else None
+            if start_year:
+                year = start_year
+            elif end_year:
+                # Anno scritto solo alla fine: se l'intervallo scavalca l'anno l'inizio è nel precedente
+                year = end_year - 1 if end_month < start_month else end_year
+            else:
+                year = _infer_year(start_month, explicit_year, today)
+            start = _safe_date(year, start_month, int(start_day))
+            end_year = end_year or (year + 1 if end_month < start_month else year)
+            end = _safe_date(end_year, end_month, int(end_day))
+            return [(start, end)] if start <= end else None
+
+        match = self.month_range.search(message_lower)
+        if match:
+            start_month, end_month = self.month_map[match.group(1)], self.month_map[match.group(2)]
+            year = _infer_year(start_month, explicit_year, today)
+            end_year = year + 1 if end_month < start_month else year
+            return [(date(year, start_month, 1), _month_end(end_year, end_month))]
+
+        match = self.season.search(message_lower)
+        if match:
+            start_month, end_month = SEASONS[match.group(1)]
+            if end_month < start_month:
+                # Inverno: l'anno esplicito è quello di dicembre; senza anno quello in corso o il prossimo
+                year = explicit_year or (today.year - 1 if today.month <= end_month else today.year)
+                return [(date(year, start_month, 1), _month_end(year + 1, end_month))]
+            year = explicit_year or (today.year + 1 if end_month < today.month else today.year)
+            return [(date(year, start_month, 1), _month_end(year, end_month))]
+
+        months = []
+        for month_name, month_year in self.month.findall(message_lower):
+            month = (self.month_map[month_name], int(month_year) if month_year else None)
+            if month not in months:
+                months.append(month)
+        if len(months) < 2:
+            return None
+
+        # Ogni mese ha il suo anno; senza anno vale quello scritto dopo ("giugno o settembre 2027"),
+        # altrimenti quello del mese precedente ("luglio 2027 e agosto")
+        years = [month_year for _, month_year in months]
+        for i in range(len(years) - 2, -1, -1):
+            years[i] = years[i] or years[i + 1]
+        for i in range(1, len(years)):
+            years[i] = years[i] or years[i - 1]
+
+        ranges = []
+        for (month, _), month_year in zip(months, years):
+            year = _infer_year(month, month_year or explicit_year, today)
+            ranges.append((date(year, month, 1), _month_end(year, month)))
+        return merge_ranges(ranges)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Pool di connessioni SQLite per Villa Celi
+Connessioni long-lived riutilizzate per thread: PRAGMA impostati una sola volta,
+cache degli statement preparati e health check. Ogni greenlet (o thread) ha in
+prestito una connessione sua fino a close(), che la rimette tra quelle libere del
+thread: il rollback di una richiesta non tocca mai la transazione di un'altra.
+Con read_only=True apre il DB come URI mode=ro + query_only (percorso di lettura)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+try:
+    # threading.local originale: dopo monkey.patch_all() sarebbe locale alla greenlet
+    # e le connessioni libere non verrebbero riutilizzate tra una richiesta e l'altra
+    from gevent import getcurrent as _current_owner
+    from gevent import monkey
+    _thread_local = monkey.get_original('threading', 'local')
+except ImportError:
+    _current_owner = threading.current_thread
+    _thread_local = threading.local
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connessione del pool: close() la restituisce al pool invece di chiuderla"""
+
+    _pool = None  # weakref al ConnectionPool proprietario
+    _file_id = None
+    _checked_at = 0.0
+
+    def close(self):
+        # Nessuna transazione lasciata aperta tra un utilizzo e il successivo
+        if self.in_transaction:
+            self.rollback()
+        pool = self._pool() if self._pool is not None else None
+        if pool is not None:
+            pool._release(self)
+
+    def really_close(self):
+        """Chiude davvero la connessione (usato dal pool)"""
+        super().close()
+
+
+class ConnectionPool:
+    """Connessioni SQLite per thread, riaperte solo se l'health check fallisce"""
+
+    def __init__(self, db_path, pragmas=(), row_factory=None, isolation_level=None,
+                 cached_statements=256, health_check_interval=30.0, read_only=False, max_idle=4):
+        self.db_path = db_path
+        self.read_only = read_only
+        # Sola lettura: nessun lock di scrittura possibile, nemmeno per errore
+        self.pragmas = (("PRAGMA query_only = ON",) if read_only else ()) + tuple(pragmas)
+        self.row_factory = row_factory
+        self.isolation_level = isolation_level
+        self.cached_statements = cached_statements
+        self.health_check_interval = health_check_interval
+        self.max_idle = max_idle  # connessioni libere tenute aperte per thread
+        self._local = _thread_local()
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "reopened": 0, "checkouts": 0, "health_checks": 0}
+
+    def _thread_state(self):
+        """(connessioni libere, prestiti greenlet -> connessione) del thread corrente"""
+        local = self._local
+        if not hasattr(local, 'idle'):
+            local.idle = []
+            local.leases = weakref.WeakKeyDictionary()
+        return local.idle, local.leases
+
+    def _database(self):
+        """Percorso del DB o URI read-only (il file deve già esistere)"""
+        if not self.read_only:
+            return self.db_path
+        return f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+
+    def _file_id(self):
+        """Identità del file DB: cambia se il file viene sostituito"""
+        try:
+            st = os.stat(self.db_path)
+            return st.st_dev, st.st_ino
+        except OSError:
+            return None
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self._database(),
+            isolation_level=self.isolation_level,
+            cached_statements=self.cached_statements,
+            factory=PooledConnection,
+            uri=self.read_only
+        )
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        conn._pool = weakref.ref(self)
+        conn._file_id = self._file_id()
+        conn._checked_at = time.monotonic()
+        with self._lock:
+            self._connections.add(conn)
+            self._stats["opened"] += 1
+        mode = "sola lettura" if self.read_only else "lettura/scrittura"
+        logger.info(f"🗄️ Nuova connessione SQLite ({mode}) per thread {threading.current_thread().name}: {self.db_path}")
+        return conn
+
+    def _is_healthy(self, conn):
+        """SELECT 1 e verifica che il file DB sia ancora lo stesso"""
+        with self._lock:
+            self._stats["health_checks"] += 1
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Connessione SQLite non valida, la riapro: {e}")
+            return False
+        if self._file_id() != conn._file_id:
+            logger.warning(f"⚠️ File database sostituito, riapro la connessione: {self.db_path}")
+            return False
+        return True
+
+    def connection(self, file_id=None):
+        """Connessione in prestito alla greenlet (o al thread) corrente, aperta al primo utilizzo.
+        file_id: identità attesa del file DB; se la connessione è su un altro file si controlla subito"""
+        idle, leases = self._thread_state()
+        owner = _current_owner()
+        with self._lock:
+            self._stats["checkouts"] += 1
+        conn = leases.get(owner)
+        if conn is None and idle:
+            conn = idle.pop()
+        if conn is None:
+            conn = self._open()
+        elif (file_id is not None and file_id != conn._file_id) or \
+                time.monotonic() - conn._checked_at >= self.health_check_interval:
+            if not self._is_healthy(conn):
+                self._discard(conn)
+                with self._lock:
+                    self._stats["reopened"] += 1
+                conn = self._open()
+            else:
+                conn._checked_at = time.monotonic()
+        leases[owner] = conn
+        return conn
+
+    def _release(self, conn):
+        """Fine del prestito: la connessione torna tra quelle libere del thread"""
+        idle, leases = self._thread_state()
+        owner = _current_owner()
+        if leases.get(owner) is not conn:
+            return  # già restituita (close() chiamato più volte)
+        del leases[owner]
+        if len(idle) < self.max_idle:
+            idle.append(conn)
+        else:
+            self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.really_close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Chiude tutte le connessioni aperte (shutdown o test)"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections = weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.really_close()
+            except sqlite3.ProgrammingError:
+                # Connessione di un altro thread: verrà chiusa dal garbage collector
+                pass
+        self._local = _thread_local()
+
+    def stats(self):
+        """Contatori del pool per il monitoraggio"""
+        with self._lock:
+            return dict(self._stats, open_connections=len(self._connections), read_only=self.read_only)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Classificatore di intenti compilato per Villa Celi
+Tutte le parole chiave (risposte predefinite, disponibilità, mesi, 'test')
+sono riconosciute in una sola scansione del messaggio con l'automa di
+parole chiave; le regole di priorità di analyze_message restano identiche
+"""
+
+import logging
+import re
+from datetime import datetime
+
+from keyword_automaton import KeywordAutomaton
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_KEYWORDS = ('disponibilit', 'liber', 'case', 'libero', 'appartament', 'disponibil')
+GREETINGS = frozenset({'ciao', 'salve', 'buongiorno', 'buonasera', 'help', 'aiuto', 'inizia'})
+TEST_KEYWORD = 'test'
+YEAR_PATTERN = re.compile(r'202[4-9]|20[3-9]\d')
+NUMBER = re.compile(r'\d+')
+
+# Pattern di prenotazione nell'ordine di priorità: la prima alternativa il cui
+# lookahead trova corrispondenza vince, come con re.search pattern per pattern
+BOOKING_PATTERNS = (
+    r'voglio prenotare.*(\d+)', r'prenota.*(\d+)', r'scelgo.*(\d+)',
+    r'prendo.*(\d+)', r'numero.*(\d+)', r'la\s*(\d+)', r'il\s*(\d+)'
+)
+
+
+class IntentEngine:
+    """analyze_message in una passata: intento, mese, anno, appartamento e numero di prenotazione"""
+
+    def __init__(self, predefined_responses, priority_matches, month_map, period_parser,
+                 find_apartment, now=datetime.now, automaton=None):
+        self.month_map = month_map
+        self.period_parser = period_parser
+        self.find_apartment = find_apartment  # messaggio minuscolo -> nome appartamento o None
+        self._now = now
+
+        # Automa condiviso (o proprio): le categorie dell'analisi si aggiungono alle altre tabelle
+        self.automaton = automaton if automaton is not None else KeywordAutomaton()
+        # Precedenza delle risposte: prima le parole prioritarie (se la risposta esiste),
+        # poi le chiavi delle risposte stesse
+        predefined = {}
+        for keyword, response_key in priority_matches.items():
+            if response_key in predefined_responses:
+                predefined.setdefault(keyword, (response_key, predefined_responses[response_key]))
+        for key, response in predefined_responses.items():
+            predefined.setdefault(key, (key, response))
+        for rank, (keyword, match) in enumerate(predefined.items()):
+            self.automaton.add(keyword, 'predefined', priority=rank, value=match)
+        for rank, (month_name, month_num) in enumerate(month_map.items()):
+            self.automaton.add(month_name, 'month', priority=rank, value=month_num)
+        self.automaton.add_all(AVAILABILITY_KEYWORDS, 'availability')
+        self.automaton.add(TEST_KEYWORD, 'test')
+
+        self._booking = re.compile(
+            '|'.join(f'(?=(?s:.*?){pattern})' for pattern in BOOKING_PATTERNS)
+        )
+
+    def scan(self, message_lower):
+        """Tutte le parole chiave del messaggio, con categoria e priorità (una scansione)"""
+        return self.automaton.scan(message_lower)
+
+    def keywords(self, message_lower):
+        """Insieme dei testi delle parole chiave contenute nel messaggio"""
+        return self.scan(message_lower).keywords()
+
+    def predefined(self, matches):
+        """(chiave, risposta) predefinita con la precedenza più alta tra le parole trovate"""
+        best = matches.best('predefined')
+        return best.value if best else None
+
+    def booking_number(self, message_lower):
+        """Numero scelto dall'elenco disponibilità, None se il messaggio non è una prenotazione"""
+        if NUMBER.fullmatch(message_lower):
+            return int(message_lower)
+        match = self._booking.match(message_lower)
+        if match:
+            return int(next(group for group in match.groups() if group is not None))
+        return None
+
+    def first_number(self, message_lower):
+        """Primo numero del messaggio (es. 'opzione 3'), None se assente"""
+        match = NUMBER.search(message_lower)
+        return int(match.group(0)) if match else None
+
+    def availability(self, message):
+        """
+        Parametri di disponibilità per un messaggio già riconosciuto come tale
+        (es. dal modello di intenti): senza mese né appartamento si chiede il periodo
+        """
+        message_lower = message.lower().strip()
+        return self._availability_request(message_lower, self.scan(message_lower)) or (
+            'availability_request', {'month': None, 'year': None, 'apartment': None}
+        )
+
+    def month(self, matches):
+        """Primo mese di month_map citato nel messaggio"""
+        best = matches.best('month')
+        return best.value if best else None
+
+    def analyze(self, message):
+        """(tipo richiesta, parametro) con le stesse regole di priorità di analyze_message"""
+        message_lower = message.lower().strip()
+        matches = self.scan(message_lower)
+
+        # 0. Risposte predefinite
+        predefined = self.predefined(matches)
+        if predefined:
+            logger.info(f"✅ Risposta predefinita trovata: {predefined[0]}")
+            return 'predefined_response', predefined[1]
+
+        # 1. Prenotazione (solo se il messaggio contiene una cifra)
+        if any(char.isdigit() for char in message_lower):
+            choice_number = self.booking_number(message_lower)
+            if choice_number is not None:
+                logger.info(f"✅ Riconosciuta richiesta prenotazione: {choice_number}")
+                return 'booking_request', choice_number
+
+        # 2. Disponibilità
+        if 'availability' in matches or self.period_parser.has_date_range(message_lower):
+            result = self._availability_request(message_lower, matches)
+            if result:
+                return result
+
+        # 3. Saluti
+        if message_lower in GREETINGS:
+            logger.info(f"👋 Riconosciuto saluto: {message_lower}")
+            return 'greeting', None
+
+        # 4. Test
+        if 'test' in matches:
+            return 'test_request', None
+
+        return 'unknown', None
+
+    def _availability_request(self, message_lower, matches):
+        now = self._now()
+        detected_month = self.month(matches)
+        detected_year = None
+        year_match = YEAR_PATTERN.search(message_lower)
+        if year_match:
+            detected_year = int(year_match.group(0))
+        elif detected_month:
+            detected_year = now.year + 1 if detected_month < now.month else now.year
+
+        detected_apartment = None
+        try:
+            detected_apartment = self.find_apartment(message_lower)
+        except Exception as e:
+            logger.error(f"Errore recupero nomi appartamenti: {e}")
+
+        # Più mesi, intervallo di date o stagione: un'unica ricerca sull'intero periodo
+        periods = self.period_parser.parse(message_lower, today=now.date())
+        if periods:
+            return 'availability_range_request', {'ranges': periods, 'apartment': detected_apartment}
+        if detected_month and detected_year:
+            return 'availability_request', {
+                'month': detected_month,
+                'year': detected_year,
+                'apartment': detected_apartment
+            }
+        if detected_apartment and not detected_month:
+            return 'missing_info_availability', {'apartment': detected_apartment}
+        return None
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Modello di intenti locale per Villa Celi
+TF-IDF su n-grammi di caratteri + regressione logistica multinomiale in NumPy:
+le domande che sfuggono alle regole di analyze_message ("c'è posto a luglio?")
+vengono instradate senza passare da Ollama quando il modello è sicuro
+
+Uso (da backend/api):
+    python intent_model.py intent_examples.csv --output cache/intent_model.npz
+"""
+
+import csv
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+import zipfile
+from collections import Counter
+
+import numpy as np
+
+from cache import normalize_key
+
+logger = logging.getLogger(__name__)
+
+_DIGITS = re.compile(r'\d')
+
+
+def features(message, ngram_range=(2, 4)):
+    """n-grammi di caratteri (con spazi ai bordi delle parole) e parole intere; ogni cifra vale '0'"""
+    text = _DIGITS.sub('0', normalize_key(message))
+    padded = f" {text} "
+    grams = [
+        padded[i:i + n]
+        for n in range(ngram_range[0], ngram_range[1] + 1)
+        for i in range(len(padded) - n + 1)
+    ]
+    grams.extend(f"w:{word}" for word in text.split())
+    return grams
+
+
+def load_examples(path):
+    """(messaggi, etichette) da un CSV con colonne message,intent"""
+    messages, labels = [], []
+    with open(path, encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            if row['message'].strip() and row['intent'].strip():
+                messages.append(row['message'])
+                labels.append(row['intent'].strip())
+    return messages, labels
+
+
+def examples_hash(path):
+    """SHA-256 del CSV di esempi: salvato nel modello per riconoscere un .npz non aggiornato"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class IntentModel:
+    """Classificatore lineare: probabilità per etichetta da un vettore TF-IDF sparso"""
+
+    def __init__(self, vocabulary, idf, weights, bias, labels, ngram_range=(2, 4), source_hash=None):
+        self.vocabulary = vocabulary  # n-gramma -> colonna
+        self.idf = idf
+        self.weights = weights  # (n-grammi, etichette)
+        self.bias = bias
+        self.labels = labels
+        self.ngram_range = tuple(ngram_range)
+        self.source_hash = source_hash  # examples_hash del CSV di addestramento
+
+    def _vector(self, message):
+        """Colonne e pesi TF-IDF (sublineari, norma L2) degli n-grammi noti"""
+        counts = Counter(gram for gram in features(message, self.ngram_range) if gram in self.vocabulary)
+        if not counts:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32)
+        columns = np.fromiter((self.vocabulary[gram] for gram in counts), dtype=np.intp, count=len(counts))
+        values = np.fromiter((1.0 + math.log(count) for count in counts.values()), dtype=np.float32, count=len(counts))
+        values *= self.idf[columns]
+        values /= np.linalg.norm(values)
+        return columns, values
+
+    def predict_proba(self, message):
+        columns, values = self._vector(message)
+        scores = values @ self.weights[columns] + self.bias
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, message):
+        """(etichetta, probabilità) più probabile"""
+        proba = self.predict_proba(message)
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    @classmethod
+    def train(cls, messages, labels, ngram_range=(2, 4), epochs=500, learning_rate=10.0, l2=1e-4):
+        """Discesa del gradiente a batch completo sulla cross-entropia (qualche centinaio di esempi: < 1 s)"""
+        grams = [Counter(features(message, ngram_range)) for message in messages]
+        vocabulary = {}
+        for counts in grams:
+            for gram in counts:
+                vocabulary.setdefault(gram, len(vocabulary))
+        document_freq = np.zeros(len(vocabulary), dtype=np.float32)
+        for counts in grams:
+            document_freq[[vocabulary[gram] for gram in counts]] += 1
+        idf = (np.log((1 + len(messages)) / (1 + document_freq)) + 1).astype(np.float32)
+
+        matrix = np.zeros((len(messages), len(vocabulary)), dtype=np.float32)
+        for row, counts in enumerate(grams):
+            columns = [vocabulary[gram] for gram in counts]
+            matrix[row, columns] = [1.0 + math.log(count) for count in counts.values()]
+        matrix *= idf
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+        label_names = sorted(set(labels))
+        targets = np.zeros((len(messages), len(label_names)), dtype=np.float32)
+        targets[np.arange(len(messages)), [label_names.index(label) for label in labels]] = 1.0
+
+        weights = np.zeros((len(vocabulary), len(label_names)), dtype=np.float32)
+        bias = np.zeros(len(label_names), dtype=np.float32)
+        for _ in range(epochs):
+            scores = matrix @ weights + bias
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            proba = scores / scores.sum(axis=1, keepdims=True)
+            error = (proba - targets) / len(messages)
+            weights -= learning_rate * (matrix.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(vocabulary, idf, weights, bias, label_names, ngram_range)
+
+    def save(self, path):
+        """Scrittura atomica: un altro worker non legge mai un .npz a metà"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        grams = sorted(self.vocabulary, key=self.vocabulary.get)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, grams=np.array(grams), idf=self.idf, weights=self.weights, bias=self.bias,
+                     labels=np.array(self.labels), ngram_range=np.array(self.ngram_range),
+                     source_hash=np.array(self.source_hash or ''))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            vocabulary = {str(gram): column for column, gram in enumerate(data['grams'])}
+            source_hash = str(data['source_hash']) if 'source_hash' in data.files else ''
+            return cls(vocabulary, data['idf'], data['weights'], data['bias'],
+                       [str(label) for label in data['labels']], tuple(int(n) for n in data['ngram_range']),
+                       source_hash or None)
+
+
+def load_or_train(model_path, examples_path):
+    """
+    Modello salvato se addestrato sugli esempi attuali, altrimenti lo (ri)addestra
+    dal CSV e lo salva: un .npz vecchio nel volume della cache non resta in uso
+    """
+    current_hash = examples_hash(examples_path)
+    if os.path.exists(model_path):
+        try:
+            model = IntentModel.load(model_path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning(f"⚠️ Modello di intenti illeggibile, lo riaddestro: {e}")
+        else:
+            if model.source_hash == current_hash:
+                return model
+            logger.info("🔄 intent_examples.csv cambiato: riaddestro il modello di intenti")
+    model = IntentModel.train(*load_examples(examples_path))
+    model.source_hash = current_hash
+    model.save(model_path)
+    return model
+
+
+def cross_validate(messages, labels, folds=5, seed=7):
+    """Predizioni fuori campione su k fold stratificati: lista di (etichetta vera, predetta, probabilità)"""
+    rng = np.random.default_rng(seed)
+    fold_of = np.zeros(len(messages), dtype=int)
+    for label in sorted(set(labels)):
+        indices = [i for i, other in enumerate(labels) if other == label]
+        rng.shuffle(indices)
+        for position, index in enumerate(indices):
+            fold_of[index] = position % folds
+    results = [None] * len(messages)
+    for fold in range(folds):
+        train = [i for i in range(len(messages)) if fold_of[i] != fold]
+        model = IntentModel.train([messages[i] for i in train], [labels[i] for i in train])
+        for i in np.flatnonzero(fold_of == fold):
+            results[i] = (labels[i], *model.predict(messages[i]))
+    return results
+
+
+def accuracy_report(results, threshold, fallback_label='other'):
+    """Accuratezza complessiva e per etichetta; copertura e precisione delle predizioni instradate"""
+    totals, correct = Counter(), Counter()
+    for expected, predicted, _ in results:
+        totals[expected] += 1
+        correct[expected] += expected == predicted
+    routed = [(expected, predicted) for expected, predicted, confidence in results
+              if confidence >= threshold and predicted != fallback_label]
+    return {
+        "accuracy": sum(correct.values()) / len(results),
+        "per_label": {label: correct[label] / totals[label] for label in sorted(totals)},
+        "coverage": len(routed) / len(results),  # quota di messaggi che non andrebbe a Ollama
+        "precision": sum(expected == predicted for expected, predicted in routed) / len(routed) if routed else 0.0,
+    }
+
+
+def measure_latency(model, messages, repeats=20):
+    """Percentili (µs) di predict su tutti i messaggi"""
+    timings = []
+    for _ in range(repeats):
+        for message in messages:
+            started = time.perf_counter()
+            model.predict(message)
+            timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return {"p50_us": timings[len(timings) // 2], "p99_us": timings[int(len(timings) * 0.99)], "max_us": timings[-1]}
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Addestra il modello di intenti e stampa accuratezza e latenza")
+    parser.add_argument('examples', help="CSV con colonne message,intent")
+    parser.add_argument('--output', default='cache/intent_model.npz', help="file .npz del modello (INTENT_MODEL_PATH)")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.7, help="probabilità minima per instradare (INTENT_MODEL_THRESHOLD)")
+    args = parser.parse_args(argv)
+
+    messages, labels = load_examples(args.examples)
+    print(f"🐚 {len(messages)} esempi, {len(set(labels))} intenti")
+    report = accuracy_report(cross_validate(messages, labels, args.folds), args.threshold)
+    print(f"🎯 Accuratezza ({args.folds} fold): {report['accuracy']:.1%}")
+    for label, label_accuracy in report['per_label'].items():
+        print(f"   {label:<16} {label_accuracy:.1%}")
+    print(f"🚦 Soglia {args.threshold}: instradato il {report['coverage']:.1%} dei messaggi, "
+          f"precisione {report['precision']:.1%}")
+
+    started = time.perf_counter()
+    model = IntentModel.train(messages, labels)
+    model.source_hash = examples_hash(args.examples)
+    print(f"🏋️ Addestramento: {(time.perf_counter() - started) * 1000:.0f} ms, {len(model.vocabulary)} n-grammi")
+    latency = measure_latency(model, messages)
+    print(f"⏱️ predict: p50 {latency['p50_us']:.0f} µs, p99 {latency['p99_us']:.0f} µs")
+    model.save(args.output)
+    print(f"💾 Modello salvato in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Automa di parole chiave (Aho-Corasick) per Villa Celi
+Tutte le tabelle di parole chiave (risposte predefinite, disponibilità, mesi,
+tipi di domanda, CTA) in un unico automa costruito all'avvio: una sola
+scansione del testo restituisce ogni parola trovata con categoria e priorità
+"""
+
+from collections import deque, namedtuple
+
+# priority: a parità di categoria vince la più bassa; value: dato associato (es. numero del mese)
+Keyword = namedtuple('Keyword', 'keyword category priority value')
+
+
+class KeywordMatches:
+    """Parole trovate in un testo, raggruppate per categoria"""
+
+    __slots__ = ('_by_category',)
+
+    def __init__(self, hits=()):
+        self._by_category = {}
+        for hit in hits:
+            self._by_category.setdefault(hit.category, []).append(hit)
+
+    def __contains__(self, category):
+        """True se almeno una parola della categoria è presente"""
+        return category in self._by_category
+
+    def __iter__(self):
+        for hits in self._by_category.values():
+            yield from hits
+
+    def get(self, category):
+        """Parole trovate della categoria (lista di Keyword)"""
+        return self._by_category.get(category, [])
+
+    def keywords(self, category=None):
+        """Insieme dei testi trovati, di una categoria o di tutte"""
+        hits = self.get(category) if category is not None else self
+        return {hit.keyword for hit in hits}
+
+    def best(self, category):
+        """Parola della categoria con priorità più alta (numero più basso), None se assente"""
+        hits = self._by_category.get(category)
+        return min(hits, key=lambda hit: hit.priority) if hits else None
+
+
+class KeywordAutomaton:
+    """Aho-Corasick con tabella di transizione completa: una ricerca in dizionario per carattere"""
+
+    def __init__(self):
+        self._entries = {}  # (parola, categoria) -> Keyword
+        self._delta = None
+        self._outputs = None
+
+    def add(self, keyword, category, priority=0, value=None):
+        """Registra una parola (già minuscola); la stessa parola può stare in più categorie"""
+        if not keyword:
+            raise ValueError("parola chiave vuota")
+        self._entries.setdefault((keyword, category), Keyword(keyword, category, priority, value))
+        self._delta = None  # ricostruzione al prossimo build()/scan()
+
+    def add_all(self, keywords, category, priority=0):
+        for keyword in keywords:
+            self.add(keyword, category, priority)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def build(self):
+        """Trie + link di fallimento, poi transizioni complete (nessun ciclo di fallback in scansione)"""
+        goto = [{}]
+        outputs = [[]]
+        for entry in self._entries.values():
+            state = 0
+            for char in entry.keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].append(entry)
+
+        # Visita in ampiezza: ogni stato eredita transizioni e uscite dal suo link di fallimento
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for char, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(char, 0)
+                queue.append(child)
+
+        self._outputs = [tuple(out) for out in outputs]
+        self._delta = delta  # assegnato per ultimo: scan() vede tabelle complete
+
+    def scan(self, text):
+        """Tutte le parole contenute in text (anche sovrapposte), in un'unica passata"""
+        delta = self._delta
+        if delta is None:
+            self.build()
+            delta = self._delta
+        outputs = self._outputs
+        state = 0
+        matched = set()
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                matched.add(state)
+        # Una parola può essere uscita di più stati (es. 'are' in 'mare' e in 'are')
+        return KeywordMatches({hit for state in matched for hit in outputs[state]})
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Coda limitata per le generazioni Ollama di Villa Celi
+Pochi slot di generazione contemporanea e una coda di attesa corta: se
+l'attesa stimata supera il budget di latenza la richiesta viene scartata
+subito (fallback o 429) invece di accumularsi nella coda di Ollama
+"""
+
+import math
+import threading
+import time
+
+
+class LLMOverloaded(Exception):
+    """Nessuno slot libero entro il budget di latenza; retry_after in secondi"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Ollama sovraccarico ({reason}), riprovare tra {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """Semaforo con coda limitata e stima dell'attesa dalla durata media delle generazioni"""
+
+    def __init__(self, slots=2, max_queue=8, latency_budget=5.0, smoothing=0.2, clock=time.monotonic):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.latency_budget = latency_budget  # attesa massima in coda (secondi)
+        self.smoothing = smoothing  # peso dell'ultima durata nella media mobile esponenziale
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._avg_service = None  # secondi per generazione, None finché non ce n'è una completata
+        self._stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_budget": 0, "shed_timeout": 0}
+
+    def _expected_wait(self, position):
+        """Attesa stimata per chi entra in coda alla posizione data (1 = primo)"""
+        if self._avg_service is None:
+            return 0.0
+        return math.ceil(position / self.slots) * self._avg_service
+
+    def _retry_after(self):
+        return max(1, math.ceil(self._expected_wait(self._waiting + 1) or self.latency_budget))
+
+    def _shed(self, reason):
+        self._stats[f"shed_{reason}"] += 1
+        raise LLMOverloaded(reason, self._retry_after())
+
+    def acquire(self):
+        """Occupa uno slot, attendendo al massimo latency_budget; altrimenti LLMOverloaded"""
+        with self._cond:
+            if self._active < self.slots and not self._waiting:
+                self._active += 1
+                self._stats["admitted"] += 1
+                return
+            if self._waiting >= self.max_queue:
+                self._shed("queue_full")
+            if self._expected_wait(self._waiting + 1) > self.latency_budget:
+                self._shed("budget")
+
+            self._waiting += 1
+            self._stats["queued"] += 1
+            deadline = self._clock() + self.latency_budget
+            try:
+                while self._active >= self.slots:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._shed("timeout")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            self._stats["admitted"] += 1
+
+    def release(self, duration=None):
+        """Libera lo slot; duration (secondi) aggiorna la stima delle attese"""
+        with self._cond:
+            self._active -= 1
+            if duration is not None:
+                if self._avg_service is None:
+                    self._avg_service = duration
+                else:
+                    self._avg_service += self.smoothing * (duration - self._avg_service)
+            self._cond.notify()
+
+    def stats(self):
+        """Contatori per il monitoraggio"""
+        with self._cond:
+            return dict(
+                self._stats,
+                slots=self.slots,
+                active=self._active,
+                waiting=self._waiting,
+                max_queue=self.max_queue,
+                latency_budget_s=self.latency_budget,
+                avg_generation_s=round(self._avg_service, 2) if self._avg_service is not None else None,
+            )
@@ -7,14 +7,32 @@ VERSIONE con Post-processing e CTA forzati
 
 import sqlite3
 import requests
-import re
 import uuid
 import os
 import logging
-import hashlib
+from logging.handlers import RotatingFileHandler
+import json
+import threading
+import time
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from availability_materialized import MaterializedAvailabilityEngine, maintain_free_weeks, week_starts
+from migrations import apply_migrations, get_schema_version, db_file_id, booking_data_version as read_data_version
+from db_pool import ConnectionPool
+from apartment_registry import ApartmentRegistry
+from cache import LRUCache, normalize_key
+from date_ranges import PeriodParser
+from ollama_client import OllamaClient
+from single_flight import SingleFlight
+from answer_store import PersistentAnswerCache
+from model_warmup import ModelWarmer, parse_hours
+from circuit_breaker import CircuitBreaker
+from llm_scheduler import LLMScheduler, LLMOverloaded
+from answer_book import AnswerBook
+from intent_engine import IntentEngine
+from keyword_automaton import KeywordAutomaton
+from intent_model import load_or_train
 
 # ====================================
 # CONFIGURAZIONE E SETUP
@@ -28,10 +46,41 @@ class Config:
     DB_PATH = os.environ.get('DB_PATH', 'data/affitti2025.db')
     OLLAMA_URL = os.environ.get('OLLAMA_URL', "http://127.0.0.1:11434/api/generate")
     OLLAMA_MODEL = os.environ.get('MODEL', "llama3.2:1b")
-    OLLAMA_TIMEOUT = 10
+    OLLAMA_TIMEOUT = 10  # timeout di lettura massimo (tra un chunk e l'altro)
+    OLLAMA_MIN_TIMEOUT = 3  # limite inferiore del timeout adattivo (p95 × 2)
+    CIRCUIT_WINDOW = 20  # ultime chiamate Ollama valutate dal circuit breaker
+    CIRCUIT_FAILURE_RATE = 0.5  # quota di errori/chiamate lente che apre il circuito
+    CIRCUIT_OPEN_SECONDS = 30  # pausa prima della chiamata di prova
+    OLLAMA_CONNECT_TIMEOUT = 3.05
+    OLLAMA_RETRIES = 2  # solo su connessione rifiutata/resettata
+    OLLAMA_POOL_SIZE = 10
+    OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')  # quanto Ollama tiene il modello in memoria
+    KEEP_WARM_INTERVAL = int(os.environ.get('KEEP_WARM_INTERVAL', 240))  # secondi tra due ping
+    KEEP_WARM_HOURS = parse_hours(os.environ.get('KEEP_WARM_HOURS', '8-23'))  # orario di lavoro
+    LLM_SLOTS = int(os.environ.get('LLM_SLOTS', 2))  # generazioni Ollama contemporanee (CPU)
+    LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', 8))  # richieste in attesa di uno slot
+    LLM_QUEUE_BUDGET = float(os.environ.get('LLM_QUEUE_BUDGET', 5))  # attesa massima in coda (secondi)
+    LLM_SHED_RESPONSE = os.environ.get('LLM_SHED_RESPONSE', 'fallback')  # fallback | 429 (solo /api/chat)
+    OLLAMA_COALESCE_TIMEOUT = 30  # attesa massima di una generazione identica in corso (secondi)
     OLLAMA_TEMPERATURE = 0.7
     OLLAMA_NUM_CTX = 2048
-    RESPONSE_CACHE_SIZE = 100
+    DB_HEALTH_CHECK_INTERVAL = 30  # secondi tra due health check della connessione
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 500))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 6 * 3600))  # secondi
+    ANSWER_CACHE_PATH = os.environ.get('ANSWER_CACHE_PATH', 'cache/risposte_ollama.db')  # volume /app/cache
+    ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', 5000))
+    ANSWER_CACHE_TTL = int(os.environ.get('ANSWER_CACHE_TTL', 30 * 24 * 3600))  # secondi
+    ANSWER_BOOK_PATH = os.environ.get('ANSWER_BOOK_PATH', 'cache/answer_book.json')  # generato da answer_book.py
+    ANSWER_BOOK_RELOAD = 60  # secondi tra due controlli di un file aggiornato
+    INTENT_MODEL_PATH = os.environ.get('INTENT_MODEL_PATH', 'cache/intent_model.npz')  # intent_model.py
+    INTENT_MODEL_EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_examples.csv')
+    INTENT_MODEL_THRESHOLD = float(os.environ.get('INTENT_MODEL_THRESHOLD', 0.7))  # probabilità minima per instradare (oltre 1 = disattivato)
+    APARTMENT_MATCH_THRESHOLD = float(os.environ.get('APARTMENT_MATCH_THRESHOLD', 0.8))  # somiglianza minima dei nomi scritti male (1 = solo esatti)
+    LOG_FILE = os.environ.get('LOG_FILE')  # es. /app/logs/paguro.log, letto da answer_book.py
+    SESSION_CACHE_SIZE = 1000
+    SESSION_TTL = 2 * 3600  # sessioni più vecchie di 2 ore scadono
+    AVAILABILITY_CACHE_SIZE = int(os.environ.get('AVAILABILITY_CACHE_SIZE', 256))
+    ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 1000))  # greenlet per processo (serve_async.py)
     MAX_RESPONSE_LENGTH = 4  # Massimo 4 righe
     CTA_REQUIRED = True
 
@@ -40,13 +89,83 @@ if not os.path.exists(os.path.dirname(Config.DB_PATH)):
     os.makedirs(os.path.dirname(Config.DB_PATH), exist_ok=True)
 
 # Cache migliorata
-session_cache = {}
-response_cache = {}
+session_cache = LRUCache(Config.SESSION_CACHE_SIZE, ttl=Config.SESSION_TTL)
+response_cache = LRUCache(Config.RESPONSE_CACHE_SIZE, ttl=Config.RESPONSE_CACHE_TTL)
+# Livello su disco sotto response_cache: le risposte Ollama sopravvivono ai riavvii
+answer_store = PersistentAnswerCache(Config.ANSWER_CACHE_PATH, maxsize=Config.ANSWER_CACHE_SIZE, ttl=Config.ANSWER_CACHE_TTL)
+availability_cache = LRUCache(Config.AVAILABILITY_CACHE_SIZE)
+# (st_dev, st_ino) del file DB già migrato: un file sostituito (restore) viene migrato di nuovo
+_schema_file = None
+_schema_lock = threading.Lock()
+
+# Una connessione SQLite long-lived per thread, PRAGMA impostati all'apertura
+db_pool = ConnectionPool(
+    Config.DB_PATH,
+    pragmas=("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL"),
+    health_check_interval=Config.DB_HEALTH_CHECK_INTERVAL
+)
+
+# Percorso di lettura (chat, disponibilità, debug): URI mode=ro + query_only,
+# separato dalle connessioni di scrittura
+read_pool = ConnectionPool(
+    Config.DB_PATH,
+    health_check_interval=Config.DB_HEALTH_CHECK_INTERVAL,
+    read_only=True
+)
+
+# Client Ollama condiviso: connessioni keep-alive riutilizzate tra le richieste
+ollama_client = OllamaClient(
+    Config.OLLAMA_URL,
+    connect_timeout=Config.OLLAMA_CONNECT_TIMEOUT,
+    read_timeout=Config.OLLAMA_TIMEOUT,
+    retries=Config.OLLAMA_RETRIES,
+    pool_size=Config.OLLAMA_POOL_SIZE
+)
+
+# Circuit breaker: con Ollama sovraccarico si passa subito al fallback per tipo
+ollama_breaker = CircuitBreaker(
+    window=Config.CIRCUIT_WINDOW,
+    failure_rate=Config.CIRCUIT_FAILURE_RATE,
+    slow_call_ms=Config.OLLAMA_TIMEOUT * 800,  # oltre l'80% del timeout massimo la chiamata è lenta
+    open_seconds=Config.CIRCUIT_OPEN_SECONDS,
+    min_timeout=Config.OLLAMA_MIN_TIMEOUT,
+    max_timeout=Config.OLLAMA_TIMEOUT
+)
+
+# Risposte FAQ pre-generate off-line: consultate prima di Ollama
+answer_book = AnswerBook(Config.ANSWER_BOOK_PATH, reload_interval=Config.ANSWER_BOOK_RELOAD)
 
-# Setup logging
+# Slot di generazione limitati: oltre il budget di attesa la richiesta viene scartata subito
+llm_scheduler = LLMScheduler(
+    slots=Config.LLM_SLOTS,
+    max_queue=Config.LLM_MAX_QUEUE,
+    latency_budget=Config.LLM_QUEUE_BUDGET
+)
+
+# Modello caricato in background all'avvio e tenuto caldo in orario di lavoro
+model_warmer = ModelWarmer(
+    ollama_client,
+    Config.OLLAMA_MODEL,
+    keep_alive=Config.OLLAMA_KEEP_ALIVE,
+    ping_interval=Config.KEEP_WARM_INTERVAL,
+    business_hours=Config.KEEP_WARM_HOURS
+)
+
+# Prompt identici già in generazione: si attende quella in corso invece di richiamare Ollama
+ollama_flights = SingleFlight()
+
+# Motore disponibilità: tabella materializzata, query SQL unica fuori orizzonte
+availability_engine = MaterializedAvailabilityEngine()
+
+# Setup logging (anche su file se LOG_FILE è impostato)
+log_handlers = [logging.StreamHandler()]
+if Config.LOG_FILE:
+    os.makedirs(os.path.dirname(Config.LOG_FILE) or '.', exist_ok=True)
+    log_handlers.append(RotatingFileHandler(Config.LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=log_handlers
 )
 logger = logging.getLogger(__name__)
 
@@ -59,6 +178,9 @@ MONTH_MAP = {
     'luglio': 7, 'agosto': 8, 'settembre': 9, 'ottobre': 10, 'novembre': 11, 'dicembre': 12
 }
 
+# Periodi su più mesi, intervalli di date e stagioni
+period_parser = PeriodParser(MONTH_MAP)
+
 # Risposte predefinite ottimizzate per Villa Celi
 PREDEFINED_RESPONSES = {
     "come si arriva": "🗺️ **Villa Celi si trova a Palinuro**, nel cuore del Cilento. Raggiungi facilmente:\n🚗 A3, uscita Battipaglia → SS18 (1h) o Sala Consilina → SS517 (45min)\n🚂 Stazione Pisciotta-Palinuro (5km)\n\n💡 **Prenota ora**: 'disponibilità luglio 2025'",
@@ -82,6 +204,20 @@ PREDEFINED_RESPONSES = {
 # POST-PROCESSING E CTA
 # ====================================
 
+# Tutte le tabelle di parole chiave in un solo automa (completato da IntentEngine)
+keyword_automaton = KeywordAutomaton()
+# Tipi di domanda per il CTA, in ordine di precedenza
+RESPONSE_TYPE_KEYWORDS = (
+    ("weather", ['tempo', 'meteo', 'clima', 'pioggia', 'sole']),
+    ("food", ['mangiare', 'ristorante', 'cibo', 'ricetta', 'cucina']),
+    ("activity", ['fare', 'attività', 'visitare', 'vedere', 'divertimento']),
+)
+for rank, (response_type, words) in enumerate(RESPONSE_TYPE_KEYWORDS):
+    for word in words:
+        keyword_automaton.add(word, 'response_type', priority=rank, value=response_type)
+keyword_automaton.add_all(['disponibilità', 'prenota', 'villa celi', 'palinuro'], 'cta')  # CTA già presente
+keyword_automaton.add_all(['villa celi', 'palinuro', 'cilento'], 'focus')  # risposta già su Villa Celi
+
 def post_process_response(response_text, response_type="unknown"):
     """
     Post-processa ogni risposta per garantire:
@@ -95,16 +231,18 @@ def post_process_response(response_text, response_type="unknown"):
     # Dividi in righe e rimuovi righe vuote
     lines = [line.strip() for line in response_text.split('\n') if line.strip()]
     
-    # Controlla se ha già un CTA valido
-    has_cta = any(
-        keyword in response_text.lower() 
-        for keyword in ['disponibilità', 'prenota', 'villa celi', 'palinuro']
-    )
+    # Controlla se ha già un CTA valido (una scansione per CTA e focus)
+    matches = keyword_automaton.scan(response_text.lower())
+    has_cta = 'cta' in matches
+    has_focus = 'focus' in matches
     
     # Se troppo lungo, tronca e aggiungi CTA
     if len(lines) > Config.MAX_RESPONSE_LENGTH:
         lines = lines[:Config.MAX_RESPONSE_LENGTH-1]  # Lascia spazio per CTA
         has_cta = False  # Forza CTA se troncato
+        # Focus cercato solo nelle righe rimaste: lo stream interrotto da StreamingLineBudget
+        # e il testo completo danno così la stessa risposta
+        has_focus = 'focus' in keyword_automaton.scan('\n'.join(lines).lower())
     
     # Aggiungi CTA se mancante
     if Config.CTA_REQUIRED and not has_cta:
@@ -112,11 +250,29 @@ def post_process_response(response_text, response_type="unknown"):
         lines.append(cta)
     
     # Assicura focus su Villa Celi se generico
-    if not any(keyword in response_text.lower() for keyword in ['villa celi', 'palinuro', 'cilento']):
+    if not has_focus:
         lines = adapt_response_to_villa_celi(lines, response_type)
     
     return '\n'.join(lines)
 
+class StreamingLineBudget:
+    """Conta le righe non vuote di un testo in streaming, come post_process_response"""
+
+    def __init__(self, max_lines):
+        self.max_lines = max_lines
+        self.lines = 0
+        self._line_open = False  # la riga corrente ha già caratteri visibili
+
+    def feed(self, token):
+        """Aggiunge un token; True quando le righe superano il limite (il resto verrebbe scartato)"""
+        for char in token:
+            if char == '\n':
+                self._line_open = False
+            elif not self._line_open and not char.isspace():
+                self._line_open = True
+                self.lines += 1
+        return self.lines > self.max_lines
+
 def get_cta_for_response_type(response_type):
     """Restituisce CTA specifico per tipo di risposta"""
     cta_map = {
@@ -142,16 +298,8 @@ def adapt_response_to_villa_celi(lines, response_type):
 
 def classify_response_type(message):
     """Classifica il tipo di domanda per CTA specifico"""
-    message_lower = message.lower()
-    
-    if any(word in message_lower for word in ['tempo', 'meteo', 'clima', 'pioggia', 'sole']):
-        return "weather"
-    elif any(word in message_lower for word in ['mangiare', 'ristorante', 'cibo', 'ricetta', 'cucina']):
-        return "food"
-    elif any(word in message_lower for word in ['fare', 'attività', 'visitare', 'vedere', 'divertimento']):
-        return "activity"
-    else:
-        return "generic"
+    best = keyword_automaton.scan(message.lower()).best('response_type')
+    return best.value if best else "generic"
 
 def get_fallback_response(reason="unknown"):
     """Fallback specifici per tipo di problema"""
@@ -168,135 +316,172 @@ def get_fallback_response(reason="unknown"):
 # FUNZIONI DATABASE
 # ====================================
 
-def get_db_connection():
-    """Connessione database SQLite con gestione errori"""
+def current_db_file():
+    """Identità del file DB corrente, None se non esiste ancora"""
     try:
-        if not os.path.exists(Config.DB_PATH):
-            conn = sqlite3.connect(Config.DB_PATH)
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS appartamenti (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    appartamento TEXT NOT NULL,
-                    check_in TEXT NOT NULL,
-                    check_out TEXT NOT NULL
-                )
-            ''')
-            conn.commit()
+        return db_file_id(Config.DB_PATH)
+    except OSError:
+        return None
+
+def migrate_database():
+    """Migrazioni schema (tabella, indici, ANALYZE) una volta per file DB; se il file
+    è stato sostituito a server avviato anche le settimane libere vengono rifatte"""
+    global _schema_file
+    with _schema_lock:
+        is_new_db = not os.path.exists(Config.DB_PATH)
+        conn = db_pool.connection(file_id=current_db_file())
+        file_id = current_db_file()
+        if file_id == _schema_file:
+            return conn
+        try:
+            apply_migrations(conn)
+            if _schema_file is not None:
+                logger.warning(f"⚠️ File database sostituito, migrazioni e settimane libere rifatte: {Config.DB_PATH}")
+                maintain_free_weeks(conn)
+        except Exception:
             conn.close()
+            raise
+        _schema_file = file_id
+        if is_new_db:
             logger.info(f"Database creato: {Config.DB_PATH}")
-        
-        conn = sqlite3.connect(Config.DB_PATH, isolation_level=None)
-        conn.execute("PRAGMA journal_mode = WAL")
-        conn.execute("PRAGMA synchronous = NORMAL")
         return conn
+
+def get_db_connection():
+    """Connessione SQLite dal pool per-thread (close() la restituisce al pool)"""
+    try:
+        file_id = current_db_file()
+        if file_id is not None and file_id == _schema_file:
+            return db_pool.connection(file_id=file_id)
+        return migrate_database()
     except Exception as e:
         logger.error(f"Errore connessione database: {e}")
         raise
 
+def get_read_connection():
+    """Connessione di sola lettura dal pool read-only (schema migrato dal pool di scrittura)"""
+    file_id = current_db_file()
+    if file_id is None or file_id != _schema_file:
+        get_db_connection().close()
+        file_id = current_db_file()
+    try:
+        return read_pool.connection(file_id=file_id)
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Connessione read-only non disponibile, uso quella standard: {e}")
+        return get_db_connection()
+
+def booking_data_version():
+    """Versione dei dati prenotazioni: file DB + contatore aggiornato dai trigger"""
+    conn = get_read_connection()
+    try:
+        return read_data_version(conn, Config.DB_PATH)
+    finally:
+        conn.close()
+
+def load_apartment_names():
+    """Nomi distinti degli appartamenti presenti nel DB"""
+    conn = get_read_connection()
+    try:
+        cursor = conn.execute("SELECT DISTINCT appartamento FROM appartamenti;")
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+apartment_registry = ApartmentRegistry(load_apartment_names, booking_data_version,
+                                       fuzzy_threshold=Config.APARTMENT_MATCH_THRESHOLD)
+
 # ====================================
 # FUNZIONI CORE BUSINESS LOGIC
 # ====================================
 
+def month_range(month, year):
+    """Primo e ultimo giorno del mese"""
+    start_month_date = datetime(year, month, 1)
+    if month == 12:
+        end_month_date = datetime(year, 12, 31)
+    else:
+        end_month_date = datetime(year, month + 1, 1) - timedelta(days=1)
+    return start_month_date.date(), end_month_date.date()
+
+def iter_free_weeks(ranges, apartment_name=None, data_version=None):
+    """Settimane libere di uno o più periodi con un'unica passata sul motore disponibilità"""
+    # Motore ricostruito solo se il DB è cambiato dall'ultima richiesta
+    if data_version is None:
+        data_version = booking_data_version()
+    availability_engine.ensure_fresh(data_version, get_read_connection)
+
+    # None = tutti gli appartamenti presenti nel DB
+    apartments_to_check = None
+    if apartment_name:
+        apartments_to_check = [apartment_registry.canonical(apartment_name) or apartment_name.capitalize()]
+
+    wanted_saturdays = set()
+    for start_date, end_date in ranges:
+        logger.info(f"Cercando disponibilità dal {start_date} al {end_date}")
+        wanted_saturdays.update(week_starts(start_date, end_date))
+
+    # Una sola interrogazione sull'intervallo che copre tutti i periodi richiesti
+    hull_start = min(start_date for start_date, _ in ranges)
+    hull_end = max(end_date for _, end_date in ranges)
+    found = 0
+    for apt_name, week_start, week_end in availability_engine.free_weeks(hull_start, hull_end, apartments_to_check):
+        if week_start in wanted_saturdays:
+            found += 1
+            yield (found, apt_name, week_start.strftime('%Y-%m-%d'), week_end.strftime('%Y-%m-%d'))
+
+    logger.info(f"Totale disponibilità trovate: {found}")
+
+def find_free_weeks(month, year, apartment_name=None, data_version=None):
+    """Settimane libere sabato-sabato del mese come tuple (id, appartamento, check_in, check_out)"""
+    return list(iter_free_weeks([month_range(month, year)], apartment_name, data_version))
+
 def query_appartamenti(month, year, apartment_name=None):
     """Trova settimane libere sabato-sabato"""
     try:
-        conn = get_db_connection()
-        
-        # Recupera appartamenti dal DB
-        all_apartments_query = "SELECT DISTINCT appartamento FROM appartamenti ORDER BY appartamento;"
-        cursor = conn.execute(all_apartments_query)
-        all_apartments_in_db = [row[0] for row in cursor.fetchall()]
-        
-        apartments_to_check = [apartment_name.capitalize()] if apartment_name else all_apartments_in_db
-
-        if not apartments_to_check:
-            logger.warning("Nessun appartamento trovato")
-            return []
-
-        # Range del mese
-        start_month_date = datetime(year, month, 1)
-        if month == 12:
-            end_month_date = datetime(year, 12, 31)
-        else:
-            end_month_date = datetime(year, month + 1, 1) - timedelta(days=1)
-
-        logger.info(f"Cercando disponibilità per {month}/{year} dal {start_month_date.date()} al {end_month_date.date()}")
+        return find_free_weeks(month, year, apartment_name)
+    except Exception as e:
+        logger.error(f"Errore calcolo disponibilità: {e}")
+        return []
 
-        final_availabilities = []
+def get_availability_response(month, year, apartment_name=None):
+    """Risposta disponibilità per un mese"""
+    return get_period_availability_response([month_range(month, year)], apartment_name)
 
-        for apt_name_to_check in apartments_to_check:
-            try:
-                # Periodi occupati
-                occupied_query = """
-                SELECT check_in, check_out
-                FROM appartamenti
-                WHERE appartamento = ?
-                  AND check_in <= ?
-                  AND check_out >= ?
-                ORDER BY check_in;
-                """
-                
-                cursor = conn.execute(occupied_query, (
-                    apt_name_to_check,
-                    end_month_date.strftime('%Y-%m-%d'),
-                    start_month_date.strftime('%Y-%m-%d')
-                ))
-                
-                occupied_periods_raw = cursor.fetchall()
-                
-                occupied_periods_for_apt = []
-                for occ in occupied_periods_raw:
-                    try:
-                        ci_str, co_str = occ
-                        occupied_periods_for_apt.append({
-                            'check_in': datetime.strptime(ci_str, '%Y-%m-%d'),
-                            'check_out': datetime.strptime(co_str, '%Y-%m-%d')
-                        })
-                    except ValueError as ve:
-                        logger.warning(f"Formato data non valido: {occ} in {apt_name_to_check}: {ve}")
-                        continue
-
-                logger.info(f"Appartamento {apt_name_to_check}: {len(occupied_periods_for_apt)} periodi occupati")
-
-                # Genera settimane sabato-sabato
-                current_saturday = start_month_date
-                while current_saturday.weekday() != 5:
-                    current_saturday -= timedelta(days=1)
-
-                while current_saturday <= end_month_date:
-                    week_start = current_saturday
-                    week_end = week_start + timedelta(days=7)
-
-                    if not (week_end < start_month_date or week_start > end_month_date):
-                        is_week_free_for_apt = True
-                        
-                        for occupied in occupied_periods_for_apt:
-                            if (week_start < occupied['check_out'] and week_end > occupied['check_in']):
-                                is_week_free_for_apt = False
-                                break
-                        
-                        if is_week_free_for_apt:
-                            final_availabilities.append((
-                                len(final_availabilities) + 1,
-                                apt_name_to_check,
-                                week_start.strftime('%Y-%m-%d'),
-                                week_end.strftime('%Y-%m-%d')
-                            ))
-                            logger.info(f"Settimana libera: {apt_name_to_check} {week_start.date()}-{week_end.date()}")
-                    
-                    current_saturday += timedelta(days=7)
-                    
-            except Exception as e:
-                logger.error(f"Errore elaborazione appartamento {apt_name_to_check}: {e}")
-                continue
-        
-        conn.close()
-        logger.info(f"Totale disponibilità trovate: {len(final_availabilities)}")
-        return final_availabilities
-        
+def get_period_availability_response(ranges, apartment_name=None):
+    """Risposta disponibilità dalla cache, ricalcolata solo quando cambiano le prenotazioni"""
+    try:
+        data_version = booking_data_version()
+        cache_key = (tuple(ranges), (apartment_name or '').lower(), data_version)
+        cached = availability_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"📋 Disponibilità {ranges[0][0]} - {ranges[-1][1]} trovata in cache")
+            return dict(cached)
+
+        response = generate_availability_response(iter_free_weeks(ranges, apartment_name, data_version))
+        availability_cache.put(cache_key, response)
+        return dict(response)
     except Exception as e:
+        # Errori non messi in cache: la prossima richiesta riprova
         logger.error(f"Errore calcolo disponibilità: {e}")
-        return []
+        return generate_availability_response([])
+
+def query_availability_overview(year, from_month=6, to_month=9):
+    """Settimane libere per appartamento su un'intera stagione (default: estate)"""
+    start_date = month_range(from_month, year)[0]
+    end_date = month_range(to_month, year)[1]
+
+    availability_engine.ensure_fresh(booking_data_version(), get_read_connection)
+
+    overview = {}
+    for apt_name, week_start, week_end in availability_engine.free_weeks(start_date, end_date):
+        overview.setdefault(apt_name, []).append({
+            "check_in": week_start.strftime('%Y-%m-%d'),
+            "check_out": week_end.strftime('%Y-%m-%d'),
+            "check_in_formatted": format_date_italian(week_start.strftime('%Y-%m-%d')),
+            "check_out_formatted": format_date_italian(week_end.strftime('%Y-%m-%d'))
+        })
+
+    logger.info(f"📆 Panoramica {start_date} - {end_date}: {sum(len(w) for w in overview.values())} settimane libere")
+    return start_date, end_date, overview
 
 def format_date_italian(date_str):
     """Formatta data in italiano"""
@@ -309,7 +494,8 @@ def format_date_italian(date_str):
         return date_str
 
 def generate_availability_response(results):
-    """Genera risposta con lista disponibilità"""
+    """Genera risposta con lista disponibilità (accetta anche un generatore di risultati)"""
+    results = sorted(results, key=lambda x: (x[1], x[2]))
     if not results:
         return {
             "message": "❌ **Nessuna settimana libera** per il periodo richiesto.\n💡 Prova altri mesi o contattaci per soluzioni personalizzate!",
@@ -317,7 +503,6 @@ def generate_availability_response(results):
             "availability_count": 0
         }
     
-    results.sort(key=lambda x: (x[1], x[2])) 
     message_parts = ["✅ **Disponibilità trovate** (settimane sabato-sabato):\n"]
     
     grouped_results = {}
@@ -403,163 +588,116 @@ def generate_booking_response(booking_choice, session_id):
         "booking_data": booking_data
     }
 
+# Parole chiave con precedenza sulle chiavi di PREDEFINED_RESPONSES
+PREDEFINED_PRIORITY = {
+    "dove": "dove si trova",
+    "trova": "dove si trova",
+    "palinuro": "dove si trova",
+    "arriva": "come si arriva",
+    "raggiungere": "come si arriva",
+    "attività": "attività",
+    "cosa fare": "cosa",
+    "fare": "fare",
+    "spiagge": "spiagge",
+    "mare": "mare",
+    "servizi": "servizi",
+    "prezzo": "prezzo",
+    "costo": "prezzo",
+}
+
+# Intenti in una sola passata: parole chiave e pattern precompilati all'avvio
+intent_engine = IntentEngine(
+    PREDEFINED_RESPONSES,
+    PREDEFINED_PRIORITY,
+    MONTH_MAP,
+    period_parser,
+    apartment_registry.find_fuzzy,
+    automaton=keyword_automaton
+)
+keyword_automaton.build()
+
+# Modello di intenti: preparato all'avvio (prepare_intent_model), mai addestrato dentro una richiesta
+_intent_model = None
+_intent_model_lock = threading.Lock()
+_intent_model_loading = False
+
+def prepare_intent_model():
+    """Carica il modello da INTENT_MODEL_PATH, riaddestrandolo se intent_examples.csv è cambiato"""
+    global _intent_model
+    with _intent_model_lock:
+        try:
+            model = load_or_train(Config.INTENT_MODEL_PATH, Config.INTENT_MODEL_EXAMPLES)
+            logger.info(f"🧠 Modello di intenti pronto: {len(model.vocabulary)} n-grammi, {len(model.labels)} intenti")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"❌ Modello di intenti non disponibile: {e}")
+            model = False  # niente nuovi tentativi: si va direttamente a Ollama
+        _intent_model = model
+        return model or None
+
+def get_intent_model():
+    """
+    Modello pronto o None; se l'avvio non l'ha preparato parte in background
+    e nel frattempo i messaggi vanno a Ollama (la richiesta non aspetta)
+    """
+    global _intent_model_loading
+    if _intent_model is None and not _intent_model_loading:
+        with _intent_model_lock:
+            if _intent_model is None and not _intent_model_loading:
+                _intent_model_loading = True
+                threading.Thread(target=prepare_intent_model, name='intent-model', daemon=True).start()
+    return _intent_model or None
+
+def route_with_intent_model(message):
+    """
+    Instrada un messaggio sfuggito alle regole quando il modello è sicuro:
+    disponibilità, prenotazione (se c'è un numero) o risposta predefinita.
+    None = nessuna predizione affidabile, il messaggio va a Ollama
+    """
+    model = get_intent_model()
+    if model is None:
+        return None
+    label, confidence = model.predict(message)
+    if confidence < Config.INTENT_MODEL_THRESHOLD:
+        return None
+    if label == 'availability':
+        routed = intent_engine.availability(message)
+    elif label == 'booking':
+        choice_number = intent_engine.first_number(message.lower())
+        routed = ('booking_request', choice_number) if choice_number is not None else None
+    elif label in PREDEFINED_RESPONSES:
+        routed = ('predefined_response', PREDEFINED_RESPONSES[label])
+    else:
+        routed = None
+    if routed:
+        logger.info(f"🧠 Modello di intenti: '{message}' -> {label} ({confidence:.2f})")
+    return routed
+
 def find_predefined_response(message):
     """Cerca risposta predefinita per il messaggio"""
-    message_lower = message.lower().strip()
-    
-    logger.info(f"🔍 Cercando risposta predefinita per: '{message_lower}'")
-    
-    priority_matches = {
-        "dove": "dove si trova",
-        "trova": "dove si trova", 
-        "palinuro": "dove si trova",
-        "arriva": "come si arriva",
-        "raggiungere": "come si arriva",
-        "attività": "attività",
-        "cosa fare": "cosa",
-        "fare": "fare",
-        "spiagge": "spiagge",
-        "mare": "mare",
-        "servizi": "servizi",
-        "prezzo": "prezzo",
-        "costo": "prezzo",
-    }
-    
-    for keyword, response_key in priority_matches.items():
-        if keyword in message_lower:
-            if response_key in PREDEFINED_RESPONSES:
-                logger.info(f"✅ Risposta predefinita trovata: {response_key}")
-                return PREDEFINED_RESPONSES[response_key]
-    
-    for key, response in PREDEFINED_RESPONSES.items():
-        if key in message_lower:
-            logger.info(f"✅ Corrispondenza diretta trovata: {key}")
-            return response
-    
-    logger.info("❌ Nessuna risposta predefinita trovata")
-    return None
+    match = intent_engine.predefined(intent_engine.scan(message.lower().strip()))
+    return match[1] if match else None
 
 def analyze_message(message):
-    """Analizza messaggio per identificare tipo richiesta - VERSIONE OTTIMIZZATA"""
-    message_lower = message.lower().strip()
-    
+    """Analizza messaggio per identificare tipo richiesta (IntentEngine, una sola passata)"""
     logger.info(f"🔍 Analizzando messaggio: '{message}'")
+    request_type, param = intent_engine.analyze(message)
 
-    # 0. CONTROLLO PRIORITARIO: Risposte predefinite
-    predefined_response = find_predefined_response(message)
-    if predefined_response:
-        return 'predefined_response', predefined_response
-
-    detected_month = None
-    detected_year = None
-    detected_apartment = None
-
-    # 1. PATTERN PRENOTAZIONE (alta priorità)
-    if re.match(r'^\d+$', message_lower):
-        try:
-            choice_number = int(message_lower)
-            logger.info(f"✅ Riconosciuto numero puro: {choice_number}")
-            return 'booking_request', choice_number
-        except ValueError:
-            pass
-    
-    booking_patterns = [
-        r'voglio prenotare.*(\d+)', r'prenota.*(\d+)', r'scelgo.*(\d+)',
-        r'prendo.*(\d+)', r'numero.*(\d+)', r'la\s*(\d+)', r'il\s*(\d+)'
-    ]
-    for pattern in booking_patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            try:
-                choice_number = int(match.group(1))
-                logger.info(f"✅ Riconosciuta richiesta prenotazione: {choice_number}")
-                return 'booking_request', choice_number
-            except ValueError:
-                continue
-
-    # 2. PATTERN DISPONIBILITÀ
-    availability_keywords = ['disponibilit', 'liber', 'case', 'libero', 'appartament', 'disponibil']
-    has_availability_keyword = any(word in message_lower for word in availability_keywords)
-    
-    if has_availability_keyword:
-        logger.info("🏠 Riconosciuta richiesta di disponibilità")
-        
-        # Estrai mese
-        for month_name, month_num in MONTH_MAP.items():
-            if month_name in message_lower:
-                detected_month = month_num
-                logger.info(f"📅 Mese trovato: {month_name} ({month_num})")
-                break
-        
-        # Estrai anno
-        year_match = re.search(r'202[4-9]|20[3-9]\d', message_lower)
-        if year_match:
-            detected_year = int(year_match.group(0))
-            logger.info(f"📅 Anno trovato: {detected_year}")
-        elif detected_month:
-            current_year = datetime.now().year
-            if detected_month < datetime.now().month:
-                detected_year = current_year + 1
-            else:
-                detected_year = current_year
-            logger.info(f"📅 Anno inferito: {detected_year}")
-
-        # Estrai appartamento
-        try:
-            conn = get_db_connection()
-            cursor = conn.execute("SELECT DISTINCT appartamento FROM appartamenti;")
-            apartment_names_in_db = [row[0].lower() for row in cursor.fetchall()]
-            conn.close()
-            
-            for apt_name in apartment_names_in_db:
-                if re.search(r'\b' + re.escape(apt_name) + r'\b', message_lower):
-                    detected_apartment = apt_name
-                    logger.info(f"🏠 Appartamento trovato: {apt_name}")
-                    break
-        except Exception as e:
-            logger.error(f"Errore recupero nomi appartamenti: {e}")
+    if request_type == 'unknown':
+        # Tra le regole e Ollama: modello di intenti locale
+        routed = route_with_intent_model(message)
+        if routed:
+            return routed
+        # Riga letta da answer_book.py per pre-generare le risposte frequenti
+        logger.info(f"❓ Messaggio non riconosciuto: '{message}'")
+    return request_type, param
 
-        if detected_month and detected_year:
-            return 'availability_request', {
-                'month': detected_month, 
-                'year': detected_year, 
-                'apartment': detected_apartment
-            }
-        elif detected_apartment and not detected_month:
-            return 'missing_info_availability', {'apartment': detected_apartment}
-
-    # 3. SALUTI
-    greeting_patterns = [
-        r'^ciao\s*$', r'^salve\s*$', r'^buongiorno\s*$', r'^buonasera\s*$', 
-        r'^help\s*$', r'^aiuto\s*$', r'^inizia\s*$'
-    ]
-    
-    for pattern in greeting_patterns:
-        if re.match(pattern, message_lower):
-            logger.info(f"👋 Riconosciuto saluto: {message_lower}")
-            return 'greeting', None
-    
-    # 4. TEST (da handle_query_complete.py)
-    if 'test' in message_lower:
-        return 'test_request', None
-    
-    # 5. TUTTO IL RESTO
-    logger.info(f"❓ Messaggio non riconosciuto: '{message}'")
-    return 'unknown', None
+def ollama_cache_key(prompt):
+    """Chiave cache per un prompt Ollama: il testo normalizzato stesso, senza collisioni"""
+    return ('ollama', normalize_key(prompt))
 
-def generate_ollama_response(prompt):
-    """Fallback Ollama OTTIMIZZATO con cache hash"""
-    logger.info(f"🤖 Chiamando Ollama per: '{prompt[:50]}...'")
-    
-    # Cache con hash (più efficiente)
-    cache_key = f"ollama_{hashlib.md5(prompt.encode()).hexdigest()[:8]}"
-    if cache_key in response_cache:
-        logger.info("📋 Risposta trovata in cache")
-        return response_cache[cache_key]
-    
-    try:
-        # Prompt OTTIMIZZATO per Villa Celi
-        enhanced_prompt = f"""Sei Paguro, l'assistente virtuale di Villa Celi, appartamenti vacanze a PALINURO nel Cilento (Salerno).
+def build_ollama_payload(prompt, stream=False):
+    """Payload Ollama con il prompt OTTIMIZZATO per Villa Celi"""
+    enhanced_prompt = f"""Sei Paguro, l'assistente virtuale di Villa Celi, appartamenti vacanze a PALINURO nel Cilento (Salerno).
 
 REGOLE FERREE:
 - Rispondi SOLO su Palinuro/Cilento/Villa Celi
@@ -571,52 +709,157 @@ Domanda dell'ospite: {prompt}
 
 Risposta breve e focalizzata:"""
 
-        logger.info("📡 Inviando richiesta a Ollama...")
-        response = requests.post(
-            Config.OLLAMA_URL,
-            json={
-                "model": Config.OLLAMA_MODEL,
-                "prompt": enhanced_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": Config.OLLAMA_TEMPERATURE,
-                    "num_ctx": Config.OLLAMA_NUM_CTX,
-                    "num_predict": 150
-                }
-            },
-            timeout=Config.OLLAMA_TIMEOUT
+    return {
+        "model": Config.OLLAMA_MODEL,
+        "prompt": enhanced_prompt,
+        "stream": stream,
+        "keep_alive": Config.OLLAMA_KEEP_ALIVE,
+        "options": {
+            "temperature": Config.OLLAMA_TEMPERATURE,
+            "num_ctx": Config.OLLAMA_NUM_CTX,
+            "num_predict": 150
+        }
+    }
+
+def answer_store_key(cache_key):
+    """Chiave su disco: include il modello, cambiandolo le vecchie risposte non valgono più"""
+    return f"{Config.OLLAMA_MODEL}|{cache_key[1]}"
+
+def cached_ollama_response(cache_key):
+    """Risposta in cache: prima in memoria, poi su disco (ricaricata in memoria)"""
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        cached = answer_store.get(answer_store_key(cache_key))
+        if cached is not None:
+            logger.info("💾 Risposta trovata nella cache persistente")
+            response_cache.put(cache_key, cached)
+    return cached
+
+def store_ollama_response(cache_key, result):
+    """Cache LRU con scadenza in memoria, copia su disco per i riavvii"""
+    response_cache.put(cache_key, result)
+    answer_store.put(answer_store_key(cache_key), result)
+
+def generate_ollama_response(prompt):
+    """
+    Fallback Ollama OTTIMIZZATO con cache LRU/TTL (generazione interrotta al limite di righe).
+    Le richieste concorrenti con lo stesso prompt condividono un'unica generazione.
+    LLMOverloaded se non si libera uno slot entro il budget di attesa
+    """
+    flight_key = ollama_cache_key(prompt)
+    try:
+        result = ollama_flights.do(
+            flight_key,
+            lambda: ''.join(stream_ollama_response(prompt)).strip(),
+            timeout=Config.OLLAMA_COALESCE_TIMEOUT
         )
-        
-        if response.status_code == 200:
-            result = response.json().get("response", "").strip()
-            logger.info(f"✅ Ollama risposta ricevuta: '{result[:50]}...'")
-            
-            if result:
-                # Cache con limite dimensioni
-                if len(response_cache) < Config.RESPONSE_CACHE_SIZE:
-                    response_cache[cache_key] = result
-                return result
-            else:
-                logger.warning("⚠️ Ollama risposta vuota")
-                return None
-        else:
-            logger.error(f"❌ Ollama errore HTTP: {response.status_code}")
-            return None
-            
-    except requests.exceptions.Timeout:
-        logger.error("⏰ Timeout Ollama")
-        return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"🔗 Errore connessione Ollama: {e}")
+    except TimeoutError as e:
+        logger.error(f"⏰ Timeout in attesa di Ollama: {e}")
         return None
+    except LLMOverloaded:
+        raise
     except Exception as e:
         logger.error(f"💥 Errore generico Ollama: {e}")
         return None
+    return result or None
+
+def stream_ollama_response(prompt):
+    """
+    Token Ollama man mano che vengono prodotti. Appena il testo supera
+    MAX_RESPONSE_LENGTH righe (che post_process_response scarterebbe)
+    lo stream viene chiuso e Ollama smette di generare.
+    La generazione occupa uno slot di llm_scheduler (LLMOverloaded se la coda è piena)
+    """
+    logger.info(f"🤖 Chiamando Ollama per: '{prompt[:50]}...'")
+
+    cache_key = ollama_cache_key(prompt)
+    cached = cached_ollama_response(cache_key)
+    if cached is not None:
+        logger.info("📋 Risposta trovata in cache")
+        yield cached
+        return
+
+    if not ollama_breaker.allow():
+        logger.warning("⚡ Circuit breaker aperto: salto Ollama e uso il fallback")
+        return
+
+    try:
+        llm_scheduler.acquire()
+    except LLMOverloaded as e:
+        ollama_breaker.cancel()
+        logger.warning(f"🚦 {e}: uso il fallback")
+        raise
+
+    chunks = []
+    budget = StreamingLineBudget(Config.MAX_RESPONSE_LENGTH)
+    started = time.monotonic()
+    first_token_ms = None
+    timeout = (Config.OLLAMA_CONNECT_TIMEOUT, ollama_breaker.timeout())
+    try:
+        logger.info(f"📡 Inviando richiesta a Ollama (timeout {timeout[1]}s)...")
+        with ollama_client.stream(build_ollama_payload(prompt, stream=True), timeout=timeout) as response:
+            if response.status_code != 200:
+                logger.error(f"❌ Ollama errore HTTP: {response.status_code}")
+                return
+            # Ollama invia una riga JSON per chunk: {"response": "...", "done": false}
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                token = chunk.get("response", "")
+                if token:
+                    if first_token_ms is None:
+                        first_token_ms = (time.monotonic() - started) * 1000
+                    chunks.append(token)
+                    yield token
+                if chunk.get("done"):
+                    break
+                if budget.feed(token):
+                    # Uscire dal with chiude la connessione: Ollama interrompe la generazione
+                    logger.info(f"✂️ Limite di {Config.MAX_RESPONSE_LENGTH} righe superato, interrompo Ollama")
+                    break
+    except requests.exceptions.Timeout:
+        logger.error("⏰ Timeout Ollama (streaming)")
+        return
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"🔗 Errore connessione Ollama: {e}")
+        return
+    finally:
+        llm_scheduler.release(time.monotonic() - started)
+        # Latenza al primo token: è quella che decide il timeout; nessun token = errore
+        if first_token_ms is not None:
+            ollama_breaker.record_success(first_token_ms)
+        else:
+            ollama_breaker.record_failure((time.monotonic() - started) * 1000)
+
+    # Anche il testo interrotto va in cache: contiene l'inizio della riga in eccesso,
+    # quindi post_process_response lo tronca e aggiunge la CTA come per quello completo
+    result = ''.join(chunks).strip()
+    if result:
+        logger.info(f"✅ Ollama risposta ricevuta: '{result[:50]}...'")
+        store_ollama_response(cache_key, result)
+    else:
+        logger.warning("⚠️ Ollama risposta vuota")
+
+def build_context_prompt(message):
+    """Prompt contestualizzato per le domande generiche"""
+    return f"""Sei l'assistente virtuale di Villa Celi, appartamenti vacanze a Palinuro nel Cilento. 
+            Rispondi in modo cordiale e professionale a questa domanda dell'ospite: {message}
+            
+            Mantieni la risposta breve e utile. Se non conosci informazioni specifiche, invita gentilmente a contattare Villa Celi."""
 
-def handle_query(message, session_id):
+def lookup_answer_book(message):
+    """Risposta pre-generata (già post-processata) per una domanda frequente, None se assente"""
+    entry = answer_book.lookup(normalize_key(message))
+    if entry is None:
+        return None
+    logger.info(f"📚 Risposta dall'answer book: '{entry['question']}'")
+    return {"message": entry["answer"], "type": "faq_response"}
+
+def handle_query(message, session_id, analysis=None):
     """Gestisce query con POST-PROCESSING COMPLETO"""
     try:
-        request_type, param = analyze_message(message)
+        request_type, param = analysis or analyze_message(message)
         
         logger.info(f"📋 [{session_id}] Messaggio: '{message}' -> Tipo: {request_type}")
         
@@ -640,16 +883,17 @@ def handle_query(message, session_id):
                 }
 
             logger.info(f"🔍 Cercando disponibilità per {month_num}/{year_num}, appartamento: {apt_name}")
-            results = query_appartamenti(month_num, year_num, apt_name)
-            response = generate_availability_response(results)
-            
-            if response['type'] == 'availability_list':
-                session_cache[session_id] = {
-                    'last_query': 'availability',
-                    'availability_data': response.get('availability_data', []),
-                    'timestamp': datetime.now()
-                }
-            
+            response = get_availability_response(month_num, year_num, apt_name)
+            store_availability_session(session_id, response)
+            return response
+
+        elif request_type == 'availability_range_request':
+            ranges = param.get('ranges')
+            apt_name = param.get('apartment')
+
+            logger.info(f"🔍 Cercando disponibilità dal {ranges[0][0]} al {ranges[-1][1]}, appartamento: {apt_name}")
+            response = get_period_availability_response(ranges, apt_name)
+            store_availability_session(session_id, response)
             return response
             
         elif request_type == 'missing_info_availability':
@@ -680,14 +924,17 @@ def handle_query(message, session_id):
             
             # Classifica tipo per CTA specifico
             response_type = classify_response_type(message)
-            
-            # Crea prompt contestualizzato
-            context_prompt = f"""Sei l'assistente virtuale di Villa Celi, appartamenti vacanze a Palinuro nel Cilento. 
-            Rispondi in modo cordiale e professionale a questa domanda dell'ospite: {message}
-            
-            Mantieni la risposta breve e utile. Se non conosci informazioni specifiche, invita gentilmente a contattare Villa Celi."""
-            
-            ollama_response = generate_ollama_response(context_prompt)
+
+            faq = lookup_answer_book(message)
+            if faq:
+                return faq
+
+            try:
+                ollama_response = generate_ollama_response(build_context_prompt(message))
+            except LLMOverloaded:
+                if Config.LLM_SHED_RESPONSE == '429':
+                    raise  # /api/chat risponde 429 con Retry-After
+                ollama_response = None
             
             if ollama_response:
                 # POST-PROCESSING COMPLETO
@@ -713,6 +960,8 @@ def handle_query(message, session_id):
                 "type": "error"
             }
             
+    except LLMOverloaded:
+        raise
     except Exception as e:
         logger.error(f"💥 Errore in handle_query: {e}", exc_info=True)
         return {
@@ -720,6 +969,58 @@ def handle_query(message, session_id):
             "type": "error"
         }
 
+def handle_query_stream(message, session_id):
+    """
+    Versione streaming di handle_query: eventi (nome, dati) per SSE.
+    Le domande generiche inoltrano i token Ollama; tutte le altre risposte
+    (predefinite, disponibilità, prenotazioni) arrivano in un solo evento finale
+    """
+    analysis = analyze_message(message)
+    request_type = analysis[0]
+
+    if request_type != 'unknown':
+        yield 'done', handle_query(message, session_id, analysis)
+        return
+
+    logger.info(f"📋 [{session_id}] Messaggio: '{message}' -> Tipo: unknown (streaming)")
+    faq = lookup_answer_book(message)
+    if faq:
+        yield 'done', faq
+        return
+
+    response_type = classify_response_type(message)
+    tokens = []
+    try:
+        for token in stream_ollama_response(build_context_prompt(message)):
+            tokens.append(token)
+            yield 'token', {"token": token}
+    except LLMOverloaded:
+        tokens = []  # lo stream è già aperto: niente 429, si usa il fallback
+    except Exception as e:
+        logger.error(f"💥 Errore streaming Ollama: {e}", exc_info=True)
+        tokens = []
+
+    ollama_response = ''.join(tokens).strip()
+    if ollama_response:
+        # Il messaggio finale post-processato sostituisce il testo parziale
+        yield 'done', {"message": post_process_response(ollama_response, response_type), "type": "ollama_response"}
+    else:
+        logger.warning("⚠️ Ollama non disponibile, usando fallback specifico")
+        yield 'done', {"message": get_fallback_response(response_type), "type": "fallback_response"}
+
+def format_sse(event, data):
+    """Evento Server-Sent Events con payload JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def store_availability_session(session_id, response):
+    """Salva la lista disponibilità in sessione per la scelta successiva"""
+    if response['type'] == 'availability_list':
+        session_cache.put(session_id, {
+            'last_query': 'availability',
+            'availability_data': response.get('availability_data', []),
+            'timestamp': datetime.now()
+        })
+
 def generate_session_id():
     """Genera ID sessione unico"""
     return f"session_{datetime.now().timestamp()}_{uuid.uuid4().hex[:8]}"
@@ -740,7 +1041,19 @@ def health():
         "timestamp": datetime.now().isoformat(),
         "location": "Palinuro, Cilento",
         "database": "connected" if os.path.exists(Config.DB_PATH) else "missing",
-        "features": ["post_processing", "forced_cta", "villa_celi_focus"]
+        "database_pool": db_pool.stats(),
+        "database_read_pool": read_pool.stats(),
+        "availability_cache": availability_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "answer_store": answer_store.stats(),
+        "answer_book": answer_book.stats(),
+        "session_cache": session_cache.stats(),
+        "ollama": ollama_client.stats(),
+        "ollama_model": model_warmer.status(check=False),  # cache del thread di warm-up
+        "ollama_circuit": ollama_breaker.state(),
+        "ollama_queue": llm_scheduler.stats(),
+        "ollama_coalescing": ollama_flights.stats(),
+        "features": ["post_processing", "forced_cta", "villa_celi_focus", "sse_streaming"]
     })
 
 @app.route('/api/chat', methods=['POST'])
@@ -772,6 +1085,15 @@ def chat():
         logger.info(f"📤 [DEBUG] Risposta: tipo={response.get('type')}, lunghezza={len(response.get('message', ''))}")
         
         return jsonify(response)
+
+    except LLMOverloaded as e:
+        logger.warning(f"🚦 [DEBUG] Richiesta scartata: {e}")
+        return jsonify({
+            "error": "Too many requests",
+            "message": get_fallback_response(classify_response_type(message)),
+            "type": "overloaded",
+            "retry_after": e.retry_after
+        }), 429, {"Retry-After": str(e.retry_after)}
         
     except Exception as e:
         logger.error(f"💥 [DEBUG] Errore chat endpoint: {e}", exc_info=True)
@@ -781,12 +1103,51 @@ def chat():
             "type": "error"
         }), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Chat in streaming (SSE): eventi 'token' durante la generazione, poi 'done' con la risposta completa"""
+    logger.info("🐚 [DEBUG] Chat stream endpoint chiamato")
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No JSON data provided"}), 400
+
+    message = data.get('message', '').strip()
+    session_id = data.get('session_id', generate_session_id())
+    if not message:
+        return jsonify({"error": "Message is required"}), 400
+
+    logger.info(f"📨 [DEBUG] Nuova richiesta streaming: '{message}' [Session: {session_id}]")
+
+    def events():
+        try:
+            for event, payload in handle_query_stream(message, session_id):
+                if event == 'done':
+                    # Stessi campi di /api/chat (type, booking_data, session_id) letti da chatbot.js
+                    payload['session_id'] = session_id
+                    payload['timestamp'] = datetime.now().isoformat()
+                    logger.info(f"📤 [DEBUG] Risposta stream: tipo={payload.get('type')}")
+                yield format_sse(event, payload)
+        except Exception as e:
+            logger.error(f"💥 [DEBUG] Errore chat stream: {e}", exc_info=True)
+            yield format_sse('done', {
+                "error": "Internal server error",
+                "message": get_fallback_response("unknown"),
+                "type": "error",
+                "session_id": session_id
+            })
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/db/appartamenti', methods=['GET'])
 def get_appartamenti():
     """Endpoint per debug database"""
     logger.info("🗄️ [DEBUG] Database debug endpoint chiamato")
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.execute("SELECT id, appartamento, check_in, check_out FROM appartamenti ORDER BY appartamento, check_in LIMIT 50;")
         results = cursor.fetchall()
         conn.close()
@@ -809,6 +1170,29 @@ def get_appartamenti():
         logger.error(f"💥 [DEBUG] Errore debug database: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/availability/overview', methods=['GET'])
+def availability_overview():
+    """Panoramica settimane libere per stagione (widget)"""
+    try:
+        year = request.args.get('year', datetime.now().year, type=int)
+        from_month = request.args.get('from_month', 6, type=int)
+        to_month = request.args.get('to_month', 9, type=int)
+
+        if not (1 <= from_month <= to_month <= 12):
+            return jsonify({"error": "Invalid month range"}), 400
+
+        start_date, end_date, overview = query_availability_overview(year, from_month, to_month)
+        return jsonify({
+            "status": "ok",
+            "from": start_date.isoformat(),
+            "to": end_date.isoformat(),
+            "free_weeks_count": sum(len(weeks) for weeks in overview.values()),
+            "apartments": overview
+        })
+    except Exception as e:
+        logger.error(f"💥 Errore panoramica disponibilità: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/test', methods=['GET'])
 def test_api():
     """Endpoint di test API"""
@@ -826,43 +1210,26 @@ def test_api():
 # ====================================
 
 def cleanup_sessions():
-    """Rimuove sessioni più vecchie di 2 ore"""
-    cutoff = datetime.now() - timedelta(hours=2)
-    to_remove = []
-    
-    for session_id, data in session_cache.items():
-        if data.get('timestamp', datetime.min) < cutoff:
-            to_remove.append(session_id)
-    
-    for session_id in to_remove:
-        del session_cache[session_id]
-    
-    logger.info(f"🧹 Cleanup: rimosse {len(to_remove)} sessioni scadute")
+    """Rimuove sessioni più vecchie di 2 ore (scadute per TTL)"""
+    removed = session_cache.purge_expired()
+    logger.info(f"🧹 Cleanup: rimosse {removed} sessioni scadute")
 
 # ====================================
 # MAIN EXECUTION
 # ====================================
 
-if __name__ == "__main__":
-    logger.info("🚀 [DEBUG] === AVVIO PAGURO OTTIMIZZATO - VILLA CELI PALINURO ===")
-    logger.info(f"📂 Database: {Config.DB_PATH}")
-    logger.info(f"🤖 Ollama: {Config.OLLAMA_URL}")
-    logger.info(f"🎯 Model: {Config.OLLAMA_MODEL}")
-    logger.info(f"🏖️ Località: Palinuro, Cilento")
-    logger.info(f"✨ Features: Post-processing, CTA forzati, Focus Villa Celi")
-    
-    # Lista endpoint registrati
-    logger.info("📋 [DEBUG] Endpoint registrati:")
-    for rule in app.url_map.iter_rules():
-        logger.info(f"   {rule.endpoint}: {rule.rule} {list(rule.methods)}")
-    
-    # Test database
+def startup_database_check():
+    """Test database all'avvio: migrazioni, conteggio record, coerenza settimane libere e VACUUM cache risposte"""
+    # Cache risposte: VACUUM e checkpoint qui, fuori dal percorso delle richieste
+    answer_store.vacuum()
+
     try:
         conn_test = get_db_connection()
         cursor_test = conn_test.execute("SELECT COUNT(*) FROM appartamenti;")
         count = cursor_test.fetchone()[0]
+        schema_version = get_schema_version(conn_test)
         conn_test.close()
-        logger.info(f"✅ Database OK - {count} record trovati nella tabella 'appartamenti'.")
+        logger.info(f"✅ Database OK - {count} record trovati nella tabella 'appartamenti' (schema v{schema_version}).")
     except Exception as e:
         logger.error(f"❌ Errore database: {e}")
         logger.info("🔧 Creando database vuoto...")
@@ -872,16 +1239,34 @@ if __name__ == "__main__":
             logger.info("✅ Database creato")
         except Exception as e2:
             logger.error(f"❌ Impossibile creare database: {e2}")
-    
-    # Test Ollama
+            return
+
+    # Orizzonte dei sabati esteso e settimane libere ricostruite se incoerenti:
+    # se nemmeno la ricostruzione basta l'avvio fallisce (RuntimeError)
+    conn = get_db_connection()
     try:
-        test_response = generate_ollama_response("Test connessione Villa Celi")
-        if test_response:
-            logger.info("✅ Ollama OK - Connessione riuscita")
-        else:
-            logger.warning("⚠️ Ollama Warning - Connessione fallita ma continuo")
-    except Exception as e:
-        logger.warning(f"⚠️ Ollama non disponibile: {e}")
+        maintain_free_weeks(conn)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    logger.info("🚀 [DEBUG] === AVVIO PAGURO OTTIMIZZATO - VILLA CELI PALINURO ===")
+    logger.info(f"📂 Database: {Config.DB_PATH}")
+    logger.info(f"🤖 Ollama: {Config.OLLAMA_URL}")
+    logger.info(f"🎯 Model: {Config.OLLAMA_MODEL}")
+    logger.info(f"🏖️ Località: Palinuro, Cilento")
+    logger.info(f"✨ Features: Post-processing, CTA forzati, Focus Villa Celi")
+    
+    # Lista endpoint registrati
+    logger.info("📋 [DEBUG] Endpoint registrati:")
+    for rule in app.url_map.iter_rules():
+        logger.info(f"   {rule.endpoint}: {rule.rule} {list(rule.methods)}")
+    
+    startup_database_check()
+    prepare_intent_model()
+    
+    # Ollama: caricamento del modello in background, il server parte subito
+    model_warmer.start()
     
     # Avvia server Flask
     port = int(os.environ.get('PORT', 5000))
@@ -892,7 +1277,9 @@ if __name__ == "__main__":
     logger.info("   - GET  /api/health")
     logger.info("   - POST /api/chat")
     logger.info("   - POST /api/chatbot")
+    logger.info("   - POST /api/chat/stream (SSE)")
     logger.info("   - GET  /api/db/appartamenti")
+    logger.info("   - GET  /api/availability/overview")
     logger.info("   - GET  /api/test")
     
     try:
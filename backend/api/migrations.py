@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Migrazioni schema database Villa Celi
+Migrazioni versionate applicate all'avvio, con indici di copertura per la
+tabella appartamenti e controllo EXPLAIN QUERY PLAN delle query calde
+"""
+
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Contatore modifiche di appartamenti mantenuto dai trigger (migrazione 3, anche per chat_handler)
+DATA_VERSION_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS appartamenti_versione (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versione INTEGER NOT NULL
+    )
+    ''',
+    "INSERT OR IGNORE INTO appartamenti_versione (id, versione) VALUES (1, 0)",
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_appartamenti_versione_insert AFTER INSERT ON appartamenti
+    BEGIN UPDATE appartamenti_versione SET versione = versione + 1 WHERE id = 1; END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_appartamenti_versione_update AFTER UPDATE ON appartamenti
+    BEGIN UPDATE appartamenti_versione SET versione = versione + 1 WHERE id = 1; END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_appartamenti_versione_delete AFTER DELETE ON appartamenti
+    BEGIN UPDATE appartamenti_versione SET versione = versione + 1 WHERE id = 1; END
+    ''',
+]
+
+# (versione, descrizione, statement) - mai modificare una migrazione già rilasciata
+MIGRATIONS = [
+    (1, "Tabella prenotazioni appartamenti", [
+        '''
+        CREATE TABLE IF NOT EXISTS appartamenti (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            appartamento TEXT NOT NULL,
+            check_in TEXT NOT NULL,
+            check_out TEXT NOT NULL
+        )
+        ''',
+    ]),
+    (2, "Indice di copertura appartamento/periodo", [
+        "CREATE INDEX IF NOT EXISTS idx_appartamenti_periodo ON appartamenti (appartamento, check_in, check_out)",
+    ]),
+    (3, "Contatore modifiche prenotazioni", DATA_VERSION_SCHEMA),
+    (4, "Settimane libere materializzate e aggiornate dai trigger", [
+        '''
+        CREATE TABLE IF NOT EXISTS calendario_sabati (
+            week_start TEXT PRIMARY KEY,
+            week_end TEXT NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT OR IGNORE INTO calendario_sabati (week_start, week_end)
+        WITH RECURSIVE sabati(giorno) AS (
+            SELECT '2020-01-04'
+            UNION ALL
+            SELECT date(giorno, '+7 days') FROM sabati WHERE giorno < '2040-12-22'
+        )
+        SELECT giorno, date(giorno, '+7 days') FROM sabati
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS settimane_libere (
+            appartamento TEXT NOT NULL,
+            week_start TEXT NOT NULL,
+            week_end TEXT NOT NULL,
+            PRIMARY KEY (appartamento, week_start)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_settimane_libere_periodo ON settimane_libere (week_start, appartamento)",
+        '''
+        INSERT OR IGNORE INTO settimane_libere (appartamento, week_start, week_end)
+        SELECT u.appartamento, s.week_start, s.week_end
+        FROM (SELECT DISTINCT appartamento FROM appartamenti) u
+        CROSS JOIN calendario_sabati s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM appartamenti b
+            WHERE b.appartamento = u.appartamento
+              AND b.check_in < s.week_end AND b.check_out > s.week_start AND b.check_out > b.check_in
+        )
+        ''',
+        # Nuova prenotazione: prima prenotazione dell'appartamento -> tutte le settimane libere,
+        # poi rimuove le settimane che si sovrappongono al nuovo periodo
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_settimane_libere_insert AFTER INSERT ON appartamenti
+        BEGIN
+            INSERT OR IGNORE INTO settimane_libere (appartamento, week_start, week_end)
+            SELECT NEW.appartamento, s.week_start, s.week_end FROM calendario_sabati s
+            WHERE NOT EXISTS (SELECT 1 FROM appartamenti WHERE appartamento = NEW.appartamento AND id <> NEW.id);
+
+            DELETE FROM settimane_libere
+            WHERE appartamento = NEW.appartamento
+              AND week_start < NEW.check_out AND week_end > NEW.check_in AND NEW.check_out > NEW.check_in;
+        END
+        ''',
+        # Prenotazione cancellata: ripristina solo le settimane del vecchio periodo rimaste libere
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_settimane_libere_delete AFTER DELETE ON appartamenti
+        BEGIN
+            INSERT OR IGNORE INTO settimane_libere (appartamento, week_start, week_end)
+            SELECT OLD.appartamento, s.week_start, s.week_end FROM calendario_sabati s
+            WHERE s.week_start < OLD.check_out AND s.week_end > OLD.check_in
+              AND EXISTS (SELECT 1 FROM appartamenti WHERE appartamento = OLD.appartamento)
+              AND NOT EXISTS (
+                  SELECT 1 FROM appartamenti b
+                  WHERE b.appartamento = OLD.appartamento
+                    AND b.check_in < s.week_end AND b.check_out > s.week_start AND b.check_out > b.check_in
+              );
+
+            DELETE FROM settimane_libere
+            WHERE appartamento = OLD.appartamento
+              AND NOT EXISTS (SELECT 1 FROM appartamenti WHERE appartamento = OLD.appartamento);
+        END
+        ''',
+        # Prenotazione modificata: equivale a cancellare OLD e inserire NEW
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_settimane_libere_update AFTER UPDATE ON appartamenti
+        BEGIN
+            INSERT OR IGNORE INTO settimane_libere (appartamento, week_start, week_end)
+            SELECT NEW.appartamento, s.week_start, s.week_end FROM calendario_sabati s
+            WHERE NOT EXISTS (SELECT 1 FROM appartamenti WHERE appartamento = NEW.appartamento AND id <> NEW.id);
+
+            DELETE FROM settimane_libere
+            WHERE appartamento = NEW.appartamento
+              AND week_start < NEW.check_out AND week_end > NEW.check_in AND NEW.check_out > NEW.check_in;
+
+            INSERT OR IGNORE INTO settimane_libere (appartamento, week_start, week_end)
+            SELECT OLD.appartamento, s.week_start, s.week_end FROM calendario_sabati s
+            WHERE s.week_start < OLD.check_out AND s.week_end > OLD.check_in
+              AND EXISTS (SELECT 1 FROM appartamenti WHERE appartamento = OLD.appartamento)
+              AND NOT EXISTS (
+                  SELECT 1 FROM appartamenti b
+                  WHERE b.appartamento = OLD.appartamento
+                    AND b.check_in < s.week_end AND b.check_out > s.week_start AND b.check_out > b.check_in
+              );
+
+            DELETE FROM settimane_libere
+            WHERE appartamento = OLD.appartamento
+              AND NOT EXISTS (SELECT 1 FROM appartamenti WHERE appartamento = OLD.appartamento);
+        END
+        ''',
+    ]),
+]
+
+# Query calde sulle prenotazioni che non devono mai tornare a una scansione completa della
+# tabella (quelle della disponibilità sono in availability_materialized.HOT_QUERIES)
+HOT_QUERIES = {
+    "elenco_appartamenti": ("SELECT DISTINCT appartamento FROM appartamenti ORDER BY appartamento;", ()),
+    "periodi_occupati": ('''
+        SELECT check_in, check_out FROM appartamenti
+        WHERE appartamento = ? AND check_in < ? AND check_out > ?
+        ORDER BY check_in;
+    ''', ('Corallo', '2025-08-01', '2025-07-01')),
+    "debug_prenotazioni": ("SELECT id, appartamento, check_in, check_out FROM appartamenti ORDER BY appartamento, check_in LIMIT 50;", ()),
+}
+
+
+def get_schema_version(conn):
+    """Versione schema registrata nel DB (0 se mai migrato)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            descrizione TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations;").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn):
+    """Applica le migrazioni mancanti (connessione in autocommit) e aggiorna le statistiche"""
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Ricontrolla dentro la transazione: un altro worker potrebbe averla già applicata
+            if version <= get_schema_version(conn):
+                conn.execute("COMMIT")
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, descrizione, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        applied.append(version)
+        logger.info(f"🔧 Migrazione {version} applicata: {description}")
+
+    if applied:
+        conn.execute("ANALYZE")
+        logger.info(f"📊 ANALYZE completato, schema alla versione {get_schema_version(conn)}")
+    return applied
+
+
+def get_data_version(conn):
+    """Contatore modifiche della tabella appartamenti (aggiornato dai trigger)"""
+    row = conn.execute("SELECT versione FROM appartamenti_versione WHERE id = 1;").fetchone()
+    return row[0] if row else 0
+
+
+def db_file_id(db_path):
+    """Identità del file DB (st_dev, st_ino): cambia se il file viene sostituito"""
+    db_file = os.stat(db_path)
+    return db_file.st_dev, db_file.st_ino
+
+
+def booking_data_version(conn, db_path):
+    """Versione dei dati prenotazioni: identità del file DB + contatore aggiornato dai trigger"""
+    return db_file_id(db_path) + (get_data_version(conn),)
+
+
+def explain_query_plan(conn, sql, params=()):
+    """Dettagli del piano di esecuzione SQLite per una query"""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def full_table_scans(conn, queries=None):
+    """Query calde il cui piano scansiona prenotazioni o settimane libere senza indice"""
+    offending = {}
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        plan = explain_query_plan(conn, sql, params)
+        scans = [step for step in plan if step.split(' ')[:2] in (['SCAN', 'appartamenti'], ['SCAN', 'settimane_libere'])
+                 and 'INDEX' not in step]
+        if scans:
+            offending[name] = plan
+    return offending
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Preriscaldamento modello Ollama per Villa Celi
+All'avvio carica il modello in background (senza bloccare il server) e,
+durante l'orario di lavoro, lo tiene in memoria con ping leggeri periodici
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def parse_hours(spec):
+    """'8-23' -> (8, 23): fascia oraria [inizio, fine) in cui tenere caldo il modello"""
+    start, end = (int(part) for part in spec.split('-'))
+    return start, end
+
+
+class ModelWarmer:
+    """Carica il modello con una richiesta senza prompt e keep_alive, poi lo mantiene caldo"""
+
+    def __init__(self, client, model, keep_alive='30m', ping_interval=240, business_hours=(8, 23),
+                 retry_interval=10, load_timeout=(3.05, 120), now=datetime.now):
+        self.client = client  # OllamaClient
+        self.model = model
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval  # secondi, minore del keep_alive
+        self.business_hours = business_hours
+        self.retry_interval = retry_interval
+        self.load_timeout = load_timeout  # il primo caricamento su CPU può durare ben oltre OLLAMA_TIMEOUT
+        self._now = now
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = {
+            "loaded": False,
+            "last_warmup": None,
+            "warmup_ms": None,
+            "last_error": None,
+            "pings": 0,
+            "checked_at": None,  # ultimo controllo su /api/ps del thread di background
+        }
+
+    def payload(self):
+        """Richiesta senza prompt: Ollama carica il modello e risponde subito"""
+        return {"model": self.model, "keep_alive": self.keep_alive}
+
+    def in_business_hours(self):
+        start, end = self.business_hours
+        return start <= self._now().hour < end
+
+    def warm_up(self):
+        """Carica (o rinnova) il modello; True se Ollama ha risposto"""
+        started = time.monotonic()
+        try:
+            self.client.generate(self.payload(), timeout=self.load_timeout)
+        except Exception as e:
+            self._state.update(loaded=False, last_error=str(e))
+            logger.warning(f"🔥 Preriscaldamento {self.model} fallito: {e}")
+            return False
+        elapsed_ms = round((time.monotonic() - started) * 1000)
+        self._state.update(loaded=True, last_warmup=self._now().isoformat(), warmup_ms=elapsed_ms, last_error=None)
+        self._state["pings"] += 1
+        logger.info(f"🔥 Modello {self.model} caldo ({elapsed_ms} ms, keep_alive {self.keep_alive})")
+        return True
+
+    def refresh(self):
+        """Verifica su /api/ps se il modello è caricato e aggiorna lo stato in cache"""
+        try:
+            loaded = self.client.loaded_models()
+        except Exception as e:
+            self._state.update(loaded=None, last_error=str(e))  # stato sconosciuto: Ollama non raggiungibile
+        else:
+            self._state["loaded"] = any(name == self.model or name.split(':')[0] == self.model for name in loaded)
+        self._state["checked_at"] = self._now().isoformat()
+        return self._state["loaded"]
+
+    def _run(self):
+        # Avvio: riprova finché Ollama non risponde (il container può partire dopo di noi)
+        while not self._stop.is_set() and not self.warm_up():
+            self._stop.wait(self.retry_interval)
+        # Poi ping periodici solo in orario di lavoro: di notte Ollama può scaricare il modello,
+        # quindi fuori orario si aggiorna solo lo stato letto da /api/health
+        while not self._stop.wait(self.ping_interval):
+            if self.in_business_hours():
+                self.warm_up()
+            else:
+                self.refresh()
+
+    def start(self):
+        """Avvia il preriscaldamento in background (idempotente)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ollama-warmup', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self, check=False):
+        """
+        Stato per /api/health letto dalla cache aggiornata dal thread di background
+        (nessuna chiamata a Ollama); con check=True verifica prima su /api/ps
+        """
+        if check:
+            self.refresh()
+        return dict(self._state, model=self.model, keep_alive=self.keep_alive,
+                    business_hours=f"{self.business_hours[0]}-{self.business_hours[1]}")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Client HTTP Ollama per Villa Celi
+Sessione requests condivisa (connessioni keep-alive in pool), timeout di
+connessione e lettura separati, retry con jitter sui reset di connessione
+e metriche di latenza per chiamata
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaClient:
+    """Client Ollama thread-safe: una sessione, connessioni TCP riutilizzate tra le chiamate"""
+
+    def __init__(self, url, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.2,
+                 pool_size=10, session=None, latency_window=200):
+        self.url = url
+        self.base_url = url.split('/api/')[0]  # http://host:11434
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.session = session or requests.Session()
+        if session is None:
+            # Nessun retry interno di urllib3: li gestiamo noi, solo sugli errori di connessione
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+        self._latencies = deque(maxlen=latency_window)  # ms, ultime chiamate riuscite
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "retries": 0}
+
+    def _post(self, payload, stream=False, timeout=None):
+        """POST con retry (backoff esponenziale + jitter) su connessione rifiutata o resettata"""
+        for attempt in range(self.retries + 1):
+            try:
+                return self.session.post(self.url, json=payload, timeout=timeout or self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError as e:
+                if attempt == self.retries:
+                    raise
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                with self._lock:
+                    self._stats["retries"] += 1
+                logger.warning(f"🔁 Connessione Ollama fallita ({e.__class__.__name__}), nuovo tentativo tra {delay:.2f}s")
+                time.sleep(delay)
+
+    def _record(self, started, ok):
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._stats["calls"] += 1
+            if ok:
+                self._latencies.append(elapsed_ms)
+            else:
+                self._stats["failures"] += 1
+        return elapsed_ms
+
+    def generate(self, payload, timeout=None):
+        """Completamento non in streaming: dizionario JSON di Ollama (solleva eccezioni requests)"""
+        started = time.monotonic()
+        try:
+            response = self._post(payload, timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+        except Exception:
+            self._record(started, ok=False)
+            raise
+        elapsed_ms = self._record(started, ok=True)
+        logger.info(f"⏱️ Ollama ha risposto in {elapsed_ms:.0f} ms")
+        return result
+
+    @contextmanager
+    def stream(self, payload, timeout=None):
+        """Risposta in streaming; la latenza registrata va fino alla chiusura dello stream"""
+        started = time.monotonic()
+        try:
+            response = self._post(payload, stream=True, timeout=timeout)
+        except Exception:
+            self._record(started, ok=False)
+            raise
+        ok = False
+        try:
+            yield response
+            ok = response.status_code == 200
+        finally:
+            # Chiudere la risposta interrompe la generazione se lo stream non è finito
+            response.close()
+            elapsed_ms = self._record(started, ok=ok)
+            logger.info(f"⏱️ Stream Ollama chiuso dopo {elapsed_ms:.0f} ms")
+
+    def loaded_models(self):
+        """Nomi dei modelli attualmente caricati in memoria da Ollama (/api/ps)"""
+        response = self.session.get(f"{self.base_url}/api/ps", timeout=(self.timeout[0], 5))
+        response.raise_for_status()
+        return [model.get("name") for model in response.json().get("models", [])]
+
+    def stats(self):
+        """Contatori e percentili di latenza per il monitoraggio"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._stats)
+        if latencies:
+            stats["latency_ms"] = {
+                "last": round(self._latencies[-1], 1),
+                "p50": round(latencies[len(latencies) // 2], 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "max": round(latencies[-1], 1),
+            }
+        return stats
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Avvio asincrono (gevent) per Villa Celi
+Ogni richiesta gira in una greenlet: mentre una conversazione aspetta Ollama
+le risposte predefinite e di disponibilità continuano a essere servite.
+Uso: python serve_async.py  (oppure gunicorn -c gunicorn.conf.py)
+"""
+
+# Deve precedere ogni altro import: socket, ssl e time.sleep diventano cooperativi
+from gevent import monkey
+monkey.patch_all()
+
+import logging  # noqa: E402
+import os  # noqa: E402
+
+from gevent.pool import Pool  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+
+import main  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def serve():
+    port = int(os.environ.get('PORT', 5000))
+    host = os.environ.get('HOST', '0.0.0.0')
+    main.startup_database_check()
+    main.prepare_intent_model()
+    main.model_warmer.start()
+
+    # Il pool limita le greenlet: oltre ASYNC_MAX_CONNECTIONS le nuove connessioni attendono
+    server = WSGIServer((host, port), main.app, spawn=Pool(main.Config.ASYNC_MAX_CONNECTIONS), log=None)
+    logger.info(f"🚀 Paguro asincrono (gevent) su http://{host}:{port}, "
+                f"max {main.Config.ASYNC_MAX_CONNECTIONS} richieste concorrenti")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    serve()
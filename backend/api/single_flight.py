@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Coalescenza richieste identiche per Villa Celi
+Più chiamate concorrenti con la stessa chiave eseguono la funzione una sola
+volta: le altre attendono e ricevono lo stesso risultato (o la stessa eccezione)
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Una sola esecuzione in corso per chiave (thread e greenlet)"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "coalesced": 0, "timeouts": 0}
+
+    def do(self, key, func, timeout=None):
+        """
+        Esegue func() se nessuno lo sta già facendo per key, altrimenti attende
+        il risultato in corso. TimeoutError se l'attesa supera timeout secondi
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+            else:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise TimeoutError(f"attesa oltre {timeout}s per una richiesta identica in corso")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self):
+        """Numero di chiavi con un'esecuzione in corso"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Contatori per il monitoraggio"""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
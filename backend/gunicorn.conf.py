@@ -0,0 +1,30 @@
+# 🐚 Paguro - Configurazione gunicorn per Villa Celi
+# Worker gevent: un processo regge centinaia di conversazioni in attesa di Ollama
+# Uso (dalla cartella backend): gunicorn -c gunicorn.conf.py
+
+import os
+
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+wsgi_app = 'main:app'
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))  # cache e sessioni sono in memoria per processo
+worker_connections = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 1000))
+
+# Una risposta Ollama in streaming può durare più del timeout di lettura per singolo chunk
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_worker_init(worker):
+    """
+    Ogni worker applica le migrazioni, verifica le settimane libere e prepara il
+    modello di intenti (come l'avvio diretto di main.py), poi carica il modello
+    Ollama in background
+    """
+    import main
+    main.startup_database_check()
+    main.prepare_intent_model()
+    main.model_warmer.start()
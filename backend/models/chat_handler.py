@@ -2,10 +2,19 @@ import re
 import json
 import logging
 from datetime import datetime, timedelta
-from cachetools import TTLCache
+import requests
 from collections import defaultdict
 import sqlite3
 import os
+import time
+
+from api.cache import LRUCache
+from api.circuit_breaker import CircuitBreaker
+from api.db_pool import ConnectionPool
+from api.keyword_automaton import KeywordAutomaton
+from api.apartment_registry import ApartmentRegistry
+from api.migrations import DATA_VERSION_SCHEMA, booking_data_version
+from api.ollama_client import OllamaClient
 
 # --- Configurazione ---
 # Puoi definire le variabili di configurazione qui o in un file config.py separato
@@ -14,6 +23,9 @@ class Config:
     DATABASE_PATH = os.environ.get('DB_PATH', 'data/affitti2025.db') # Percorso del database SQLite
     OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434/api/generate')
     MODEL = os.environ.get('MODEL', 'llama3.2:1b')
+    OLLAMA_CONNECT_TIMEOUT = 3.05
+    OLLAMA_READ_TIMEOUT = 60
+    APARTMENT_MATCH_THRESHOLD = float(os.environ.get('APARTMENT_MATCH_THRESHOLD', 0.8))
 
 config = Config()
 
@@ -27,16 +39,42 @@ MONTH_MAP = {
     'luglio': 7, 'agosto': 8, 'settembre': 9, 'ottobre': 10, 'novembre': 11, 'dicembre': 12
 }
 
+# --- Parole chiave: un solo automa per tipi di richiesta e mesi ---
+chat_keywords = KeywordAutomaton()
+chat_keywords.add_all(['prezzi', 'costo', 'quanto costa', 'tariffe', 'preventivo'], 'price')
+chat_keywords.add_all(['dove si trova', 'indicazioni', 'come arrivare', 'mappa', 'strada'], 'directions')
+chat_keywords.add_all(['disponibilità', 'libero'], 'availability')
+for month_name, month_num in MONTH_MAP.items():
+    chat_keywords.add(month_name, 'month', priority=month_num, value=month_num)
+chat_keywords.build()
+
+def detect_month(matches):
+    """Primo mese di MONTH_MAP trovato tra le parole chiave, None se assente"""
+    best = matches.best('month')
+    return best.value if best else None
+
 # --- Cache per la sessione (TTL: 30 minuti) ---
-session_cache = TTLCache(maxsize=1000, ttl=1800) # 1000 sessioni, 30 minuti di TTL
+session_cache = LRUCache(maxsize=1000, ttl=1800) # 1000 sessioni, 30 minuti di TTL
+
+# --- Pool connessioni (una connessione long-lived per thread) ---
+# row_factory sqlite3.Row permette di accedere alle colonne per nome
+db_pool = ConnectionPool(config.DATABASE_PATH, row_factory=sqlite3.Row, isolation_level="")
+
+# --- Client Ollama (sessione keep-alive condivisa, retry sui reset di connessione) ---
+ollama_client = OllamaClient(
+    config.OLLAMA_URL,
+    connect_timeout=config.OLLAMA_CONNECT_TIMEOUT,
+    read_timeout=config.OLLAMA_READ_TIMEOUT
+)
+
+# Con Ollama sovraccarico le richieste falliscono subito invece di attendere il timeout
+ollama_breaker = CircuitBreaker(slow_call_ms=45000, max_timeout=config.OLLAMA_READ_TIMEOUT, min_timeout=10)
 
 # --- Funzioni di utilità del database ---
 def get_db_connection():
-    """Stabilisce una connessione al database SQLite."""
+    """Restituisce la connessione SQLite del thread corrente dal pool."""
     try:
-        conn = sqlite3.connect(config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row # Permette di accedere alle colonne per nome
-        return conn
+        return db_pool.connection()
     except sqlite3.Error as e:
         logger.error(f"Errore connessione al database: {e}")
         return None
@@ -67,6 +105,9 @@ def initialize_db():
                     FOREIGN KEY (appartamento_id) REFERENCES appartamenti(id)
                 );
             """)
+            # Contatore modifiche aggiornato dai trigger, come nel DB dell'API
+            for statement in DATA_VERSION_SCHEMA:
+                cursor.execute(statement)
             # Esempio di dati iniziali (se il DB è vuoto)
             cursor.execute("INSERT OR IGNORE INTO appartamenti (nome, descrizione) VALUES ('Appartamento A', 'Monolocale accogliente');")
             cursor.execute("INSERT OR IGNORE INTO appartamenti (nome, descrizione) VALUES ('Appartamento B', 'Bilocale con vista mare');")
@@ -80,21 +121,39 @@ def initialize_db():
 # Inizializza il database all'avvio
 initialize_db()
 
+def load_apartment_names():
+    """Nomi distinti degli appartamenti presenti nel DB."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute("SELECT DISTINCT nome FROM appartamenti;")
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def data_version():
+    """Versione dei dati (file DB + contatore dei trigger): stesso segnale del registro in main."""
+    conn = get_db_connection()
+    try:
+        return booking_data_version(conn, config.DATABASE_PATH)
+    finally:
+        conn.close()
+
+# Registro nomi appartamenti: caricato una volta, ricaricato quando il DB cambia
+apartment_registry = ApartmentRegistry(load_apartment_names, data_version,
+                                       fuzzy_threshold=config.APARTMENT_MATCH_THRESHOLD)
+
 # --- Funzioni di analisi e logica ---
 
 def analyze_message(message):
     """Analizza il messaggio per identificare il tipo di richiesta."""
     message_lower = message.lower().strip()
+    matches = chat_keywords.scan(message_lower)
 
-    detected_month = None
     detected_year = None
     detected_apartment = None
 
     # Estrazione mese
-    for month_name, month_num in MONTH_MAP.items():
-        if month_name in message_lower:
-            detected_month = month_num
-            break
+    detected_month = detect_month(matches)
     
     # Estrazione anno
     year_match = re.search(r'202[4-9]|20[3-9]\d', message_lower)
@@ -110,27 +169,19 @@ def analyze_message(message):
     else:
         detected_year = datetime.now().year
 
-    # Estrazione appartamento
+    # Estrazione appartamento (registro in cache, una sola regex compilata)
     try:
-        conn = get_db_connection()
-        cursor = conn.execute("SELECT DISTINCT nome FROM appartamenti;")
-        apartment_names_in_db = [row[0].lower() for row in cursor.fetchall()]
-        conn.close()
-        
-        for apt_name in apartment_names_in_db:
-            if re.search(r'\b' + re.escape(apt_name) + r'\b', message_lower):
-                detected_apartment = apt_name
-                break
+        detected_apartment = apartment_registry.find_fuzzy(message_lower)
     except Exception as e:
         logger.error(f"Errore recupero nomi appartamenti: {e}")
         # Continua anche in caso di errore, trattando come general_query
 
     # Determinazione del tipo di query
-    if any(keyword in message_lower for keyword in ['prezzi', 'costo', 'quanto costa', 'tariffe', 'preventivo']):
+    if 'price' in matches:
         return "price_request"
-    elif any(keyword in message_lower for keyword in ['dove si trova', 'indicazioni', 'come arrivare', 'mappa', 'strada']):
+    elif 'directions' in matches:
         return "directions_request"
-    elif "disponibilità" in message_lower or "libero" in message_lower:
+    elif 'availability' in matches:
         return "availability_query"
     elif detected_month and detected_apartment:
         return "availability_query"
@@ -312,19 +363,20 @@ def handle_booking_choice(booking_choice, session_id):
 
 def get_ollama_response(prompt):
     """Invia una richiesta al modello Ollama per una risposta generica."""
+    if not ollama_breaker.allow():
+        logger.warning("Circuit breaker aperto: Ollama non viene chiamato.")
+        return "Mi dispiace, il servizio di intelligenza artificiale non è al momento disponibile. Riprova più tardi."
+    started = time.monotonic()
     try:
-        import requests
-        headers = {'Content-Type': 'application/json'}
         data = {
             "model": config.MODEL,
             "prompt": prompt,
             "stream": False # Non vogliamo lo streaming per questa API
         }
         logger.info(f"Invio prompt a Ollama: {prompt[:100]}...")
-        response = requests.post(config.OLLAMA_URL, headers=headers, data=json.dumps(data), timeout=60)
-        response.raise_for_status() # Lancia un errore per status codes non 2xx
-        
-        result = response.json()
+        # Timeout di lettura adattato al p95 delle risposte recenti
+        result = ollama_client.generate(data, timeout=(config.OLLAMA_CONNECT_TIMEOUT, ollama_breaker.timeout()))
+        ollama_breaker.record_success((time.monotonic() - started) * 1000)
         if 'response' in result:
             logger.info("Risposta da Ollama ricevuta.")
             return result['response'].strip()
@@ -332,12 +384,15 @@ def get_ollama_response(prompt):
             logger.warning("Risposta Ollama non contiene 'response' key.")
             return "Mi dispiace, c'è stato un problema nel recuperare la risposta. Riprova più tardi."
     except requests.exceptions.RequestException as e:
+        ollama_breaker.record_failure((time.monotonic() - started) * 1000)
         logger.error(f"Errore di richiesta a Ollama: {e}")
         return "Mi dispiace, il servizio di intelligenza artificiale non è al momento disponibile. Riprova più tardi."
     except json.JSONDecodeError as e:
+        ollama_breaker.record_failure((time.monotonic() - started) * 1000)
         logger.error(f"Errore nel parsing della risposta JSON da Ollama: {e}")
         return "Mi dispiace, ho ricevuto una risposta non valida dal servizio di intelligenza artificiale."
     except Exception as e:
+        ollama_breaker.record_failure((time.monotonic() - started) * 1000)
         logger.error(f"Errore generico in get_ollama_response: {e}")
         return "Si è verificato un errore inatteso. Per favore, riprova."
 
@@ -382,29 +437,18 @@ def handle_query_complete(query, session_id):
         }
     elif query_type == "availability_query":
         # Estrarre mese, anno, appartamento dal messaggio se presenti
-        detected_month = None
         detected_year = None
         detected_apartment = None
         
         message_lower = query.lower().strip()
-        for month_name, month_num in MONTH_MAP.items():
-            if month_name in message_lower:
-                detected_month = month_num
-                break
+        detected_month = detect_month(chat_keywords.scan(message_lower))
         
         year_match = re.search(r'202[4-9]|20[3-9]\d', message_lower)
         if year_match:
             detected_year = int(year_match.group(0))
 
         try:
-            conn = get_db_connection()
-            cursor = conn.execute("SELECT DISTINCT nome FROM appartamenti;")
-            apartment_names_in_db = [row[0].lower() for row in cursor.fetchall()]
-            conn.close()
-            for apt_name in apartment_names_in_db:
-                if re.search(r'\b' + re.escape(apt_name) + r'\b', message_lower):
-                    detected_apartment = apt_name
-                    break
+            detected_apartment = apartment_registry.find_fuzzy(message_lower)
         except Exception as e:
             logger.error(f"Errore durante l'estrazione appartamento per availability_query: {e}")
 
@@ -412,7 +456,7 @@ def handle_query_complete(query, session_id):
         formatted_message = format_availability(availability_list)
         
         session_data['availability_data'] = availability_list # Salva in sessione per la scelta successiva
-        session_cache[session_id] = session_data
+        session_cache.put(session_id, session_data)
 
         response_data = {
             "message": formatted_message,
@@ -479,7 +523,7 @@ if __name__ == '__main__':
             "check_out_formatted": "12/07/2025",
             "index": 1
         }]
-        session_cache[test_session_id] = session_data_for_booking
+        session_cache.put(test_session_id, session_data_for_booking)
         print("\n(Aggiunti dati di esempio per il test di prenotazione)")
 
     print("\nTest 5: Scelta di prenotazione (numero 1)")
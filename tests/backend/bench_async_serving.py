@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Benchmark serving asincrono (gevent) con Ollama lento
+Centinaia di conversazioni in attesa dell'LLM e, nel frattempo, risposte
+predefinite che non devono accodarsi dietro di loro. Di default LLM_SLOTS copre
+tutte le conversazioni (si misura il serving, non lo scarto della coda): con
+LLM_SLOTS/LLM_MAX_QUEUE impostati si vedono servite e scartate separatamente.
+Uso: python tests/backend/bench_async_serving.py [conversazioni_llm] [ritardo_ollama_s]
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import json  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+import requests  # noqa: E402
+from gevent.pool import Pool  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+
+OLLAMA_PORT, PAGURO_PORT = 18434, 18500
+PENDING = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+OLLAMA_DELAY = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+BENCH_DIR = tempfile.mkdtemp(prefix='paguro_bench_')
+os.environ['DB_PATH'] = os.path.join(BENCH_DIR, 'affitti.db')
+os.environ['ANSWER_CACHE_PATH'] = os.path.join(BENCH_DIR, 'risposte.db')
+os.environ['INTENT_MODEL_PATH'] = os.path.join(BENCH_DIR, 'intent_model.npz')
+os.environ['ANSWER_BOOK_PATH'] = os.path.join(BENCH_DIR, 'answer_book.json')
+os.environ.setdefault('LLM_SLOTS', str(PENDING))
+os.environ.setdefault('LLM_MAX_QUEUE', '0')
+os.environ['OLLAMA_URL'] = f"http://127.0.0.1:{OLLAMA_PORT}/api/generate"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'api'))
+
+import main  # noqa: E402
+
+
+def fake_ollama(environ, start_response):
+    """Ollama finto: attende OLLAMA_DELAY secondi, poi risponde in streaming"""
+    gevent.sleep(OLLAMA_DELAY)
+    start_response('200 OK', [('Content-Type', 'application/x-ndjson')])
+    return [json.dumps({"response": "Palinuro ti aspetta a Villa Celi.", "done": False}).encode() + b"\n",
+            json.dumps({"response": "", "done": True}).encode() + b"\n"]
+
+
+def post(message):
+    started = time.perf_counter()
+    response = requests.post(f"http://127.0.0.1:{PAGURO_PORT}/api/chat", json={"message": message}, timeout=60)
+    return response.json()["type"], time.perf_counter() - started
+
+
+def main_bench():
+    WSGIServer(('127.0.0.1', OLLAMA_PORT), fake_ollama, spawn=Pool(PENDING + 10), log=None).start()
+    main.startup_database_check()
+    WSGIServer(('127.0.0.1', PAGURO_PORT), main.app, spawn=Pool(main.Config.ASYNC_MAX_CONNECTIONS), log=None).start()
+
+    started = time.perf_counter()
+    # Prompt tutti diversi (niente cache); niente cifre, verrebbero lette come scelta di prenotazione
+    llm_calls = [gevent.spawn(post, f"raccontami una storia {'x' * i}") for i in range(PENDING)]
+    gevent.sleep(0.5)  # tutte le conversazioni LLM ora sono in attesa di Ollama
+
+    fast = [post("ciao") for _ in range(20)]
+    gevent.joinall(llm_calls)
+    total = time.perf_counter() - started
+
+    llm_types = [call.value[0] for call in llm_calls]
+    fast_latency = sorted(latency for _, latency in fast)
+    scheduler = main.llm_scheduler.stats()
+    shed = sum(count for name, count in scheduler.items() if name.startswith('shed_'))
+    print(f"🐚 {PENDING} conversazioni LLM concorrenti, Ollama finto con {OLLAMA_DELAY:.1f}s di latenza "
+          f"(LLM_SLOTS={main.Config.LLM_SLOTS}, LLM_MAX_QUEUE={main.Config.LLM_MAX_QUEUE})")
+    print(f"✅ Risposte Ollama: {llm_types.count('ollama_response')}/{PENDING} in {total:.2f}s "
+          f"(sequenziale: {PENDING * OLLAMA_DELAY:.0f}s)")
+    print(f"🚦 Scartate dallo scheduler: {shed}/{PENDING}, altri fallback: "
+          f"{llm_types.count('fallback_response') - shed}")
+    print(f"⚡ Saluti serviti nel frattempo: p50 {fast_latency[len(fast_latency) // 2] * 1000:.1f} ms, "
+          f"max {fast_latency[-1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main_bench()
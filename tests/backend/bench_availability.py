@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Benchmark settimane libere materializzate e query SQL vs ciclo originale
+Uso: python tests/backend/bench_availability.py [numero_prenotazioni]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'api'))
+
+from availability_materialized import MaterializedAvailabilityEngine  # noqa: E402
+from availability_sql import SqlAvailabilityEngine  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+
+APARTMENTS = [f"Appartamento{i:02d}" for i in range(30)]
+
+
+def create_db(path, bookings_count):
+    """Popola un DB temporaneo con prenotazioni casuali su tre stagioni"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('''
+        CREATE TABLE appartamenti (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            appartamento TEXT NOT NULL,
+            check_in TEXT NOT NULL,
+            check_out TEXT NOT NULL
+        )
+    ''')
+    rng = random.Random(7)
+    rows = []
+    for _ in range(bookings_count):
+        ci = date(2024, 1, 1) + timedelta(days=rng.randrange(3 * 365))
+        co = ci + timedelta(days=rng.choice([3, 7, 7, 14]))
+        rows.append((rng.choice(APARTMENTS), ci.isoformat(), co.isoformat()))
+    conn.executemany("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES (?, ?, ?)", rows)
+    return conn
+
+
+def legacy_query(conn, month, year):
+    """Ciclo originale di query_appartamenti: una query e un confronto lineare per appartamento"""
+    apartments = [row[0] for row in conn.execute("SELECT DISTINCT appartamento FROM appartamenti ORDER BY appartamento;")]
+    start_month_date = datetime(year, month, 1)
+    end_month_date = datetime(year, 12, 31) if month == 12 else datetime(year, month + 1, 1) - timedelta(days=1)
+    results = []
+    for apt in apartments:
+        occupied = [
+            (datetime.strptime(ci, '%Y-%m-%d'), datetime.strptime(co, '%Y-%m-%d'))
+            for ci, co in conn.execute(
+                "SELECT check_in, check_out FROM appartamenti WHERE appartamento = ? AND check_in <= ? AND check_out >= ? ORDER BY check_in;",
+                (apt, end_month_date.strftime('%Y-%m-%d'), start_month_date.strftime('%Y-%m-%d')))
+        ]
+        current_saturday = start_month_date
+        while current_saturday.weekday() != 5:
+            current_saturday -= timedelta(days=1)
+        while current_saturday <= end_month_date:
+            week_end = current_saturday + timedelta(days=7)
+            if all(not (current_saturday < co and week_end > ci) for ci, co in occupied):
+                results.append((apt, current_saturday, week_end))
+            current_saturday += timedelta(days=7)
+    return results
+
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:<28} {elapsed:8.3f} ms/query")
+    return elapsed
+
+
+def main():
+    bookings_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        conn = create_db(db_path, bookings_count)
+        print(f"🐚 {bookings_count} prenotazioni, {len(APARTMENTS)} appartamenti")
+
+        start = time.perf_counter()
+        apply_migrations(conn)
+        print(f"{'Migrazioni + materializzazione':<28} {(time.perf_counter() - start) * 1000:8.3f} ms (una tantum)")
+
+        materialized, sql = MaterializedAvailabilityEngine(), SqlAvailabilityEngine()
+        materialized.ensure_fresh(None, lambda: sqlite3.connect(db_path))
+        sql.ensure_fresh(None, lambda: sqlite3.connect(db_path))
+
+        legacy = timed("Ciclo originale (mese)", lambda: legacy_query(conn, 7, 2025), 20)
+        single = timed("Query SQL unica (mese)", lambda: sql.free_weeks(date(2025, 7, 1), date(2025, 7, 31)), 20)
+        lookup = timed("Materializzata (mese)", lambda: materialized.free_weeks(date(2025, 7, 1), date(2025, 7, 31)), 20)
+        print(f"⚡ Speedup SQL: {legacy / single:.1f}x, materializzata: {legacy / lookup:.1f}x")
+
+        season = timed("Ciclo originale (estate)", lambda: [legacy_query(conn, m, 2025) for m in range(6, 10)], 5)
+        timed("Query SQL unica (estate)", lambda: sql.free_weeks(date(2025, 6, 1), date(2025, 9, 30)), 20)
+        lookup = timed("Materializzata (estate)", lambda: materialized.free_weeks(date(2025, 6, 1), date(2025, 9, 30)), 20)
+        print(f"⚡ Speedup materializzata su stagione intera: {season / lookup:.1f}x")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Benchmark IntentEngine vs analisi sequenziale (versione precedente di analyze_message)
+Uso: python tests/backend/bench_intent_engine.py [ripetizioni]
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', '..', 'backend', 'api'))
+_TMP = tempfile.mkdtemp(prefix='paguro_bench_')
+os.environ.setdefault('DB_PATH', os.path.join(_TMP, 'bench.db'))
+os.environ.setdefault('ANSWER_CACHE_PATH', os.path.join(_TMP, 'risposte.db'))
+
+import main  # noqa: E402
+
+APARTMENTS = ['corallo', 'girasole', 'ginestra']
+
+
+def find_apartment(message_lower):
+    return next((name for name in APARTMENTS if name in message_lower), None)
+
+
+def sequential_analyze(message):
+    """analyze_message prima di IntentEngine: scansioni e re.search in sequenza"""
+    message_lower = message.lower().strip()
+    for keyword, response_key in main.PREDEFINED_PRIORITY.items():
+        if keyword in message_lower and response_key in main.PREDEFINED_RESPONSES:
+            return 'predefined_response', main.PREDEFINED_RESPONSES[response_key]
+    for key, response in main.PREDEFINED_RESPONSES.items():
+        if key in message_lower:
+            return 'predefined_response', response
+
+    if re.match(r'^\d+$', message_lower):
+        return 'booking_request', int(message_lower)
+    for pattern in [r'voglio prenotare.*(\d+)', r'prenota.*(\d+)', r'scelgo.*(\d+)',
+                    r'prendo.*(\d+)', r'numero.*(\d+)', r'la\s*(\d+)', r'il\s*(\d+)']:
+        match = re.search(pattern, message_lower)
+        if match:
+            return 'booking_request', int(match.group(1))
+
+    keywords = ['disponibilit', 'liber', 'case', 'libero', 'appartament', 'disponibil']
+    if any(word in message_lower for word in keywords) or main.period_parser.has_date_range(message_lower):
+        detected_month = next((num for name, num in main.MONTH_MAP.items() if name in message_lower), None)
+        year_match = re.search(r'202[4-9]|20[3-9]\d', message_lower)
+        now = datetime.now()
+        detected_year = int(year_match.group(0)) if year_match else (
+            (now.year + 1 if detected_month < now.month else now.year) if detected_month else None)
+        detected_apartment = find_apartment(message_lower)
+        periods = main.period_parser.parse(message_lower)
+        if periods:
+            return 'availability_range_request', {'ranges': periods, 'apartment': detected_apartment}
+        if detected_month and detected_year:
+            return 'availability_request', {'month': detected_month, 'year': detected_year, 'apartment': detected_apartment}
+        if detected_apartment and not detected_month:
+            return 'missing_info_availability', {'apartment': detected_apartment}
+
+    for pattern in [r'^ciao\s*$', r'^salve\s*$', r'^buongiorno\s*$', r'^buonasera\s*$',
+                    r'^help\s*$', r'^aiuto\s*$', r'^inizia\s*$']:
+        if re.match(pattern, message_lower):
+            return 'greeting', None
+    if 'test' in message_lower:
+        return 'test_request', None
+    return 'unknown', None
+
+
+def run(label, analyze, messages, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for message in messages:
+            analyze(message)
+    elapsed = time.perf_counter() - start
+    per_message_us = elapsed / (repeats * len(messages)) * 1e6
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms totali, {per_message_us:7.2f} µs/messaggio")
+    return per_message_us
+
+
+def main_bench():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logging.disable(logging.CRITICAL)
+    with open(os.path.join(HERE, 'intent_golden.json'), encoding='utf-8') as f:
+        messages = [case["message"] for case in json.load(f)["cases"]]
+    engine = main.IntentEngine(main.PREDEFINED_RESPONSES, main.PREDEFINED_PRIORITY, main.MONTH_MAP,
+                               main.period_parser, find_apartment)
+    mismatches = [m for m in messages if sequential_analyze(m) != engine.analyze(m)]
+    print(f"🐚 {len(messages)} messaggi del corpus, {repeats} ripetizioni, differenze: {len(mismatches)}")
+
+    baseline = run("Analisi sequenziale", sequential_analyze, messages, repeats)
+    optimized = run("IntentEngine", engine.analyze, messages, repeats)
+    print(f"⚡ Speedup IntentEngine: {baseline / optimized:.2f}x")
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+🐚 Paguro - Benchmark pool read-only (mode=ro + query_only) vs pool standard con lettori concorrenti
+Uso: python tests/backend/bench_read_pool.py [numero_prenotazioni] [thread]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'api'))
+
+from availability_sql import FREE_WEEKS_QUERY  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+
+APARTMENTS = [f"Appartamento{i:02d}" for i in range(30)]
+QUERIES_PER_THREAD = 200
+
+
+def create_db(path, bookings_count):
+    """DB temporaneo in WAL, migrato, con prenotazioni casuali su tre stagioni"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    apply_migrations(conn)
+    rng = random.Random(7)
+    rows = []
+    for _ in range(bookings_count):
+        ci = date(2024, 1, 1) + timedelta(days=rng.randrange(3 * 365))
+        co = ci + timedelta(days=rng.choice([3, 7, 7, 14]))
+        rows.append((rng.choice(APARTMENTS), ci.isoformat(), co.isoformat()))
+    conn.executemany("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES (?, ?, ?)", rows)
+    return conn
+
+
+def reader(pool, seed):
+    """Mix di letture del percorso chat: elenco nomi, settimane libere, debug"""
+    rng = random.Random(seed)
+    for _ in range(QUERIES_PER_THREAD):
+        conn = pool.connection()
+        month = rng.randrange(6, 10)
+        conn.execute("SELECT DISTINCT appartamento FROM appartamenti;").fetchall()
+        conn.execute(FREE_WEEKS_QUERY, {
+            'start': date(2025, month, 1).isoformat(),
+            'end': date(2025, month, 28).isoformat(),
+            'apartments': None
+        }).fetchall()
+        conn.execute("SELECT id, appartamento, check_in, check_out FROM appartamenti "
+                     "ORDER BY appartamento, check_in LIMIT 50;").fetchall()
+        conn.close()
+
+
+def run(label, pool, threads_count):
+    threads = [threading.Thread(target=reader, args=(pool, i)) for i in range(threads_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    throughput = threads_count * QUERIES_PER_THREAD / elapsed
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms totali, {throughput:8.1f} richieste/s")
+    pool.close_all()
+    return throughput
+
+
+def main():
+    bookings_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads_count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        writer = create_db(db_path, bookings_count)
+        print(f"🐚 {bookings_count} prenotazioni, {threads_count} lettori concorrenti")
+
+        # Stessa configurazione di get_db_connection in main.py
+        standard = ConnectionPool(db_path, pragmas=("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL"))
+        # Stessa configurazione di read_pool in main.py
+        read_only = ConnectionPool(db_path, read_only=True)
+        baseline = run("Pool standard", standard, threads_count)
+        optimized = run("Pool read-only", read_only, threads_count)
+        print(f"⚡ Throughput read-only: {optimized / baseline:.2f}x")
+        writer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+🐚 Paguro - Configurazione pytest per i test del backend
+Rende importabili i moduli di backend/api e usa un database temporaneo
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'api'))
+sys.path.insert(0, BACKEND_DIR)
+
+# Mai toccare il database reale durante i test
+_TEST_DIR = tempfile.mkdtemp(prefix='paguro_test_')
+os.environ.setdefault('DB_PATH', os.path.join(_TEST_DIR, 'affitti_test.db'))
+os.environ.setdefault('ANSWER_CACHE_PATH', os.path.join(_TEST_DIR, 'cache', 'risposte_test.db'))
+os.environ.setdefault('INTENT_MODEL_PATH', os.path.join(_TEST_DIR, 'cache', 'intent_model_test.npz'))
+os.environ.setdefault('ANSWER_BOOK_PATH', os.path.join(_TEST_DIR, 'cache', 'answer_book_test.json'))
+
+
+@pytest.fixture
+def booking_db(tmp_path):
+    """Database SQLite temporaneo con la tabella appartamenti"""
+    db_path = str(tmp_path / 'affitti.db')
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute('''
+        CREATE TABLE appartamenti (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            appartamento TEXT NOT NULL,
+            check_in TEXT NOT NULL,
+            check_out TEXT NOT NULL
+        )
+    ''')
+    yield db_path, conn
+    conn.close()
+
+
+class FakeOllamaStream:
+    """Risposta requests in streaming con le righe JSON di Ollama"""
+
+    status_code = 200
+
+    def __init__(self, tokens):
+        self.lines = [json.dumps({"response": token, "done": False}).encode() for token in tokens]
+        self.lines.append(json.dumps({"response": "", "done": True}).encode())
+        self.consumed = 0
+        self.closed = False
+
+    def iter_lines(self):
+        for line in self.lines:
+            self.consumed += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+class FakeOllama:
+    """Sostituisce session.post del client Ollama; di default ogni chiamata fa fallire il test"""
+
+    def __init__(self):
+        self.prompts = []
+        self.streams = []
+        self._handler = None
+        self.forbid()
+
+    def post(self, *args, **kwargs):
+        self.prompts.append(kwargs.get("json", {}).get("prompt"))
+        return self._handler()
+
+    def reply(self, tokens, delay=0):
+        """Ogni chiamata restituisce uno stream con questi token, dopo 'delay' secondi"""
+        def handler():
+            time.sleep(delay)
+            stream = FakeOllamaStream(tokens)
+            self.streams.append(stream)
+            return stream
+        self._handler = handler
+
+    def fail(self, error):
+        def handler():
+            raise error
+        self._handler = handler
+
+    def forbid(self):
+        self._handler = lambda: pytest.fail("Ollama non deve essere chiamato")
+
+
+@pytest.fixture
+def paguro():
+    """Modulo main con cache delle risposte vuote"""
+    import main
+    main.response_cache.clear()
+    main.answer_store.clear()
+    return main
+
+
+@pytest.fixture
+def ollama(paguro, monkeypatch):
+    """Ollama finto collegato al client di main"""
+    fake = FakeOllama()
+    monkeypatch.setattr(paguro.ollama_client.session, 'post', fake.post)
+    return fake
@@ -0,0 +1,79 @@
+"""
+🐚 Paguro - Test answer book delle domande frequenti
+"""
+
+import json
+
+from answer_book import (AnswerBook, build_answer_book, cluster_questions, main as build_main,
+                         parse_unknown_questions, publish_answer_book)
+from cache import normalize_key
+
+LOG_LINES = [
+    "2025-06-01 10:00:00,000 - main - INFO - ❓ Messaggio non riconosciuto: 'C'è il parcheggio?'",
+    "2025-06-01 10:01:00,000 - main - INFO - 📋 [s1] Messaggio: 'ciao' -> Tipo: greeting",
+    "2025-06-01 10:02:00,000 - main - INFO - ❓ Messaggio non riconosciuto: 'c'e il parcheggio'",
+    "2025-06-01 10:03:00,000 - main - INFO - ❓ Messaggio non riconosciuto: 'C'è il parcheggio?'",
+    "2025-06-01 10:04:00,000 - main - INFO - ❓ Messaggio non riconosciuto: 'si accettano animali?'",
+    "2025-06-01 10:05:00,000 - main - INFO - ❓ Messaggio non riconosciuto: 'Si accettano animali'",
+    "2025-06-01 10:06:00,000 - main - INFO - ❓ Messaggio non riconosciuto: 'orario navetta'",
+]
+
+
+def test_questions_clustered_by_normalized_text():
+    questions = list(parse_unknown_questions(LOG_LINES))
+    assert len(questions) == 6
+
+    clusters = cluster_questions(questions, normalize_key)
+    assert clusters == [
+        ("c e il parcheggio", "C'è il parcheggio?", 3),
+        ("si accettano animali", "si accettano animali?", 2),
+    ]  # 'orario navetta' compare una volta sola
+
+
+def test_published_book_is_reloaded_when_file_changes(tmp_path):
+    path = str(tmp_path / 'book.json')
+    now = [0.0]
+    book = AnswerBook(path, reload_interval=60, clock=lambda: now[0])
+    assert book.lookup("c e il parcheggio") is None  # non ancora pubblicato
+
+    entries = build_answer_book(
+        [("c e il parcheggio", "C'è il parcheggio?", 3), ("orario navetta", "orario navetta", 2)],
+        lambda question: None if 'navetta' in question else ("🚗 Parcheggio privato gratuito.", "parking")
+    )
+    publish_answer_book(entries, path)
+    assert book.lookup("c e il parcheggio") is None  # controllo del file non ancora scaduto
+
+    now[0] += 61
+    assert book.lookup("c e il parcheggio")["answer"] == "🚗 Parcheggio privato gratuito."
+    assert book.lookup("orario navetta") is None  # generazione fallita: esclusa
+    assert book.stats()["size"] == 1
+
+
+def test_batch_job_publishes_post_processed_answers(tmp_path, monkeypatch):
+    import main
+    log_path = tmp_path / 'paguro.log'
+    log_path.write_text('\n'.join(LOG_LINES), encoding='utf-8')
+    output = tmp_path / 'book.json'
+    prompts = []
+    monkeypatch.setattr(main, 'generate_ollama_response', lambda prompt: prompts.append(prompt) or "A Villa Celi a Palinuro c'è il parcheggio privato.")
+
+    build_main([str(log_path), '--top', '1', '--output', str(output)])
+
+    entries = json.loads(output.read_text(encoding='utf-8'))["entries"]
+    assert list(entries) == ["c e il parcheggio"]
+    assert len(prompts) == 1 and "C'è il parcheggio?" in prompts[0]
+    assert "parcheggio privato" in entries["c e il parcheggio"]["answer"]
+    assert entries["c e il parcheggio"]["count"] == 3
+
+
+def test_chat_answers_from_book_without_calling_ollama(tmp_path, paguro, ollama, monkeypatch):
+    path = str(tmp_path / 'book.json')
+    # Domanda che né le regole né il modello di intenti instradano
+    publish_answer_book({"si accettano animali": {"question": "Si accettano animali?", "answer": "🐕 Animali benvenuti.",
+                                                  "type": "generic", "count": 3}}, path)
+    monkeypatch.setattr(paguro, 'answer_book', AnswerBook(path))
+
+    response = paguro.app.test_client().post('/api/chat', json={"message": "si accettano animali?", "session_id": "s-faq"})
+    body = response.get_json()
+    assert body["type"] == "faq_response"
+    assert body["message"] == "🐕 Animali benvenuti."
@@ -0,0 +1,66 @@
+"""
+🐚 Paguro - Test cache persistente delle risposte Ollama
+"""
+
+import os
+
+from answer_store import PersistentAnswerCache
+
+
+def test_answers_survive_reopen_and_expire(tmp_path):
+    path = str(tmp_path / 'cache' / 'risposte.db')
+    now = [1000.0]
+    store = PersistentAnswerCache(path, ttl=60, clock=lambda: now[0])
+    assert not os.path.exists(path)  # apertura lazy
+    store.put('llama|com e il mare', 'Limpido, a Palinuro!')
+    store.close()
+
+    reopened = PersistentAnswerCache(path, ttl=60, clock=lambda: now[0])
+    assert reopened.get('llama|com e il mare') == 'Limpido, a Palinuro!'
+    now[0] += 61
+    assert reopened.get('llama|com e il mare') is None
+    assert reopened.compact() == 1
+    assert reopened.stats()["size"] == 0
+
+
+def test_compaction_keeps_most_recently_used(tmp_path):
+    now = [0.0]
+    store = PersistentAnswerCache(str(tmp_path / 'risposte.db'), maxsize=3, ttl=None,
+                                  compact_every=100, clock=lambda: now[0])
+    for i in range(5):
+        now[0] += 1
+        store.put(f'k{i}', f'risposta {i}')
+    now[0] += 1
+    store.get('k0')  # k0 torna la più recente
+
+    assert store.compact() == 2
+    assert [store.get(f'k{i}') is not None for i in range(5)] == [True, False, False, True, True]
+
+
+def test_main_reads_through_persistent_cache(paguro, ollama):
+    ollama.reply(["Villa Celi è a 300m dal mare."])
+
+    assert paguro.generate_ollama_response("quanto dista la spiaggia?") == "Villa Celi è a 300m dal mare."
+    paguro.response_cache.clear()  # come dopo un riavvio
+    assert paguro.generate_ollama_response("Quanto dista la spiaggia") == "Villa Celi è a 300m dal mare."
+    assert len(ollama.prompts) == 1
+    assert paguro.answer_store.stats()["hits"] >= 1
+
+
+def test_compaction_never_runs_full_vacuum(tmp_path):
+    path = str(tmp_path / 'risposte.db')
+    store = PersistentAnswerCache(path, maxsize=10, ttl=None, compact_every=50)
+    statements = []
+    store._connection().set_trace_callback(statements.append)
+    for i in range(200):
+        store.put(f'k{i}', 'x' * 2000)
+    assert store.stats()["removed"] > 0
+    assert not any(statement.strip().upper().startswith('VACUUM') for statement in statements)
+    assert any('incremental_vacuum' in statement for statement in statements)
+    assert store._connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # INCREMENTAL
+
+    size_before = os.path.getsize(path) + os.path.getsize(path + '-wal')
+    assert store.vacuum() == 0
+    assert os.path.getsize(path) < size_before
+    assert os.path.getsize(path + '-wal') == 0
+    assert store.stats()["size"] == 10
@@ -0,0 +1,82 @@
+"""
+🐚 Paguro - Test registro nomi appartamenti
+"""
+
+import sqlite3
+
+from apartment_registry import ApartmentRegistry, BKTree, edit_distance
+from migrations import DATA_VERSION_SCHEMA, booking_data_version
+
+
+def test_find_uses_single_compiled_pattern_and_reloads_on_change():
+    names = ['Corallo', 'Tartaruga', 'Corallo Blu', 'Stella.Marina']
+    version = ['v1']
+    loads = []
+
+    def load_names():
+        loads.append(1)
+        return list(names)
+
+    registry = ApartmentRegistry(load_names, lambda: version[0])
+    assert registry.find("disponibilità corallo luglio") == 'corallo'
+    assert registry.find("disponibilità corallo blu agosto") == 'corallo blu'
+    assert registry.find("stella.marina libero?") == 'stella.marina'
+    assert registry.find("coralli liberi") is None
+    assert len(loads) == 1
+
+    names.append('Riccio')
+    assert registry.find("riccio agosto") is None
+    version[0] = 'v2'
+    assert registry.find("riccio agosto") == 'riccio'
+    assert len(loads) == 2
+
+
+def test_empty_registry_finds_nothing():
+    registry = ApartmentRegistry(lambda: [], lambda: 'v1')
+    assert registry.names() == []
+    assert registry.find("disponibilità corallo") is None
+
+
+def test_find_fuzzy_resolves_misspelled_names():
+    registry = ApartmentRegistry(lambda: ['Corallo', 'Tartaruga', 'Corallo Blu', 'Stella.Marina', 'Sole'], lambda: 'v1')
+    assert registry.find_fuzzy("disponibilità coralo luglio") == 'corallo'
+    assert registry.find_fuzzy("tartarugha agosto") == 'tartaruga'
+    assert registry.find_fuzzy("coralo blu libero?") == 'corallo blu'
+    assert registry.find_fuzzy("stela marina") == 'stella.marina'
+    assert registry.find_fuzzy("corallo blu") == 'corallo blu'  # l'esatto vince
+    assert registry.find_fuzzy("la casa al mare") is None
+    assert registry.find_fuzzy("sale") is None  # parole corte non corrette
+
+
+def test_find_fuzzy_respects_threshold():
+    names = lambda: ['Tartaruga']
+    assert ApartmentRegistry(names, lambda: 'v1', fuzzy_threshold=0.85).find_fuzzy("tartarugha") == 'tartaruga'
+    assert ApartmentRegistry(names, lambda: 'v1', fuzzy_threshold=0.95).find_fuzzy("tartarugha") is None
+    assert ApartmentRegistry(names, lambda: 'v1', fuzzy_threshold=1.0).find_fuzzy("tartaruga") == 'tartaruga'
+
+
+def test_bk_tree_matches_brute_force():
+    words = ['corallo', 'tartaruga', 'corallo blu', 'stella.marina', 'sole', 'riccio', 'medusa', 'delfino', 'conchiglia']
+    tree = BKTree(words)
+    assert tree.size == len(words)
+    for query in ('coralo', 'ricio', 'delfini', 'sol', 'xyz'):
+        for radius in range(4):
+            expected = sorted((edit_distance(query, word), word) for word in words if edit_distance(query, word) <= radius)
+            assert sorted(tree.search(query, radius)) == expected
+
+
+def test_rename_is_seen_through_trigger_data_version(tmp_path):
+    db_path = str(tmp_path / 'chat.db')
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("CREATE TABLE appartamenti (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL UNIQUE)")
+    for statement in DATA_VERSION_SCHEMA:
+        conn.execute(statement)
+    conn.execute("INSERT INTO appartamenti (nome) VALUES ('Corallo')")
+
+    registry = ApartmentRegistry(lambda: [row[0] for row in conn.execute("SELECT nome FROM appartamenti")],
+                                 lambda: booking_data_version(conn, db_path))
+    assert registry.find("corallo libero?") == 'corallo'
+    # Stesso file, stesso secondo: cambia solo il contatore dei trigger
+    conn.execute("UPDATE appartamenti SET nome = 'Riccio'")
+    assert registry.find("riccio libero?") == 'riccio'
+    conn.close()
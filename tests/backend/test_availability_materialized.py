@@ -0,0 +1,105 @@
+"""
+🐚 Paguro - Test settimane libere materializzate e trigger di manutenzione
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+from availability_materialized import (MaterializedAvailabilityEngine, calendar_horizon, check_consistency,
+                                       extend_calendar, maintain_free_weeks, rebuild_free_weeks)
+from availability_sql import SqlAvailabilityEngine
+from migrations import apply_migrations
+
+APARTMENTS = ['Corallo', 'Tartaruga', 'Stella', 'Corallo Blu']
+
+
+def _random_booking(rng):
+    ci = date(2025, 1, 1) + timedelta(days=rng.randrange(400))
+    co = ci + timedelta(days=rng.randrange(-2, 15))
+    return rng.choice(APARTMENTS), ci.isoformat(), co.isoformat()
+
+
+def test_triggers_keep_free_weeks_consistent(booking_db):
+    _, conn = booking_db
+    apply_migrations(conn)
+    rng = random.Random(9)
+    for _ in range(400):
+        action = rng.random()
+        ids = [row[0] for row in conn.execute("SELECT id FROM appartamenti;")]
+        if action < 0.6 or not ids:
+            conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES (?, ?, ?)",
+                         _random_booking(rng))
+        elif action < 0.85:
+            # Modifica anche il nome: la prenotazione può cambiare appartamento
+            conn.execute("UPDATE appartamenti SET appartamento = ?, check_in = ?, check_out = ? WHERE id = ?",
+                         _random_booking(rng) + (rng.choice(ids),))
+        else:
+            conn.execute("DELETE FROM appartamenti WHERE id = ?", (rng.choice(ids),))
+    assert check_consistency(conn) == ([], [])
+
+    conn.execute("DELETE FROM appartamenti;")
+    assert conn.execute("SELECT COUNT(*) FROM settimane_libere;").fetchone()[0] == 0
+
+
+def test_rebuild_repairs_drift(booking_db):
+    _, conn = booking_db
+    apply_migrations(conn)
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2025-07-05', '2025-07-12')")
+    conn.execute("DELETE FROM settimane_libere WHERE week_start = '2025-08-02';")
+    missing, _ = check_consistency(conn)
+    assert missing == [('Corallo', '2025-08-02', '2025-08-09')]
+
+    rebuild_free_weeks(conn)
+    assert check_consistency(conn) == ([], [])
+
+
+def test_materialized_engine_matches_sql_engine(booking_db):
+    db_path, conn = booking_db
+    apply_migrations(conn)
+    rng = random.Random(3)
+    conn.executemany("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES (?, ?, ?)",
+                     [_random_booking(rng) for _ in range(300)])
+
+    engine, sql_engine = MaterializedAvailabilityEngine(), SqlAvailabilityEngine()
+    engine.ensure_fresh(None, lambda: sqlite3.connect(db_path))
+    sql_engine.ensure_fresh(None, lambda: sqlite3.connect(db_path))
+
+    assert engine.apartments() == sql_engine.apartments()
+    for day in range(1, 8):
+        start, end = date(2025, 6, day), date(2025, 9, 30)
+        assert engine.free_weeks(start, end) == sql_engine.free_weeks(start, end)
+    assert engine.free_weeks(date(2025, 7, 1), date(2025, 7, 31), ['Corallo Blu']) == \
+        sql_engine.free_weeks(date(2025, 7, 1), date(2025, 7, 31), ['Corallo Blu'])
+    # Fuori orizzonte: ricalcolo SQL
+    assert engine.free_weeks(date(2045, 7, 1), date(2045, 7, 31)) == \
+        sql_engine.free_weeks(date(2045, 7, 1), date(2045, 7, 31))
+
+
+def test_calendar_horizon_follows_today(booking_db):
+    db_path, conn = booking_db
+    apply_migrations(conn)
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2041-07-06', '2041-07-13')")
+    assert extend_calendar(conn, today=date(2025, 5, 15)) == 0  # già coperto dalla migrazione
+
+    assert extend_calendar(conn, today=date(2039, 6, 1)) > 0
+    _, last = calendar_horizon(conn)
+    assert last >= date(2042, 6, 1) and last.weekday() == 5
+    assert check_consistency(conn) == ([], [])
+
+    engine, sql_engine = MaterializedAvailabilityEngine(), SqlAvailabilityEngine()
+    engine.ensure_fresh(None, lambda: sqlite3.connect(db_path))
+    sql_engine.ensure_fresh(None, lambda: sqlite3.connect(db_path))
+    assert engine.free_weeks(date(2041, 7, 1), date(2041, 7, 31)) == \
+        sql_engine.free_weeks(date(2041, 7, 1), date(2041, 7, 31))
+    assert ('Corallo', date(2041, 7, 6), date(2041, 7, 13)) not in engine.free_weeks(date(2041, 7, 1), date(2041, 7, 31))
+
+
+def test_startup_maintenance_rebuilds_drift(booking_db):
+    _, conn = booking_db
+    apply_migrations(conn)
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2025-07-05', '2025-07-12')")
+    conn.execute("DELETE FROM settimane_libere WHERE week_start = '2025-08-02';")
+    missing, _ = maintain_free_weeks(conn, today=date(2025, 5, 15))
+    assert missing == [('Corallo', '2025-08-02', '2025-08-09')]
+    assert check_consistency(conn) == ([], [])
@@ -0,0 +1,53 @@
+"""
+🐚 Paguro - Test motore disponibilità SQL set-based
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+from availability_materialized import week_starts
+from availability_sql import SqlAvailabilityEngine
+
+
+def brute_force_free(bookings, apt_name, week_start, week_end):
+    """Riferimento: confronto diretto della settimana con ogni prenotazione"""
+    for apt, ci, co in bookings:
+        if apt == apt_name and ci < co and week_start < co and week_end > ci:
+            return False
+    return True
+
+
+def test_week_starts_begins_on_previous_saturday():
+    saturdays = week_starts(date(2025, 7, 1), date(2025, 7, 31))
+    assert saturdays[0] == date(2025, 6, 28)
+    assert saturdays[-1] == date(2025, 7, 26)
+    assert all(s.weekday() == 5 for s in saturdays)
+
+
+def test_sql_engine_matches_brute_force(booking_db):
+    db_path, conn = booking_db
+    rng = random.Random(11)
+    bookings = []
+    for _ in range(300):
+        apt = rng.choice(['Corallo', 'Tartaruga', 'Stella'])
+        ci = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        co = ci + timedelta(days=rng.randrange(0, 15))
+        bookings.append((apt, ci, co))
+        conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES (?, ?, ?)",
+                     (apt, ci.isoformat(), co.isoformat()))
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Conchiglia', 'x', 'y')")
+
+    engine = SqlAvailabilityEngine()
+    engine.ensure_fresh(None, lambda: sqlite3.connect(db_path))
+    assert engine.apartments() == ['Conchiglia', 'Corallo', 'Stella', 'Tartaruga']
+
+    for day in range(1, 8):
+        # Inizio del periodo su ogni giorno della settimana
+        start, end = date(2025, 6, day), date(2025, 9, 30)
+        free = set(engine.free_weeks(start, end))
+        for apt in engine.apartments():
+            for ws in week_starts(start, end):
+                we = ws + timedelta(days=7)
+                assert ((apt, ws, we) in free) == brute_force_free(bookings, apt, ws, we)
+    assert all(apt == 'Stella' for apt, _, _ in engine.free_weeks(date(2025, 7, 1), date(2025, 7, 31), ['Stella']))
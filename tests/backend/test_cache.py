@@ -0,0 +1,58 @@
+"""
+🐚 Paguro - Test cache LRU e cache disponibilità
+"""
+
+from cache import LRUCache, normalize_key
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.stats() == {"size": 2, "maxsize": 2, "ttl": None, "hits": 1, "misses": 1,
+                             "evictions": 1, "expirations": 0, "hit_rate": 0.5}
+
+
+def test_entries_expire_after_ttl():
+    now = [1000.0]
+    cache = LRUCache(maxsize=10, ttl=60, clock=lambda: now[0])
+    cache.put('a', 1)
+    cache.put('b', 2)
+    now[0] += 30
+    cache.put('c', 3)
+    assert cache.get('a') == 1
+    now[0] += 31
+    assert cache.get('a') is None and 'b' not in cache
+    assert cache.get('c') == 3
+    assert cache.purge_expired() == 1  # 'b': 'a' è già stata rimossa dal get
+    assert cache.stats()["expirations"] == 2
+
+
+def test_normalized_keys_ignore_case_accents_punctuation():
+    assert normalize_key("  Com'è il MARE a Palinuro?!  ") == normalize_key("com e   il mare a palinuro")
+    assert normalize_key("Perché") == "perche"
+    assert normalize_key("Disponibilità luglio") != normalize_key("Disponibilità agosto")
+
+
+def test_availability_response_cached_until_bookings_change():
+    import main
+
+    conn = main.get_db_connection()
+    conn.execute("DELETE FROM appartamenti")
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2031-07-05', '2031-07-19')")
+    main.availability_cache.clear()
+
+    first = main.get_availability_response(7, 2031)
+    hits = main.availability_cache.hits
+    second = main.get_availability_response(7, 2031)
+    assert main.availability_cache.hits == hits + 1
+    assert second == first and second is not first
+
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2031-07-19', '2031-07-26')")
+    third = main.get_availability_response(7, 2031)
+    assert third["availability_count"] == first["availability_count"] - 1
+    conn.close()
@@ -0,0 +1,101 @@
+"""
+🐚 Paguro - Test endpoint chat in streaming (SSE)
+"""
+
+import json
+
+import pytest
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        name, data = block.split('\n', 1)
+        events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+@pytest.fixture
+def client(paguro, ollama):
+    return paguro.app.test_client()
+
+
+def test_stream_forwards_ollama_tokens_then_final_event(client, ollama):
+    ollama.reply(["Il mare ", "di Palinuro ", "è splendido."])
+
+    response = client.post('/api/chat/stream', json={"message": "raccontami una storia", "session_id": "s1"})
+    assert response.mimetype == 'text/event-stream'
+    events = parse_events(response.get_data(as_text=True))
+
+    assert [data["token"] for name, data in events if name == 'token'] == ["Il mare ", "di Palinuro ", "è splendido."]
+    name, final = events[-1]
+    assert name == 'done'
+    assert final["type"] == "ollama_response"
+    assert final["session_id"] == "s1"
+    assert final["message"].startswith("Il mare di Palinuro è splendido.")
+
+
+def test_stream_sends_predefined_answer_as_single_event(client):
+    events = parse_events(client.post('/api/chat/stream', json={"message": "ciao"}).get_data(as_text=True))
+    assert len(events) == 1
+    name, final = events[0]
+    assert name == 'done' and final["type"] == "greeting" and final["session_id"]
+
+
+def test_stream_falls_back_when_ollama_unreachable(client, paguro, ollama, monkeypatch):
+    ollama.fail(paguro.requests.exceptions.ConnectionError("rifiutata"))
+    monkeypatch.setattr(paguro.ollama_client, 'backoff', 0)
+
+    events = parse_events(client.post('/api/chat/stream', json={"message": "raccontami una storia"}).get_data(as_text=True))
+    assert events == [('done', events[0][1])]
+    assert events[0][1]["type"] == "fallback_response"
+
+
+def test_line_budget_counts_only_visible_lines():
+    import main
+    budget = main.StreamingLineBudget(2)
+    assert not budget.feed("Prima riga\n\n  \n")
+    assert not budget.feed("Seconda")
+    assert not budget.feed(" riga\n")
+    assert budget.feed("Terza")
+    assert budget.lines == 3
+
+
+def test_stream_stops_ollama_once_line_cap_exceeded(client, ollama):
+    import main
+    ollama.reply([f"Riga {i} su Palinuro\n" for i in range(20)])
+
+    events = parse_events(client.post('/api/chat/stream', json={"message": "raccontami una storia"}).get_data(as_text=True))
+    upstream, = ollama.streams
+
+    # Letto solo fino all'inizio della riga in eccesso, poi connessione chiusa
+    assert upstream.consumed == main.Config.MAX_RESPONSE_LENGTH + 1
+    assert upstream.closed
+    assert len([name for name, _ in events if name == 'token']) == main.Config.MAX_RESPONSE_LENGTH + 1
+
+    final = events[-1][1]
+    lines = final["message"].split('\n')
+    assert len(lines) == main.Config.MAX_RESPONSE_LENGTH
+    assert lines[-1] == main.get_cta_for_response_type("generic")
+
+
+def test_blocking_chat_uses_capped_stream(client, ollama):
+    import main
+    ollama.reply([f"Riga {i} a Villa Celi\n" for i in range(20)])
+
+    data = client.post('/api/chat', json={"message": "raccontami una storia"}).get_json()
+    upstream, = ollama.streams
+    assert data["type"] == "ollama_response"
+    assert upstream.consumed == main.Config.MAX_RESPONSE_LENGTH + 1
+    assert len(data["message"].split('\n')) == main.Config.MAX_RESPONSE_LENGTH
+
+
+def test_focus_after_the_line_cap_does_not_change_the_answer(client, ollama):
+    import main
+    # Palinuro compare solo dopo il limite di righe: Ollama viene interrotto prima
+    tokens = [f"Riga {i} sul mare\n" for i in range(5)] + [f"Riga {i} su Palinuro\n" for i in range(5, 10)]
+    ollama.reply(tokens)
+
+    final = parse_events(client.post('/api/chat/stream', json={"message": "raccontami una storia"}).get_data(as_text=True))[-1][1]
+    assert final["message"] == main.post_process_response(''.join(tokens), "generic")
+    assert final["message"].split('\n')[0] == "🏖️ Villa Celi a Palinuro ti aspetta!"  # adattata come il testo completo
@@ -0,0 +1,64 @@
+"""
+🐚 Paguro - Test circuit breaker e timeout adattivo per Ollama
+"""
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def make_breaker(now, **kwargs):
+    return CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, slow_call_ms=5000,
+                          open_seconds=30, clock=lambda: now[0], **kwargs)
+
+
+def test_opens_on_error_rate_then_half_open_probe_closes():
+    now = [0.0]
+    breaker = make_breaker(now)
+    for _ in range(2):
+        breaker.record_success(800)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state()["state"] == OPEN
+    assert not breaker.allow()
+
+    now[0] += 31
+    assert breaker.state()["state"] == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # una sola prova alla volta
+    breaker.record_success(900)
+    assert breaker.state()["state"] == CLOSED
+    assert breaker.state()["rejected"] == 2
+
+
+def test_slow_calls_count_as_failures_and_failed_probe_reopens():
+    now = [0.0]
+    breaker = make_breaker(now)
+    for latency in (6000, 7000, 900, 800):
+        breaker.record_success(latency)
+    assert breaker.state()["state"] == OPEN
+
+    now[0] += 31
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state()["state"] == OPEN
+    assert breaker.state()["opened"] == 2
+
+
+def test_timeout_follows_p95_within_bounds():
+    breaker = CircuitBreaker(min_calls=4, min_timeout=3.0, max_timeout=10.0, timeout_factor=2.0)
+    assert breaker.timeout() == 10.0  # pochi dati: timeout massimo
+    for latency in (1500, 2000, 2200, 2400):
+        breaker.record_success(latency)
+    assert breaker.timeout() == 4.8
+    for _ in range(4):
+        breaker.record_success(100)
+    assert breaker.timeout() == 4.8  # il p95 resta quello delle chiamate più lente
+    assert breaker.state()["p95_ms"] == 2400
+
+
+def test_open_circuit_skips_ollama_and_uses_fallback(paguro, ollama, monkeypatch):
+    monkeypatch.setattr(paguro, 'ollama_breaker', CircuitBreaker(min_calls=1, failure_rate=0.5))
+    paguro.ollama_breaker.record_failure()
+
+    response = paguro.handle_query("raccontami una storia di pirati", "s-breaker")
+    assert response["type"] == "fallback_response"
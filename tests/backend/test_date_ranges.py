@@ -0,0 +1,82 @@
+"""
+🐚 Paguro - Test riconoscimento periodi multi-mese
+"""
+
+from datetime import date
+
+from date_ranges import PeriodParser
+
+MONTH_MAP = {
+    'gennaio': 1, 'febbraio': 2, 'marzo': 3, 'aprile': 4, 'maggio': 5, 'giugno': 6,
+    'luglio': 7, 'agosto': 8, 'settembre': 9, 'ottobre': 10, 'novembre': 11, 'dicembre': 12
+}
+TODAY = date(2026, 3, 15)
+
+
+def parse(message):
+    return PeriodParser(MONTH_MAP).parse(message, today=TODAY)
+
+
+def test_multiple_months_are_merged_when_contiguous():
+    assert parse("disponibilità luglio e agosto") == [(date(2026, 7, 1), date(2026, 8, 31))]
+    assert parse("disponibilità giugno o settembre 2027") == [
+        (date(2027, 6, 1), date(2027, 6, 30)), (date(2027, 9, 1), date(2027, 9, 30))]
+
+
+def test_date_range_and_month_range():
+    assert parse("dal 10 luglio al 20 agosto") == [(date(2026, 7, 10), date(2026, 8, 20))]
+    assert parse("dal 3 al 17 agosto 2027") == [(date(2027, 8, 3), date(2027, 8, 17))]
+    assert parse("appartamenti liberi dal 28 dicembre al 6 gennaio") == [(date(2026, 12, 28), date(2027, 1, 6))]
+    assert parse("case libere da giugno a settembre") == [(date(2026, 6, 1), date(2026, 9, 30))]
+
+
+def test_year_written_only_at_the_end_of_a_range_across_the_year():
+    assert parse("dal 28 dicembre al 6 gennaio 2027") == [(date(2026, 12, 28), date(2027, 1, 6))]
+    assert parse("dal 28 dicembre 2026 al 6 gennaio") == [(date(2026, 12, 28), date(2027, 1, 6))]
+    assert parse("dal 10 luglio al 20 agosto 2027") == [(date(2027, 7, 10), date(2027, 8, 20))]
+
+
+def test_each_month_keeps_its_own_year():
+    assert parse("disponibilità luglio 2026 e agosto 2027") == [
+        (date(2026, 7, 1), date(2026, 7, 31)), (date(2027, 8, 1), date(2027, 8, 31))]
+    assert parse("luglio 2025, agosto 2026 e settembre") == [
+        (date(2025, 7, 1), date(2025, 7, 31)), (date(2026, 8, 1), date(2026, 9, 30))]
+
+
+def test_season_and_single_month():
+    assert parse("disponibilità estate 2026") == [(date(2026, 6, 1), date(2026, 9, 30))]
+    assert parse("disponibilità luglio 2026") is None
+    assert parse("disponibilità") is None
+
+
+def test_winter_wraps_across_the_year():
+    assert parse("disponibilità in inverno") == [(date(2026, 12, 1), date(2027, 2, 28))]
+    assert parse("inverno 2027 libero?") == [(date(2027, 12, 1), date(2028, 2, 29))]
+    parser = PeriodParser(MONTH_MAP)
+    assert parser.parse("disponibilità in inverno", today=date(2027, 1, 20)) == [(date(2026, 12, 1), date(2027, 2, 28))]
+
+
+def test_winter_question_is_an_availability_search():
+    import main
+    request_type, params = main.analyze_message("disponibilità in inverno")
+    assert request_type == 'availability_range_request'
+    (start, end), = params['ranges']
+    assert (start.month, start.day, end.month) == (12, 1, 2) and end.year == start.year + 1
+
+
+def test_range_search_in_one_pass_matches_month_queries():
+    import main
+
+    conn = main.get_db_connection()
+    conn.execute("DELETE FROM appartamenti")
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2032-07-24', '2032-08-07')")
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Stella', '2032-08-14', '2032-08-21')")
+    conn.close()
+
+    request_type, param = main.analyze_message("disponibilità luglio e agosto 2032")
+    assert request_type == 'availability_range_request'
+    combined = main.get_period_availability_response(param['ranges'])
+    july, august = main.query_appartamenti(7, 2032), main.query_appartamenti(8, 2032)
+    expected = sorted({(apt, ci, co) for _, apt, ci, co in july + august})
+    assert [(item['appartamento'], item['check_in'], item['check_out'])
+            for item in combined['availability_data']] == expected
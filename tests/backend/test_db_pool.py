@@ -0,0 +1,129 @@
+"""
+🐚 Paguro - Test pool connessioni SQLite
+"""
+
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool
+
+
+def test_connection_is_reused_per_thread(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), pragmas=("PRAGMA journal_mode = WAL",))
+    conn = pool.connection()
+    conn.close()
+    assert pool.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    assert pool.stats()["opened"] == 2
+    pool.close_all()
+
+
+def test_close_rolls_back_open_transaction(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), isolation_level="")
+    conn = pool.connection()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+    assert pool.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.close_all()
+
+
+def test_health_check_reopens_replaced_database(tmp_path):
+    db_path = str(tmp_path / 'pool.db')
+    pool = ConnectionPool(db_path, health_check_interval=0)
+    conn = pool.connection()
+    conn.execute("CREATE TABLE vecchia (x INTEGER)")
+
+    replacement = str(tmp_path / 'nuovo.db')
+    new_db = sqlite3.connect(replacement)
+    new_db.execute("CREATE TABLE nuova (x INTEGER)")
+    new_db.commit()
+    new_db.close()
+    os.replace(replacement, db_path)
+
+    reopened = pool.connection()
+    assert reopened is not conn
+    tables = [row[0] for row in reopened.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert tables == ['nuova']
+    assert pool.stats()["reopened"] == 1
+    pool.close_all()
+
+
+def test_expected_file_id_skips_the_health_check_interval(tmp_path):
+    db_path = str(tmp_path / 'pool.db')
+    pool = ConnectionPool(db_path, health_check_interval=3600)
+    conn = pool.connection()
+    conn.close()
+
+    replacement = str(tmp_path / 'nuovo.db')
+    sqlite3.connect(replacement).close()
+    os.replace(replacement, db_path)
+    assert pool.connection() is conn  # intervallo non scaduto: nessun controllo
+
+    st = os.stat(db_path)
+    reopened = pool.connection(file_id=(st.st_dev, st.st_ino))
+    assert reopened is not conn
+    assert pool.stats()["reopened"] == 1
+    pool.close_all()
+
+
+def test_read_only_pool_sees_commits_and_rejects_writes(tmp_path):
+    db_path = str(tmp_path / 'pool ro.db')
+    writer = sqlite3.connect(db_path, isolation_level=None)
+    writer.execute("PRAGMA journal_mode = WAL")
+    writer.execute("CREATE TABLE t (x INTEGER)")
+
+    pool = ConnectionPool(db_path, read_only=True)
+    conn = pool.connection()
+    assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+    try:
+        conn.execute("INSERT INTO t VALUES (1)")
+        assert False, "scrittura non bloccata"
+    except sqlite3.OperationalError:
+        pass
+
+    writer.execute("INSERT INTO t VALUES (2)")
+    assert conn.execute("SELECT x FROM t").fetchall() == [(2,)]
+    assert pool.stats()["read_only"] is True
+    writer.close()
+    pool.close_all()
+
+
+def test_interleaved_greenlets_get_their_own_connection(tmp_path):
+    gevent = pytest.importorskip('gevent')
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), isolation_level="")
+    setup = pool.connection()
+    setup.execute("CREATE TABLE t (x INTEGER)")
+    setup.commit()
+    setup.close()
+
+    def writer():
+        conn = pool.connection()
+        conn.execute("INSERT INTO t VALUES (1)")
+        gevent.sleep(0.01)  # cede il controllo a transazione aperta
+        conn.commit()
+        conn.close()
+        return conn
+
+    def reader():
+        conn = pool.connection()
+        conn.execute("SELECT COUNT(*) FROM t").fetchone()
+        conn.close()  # il rollback non deve toccare la transazione del writer
+        return conn
+
+    first, second = gevent.spawn(writer), gevent.spawn(reader)
+    gevent.joinall([first, second])
+    assert first.value is not second.value
+    assert pool.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    assert pool.stats()["opened"] == 2  # connessioni libere riutilizzate, non una per richiesta
+    pool.close_all()
@@ -0,0 +1,52 @@
+"""
+🐚 Paguro - Test classificatore di intenti: stesso instradamento della versione sequenziale
+intent_golden.json contiene l'output di analyze_message prima di IntentEngine
+"""
+
+import json
+import os
+from datetime import date, datetime
+
+import pytest
+
+from intent_engine import IntentEngine
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'intent_golden.json')
+
+with open(GOLDEN_PATH, encoding='utf-8') as f:
+    GOLDEN = json.load(f)
+
+
+def serialize(value):
+    if isinstance(value, dict):
+        return {key: serialize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [serialize(item) for item in value]
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+@pytest.fixture(scope='module')
+def engine():
+    import main
+    today = datetime.fromisoformat(GOLDEN["today"])
+    return IntentEngine(
+        main.PREDEFINED_RESPONSES,
+        main.PREDEFINED_PRIORITY,
+        main.MONTH_MAP,
+        main.period_parser,
+        lambda message_lower: next((name for name in GOLDEN["apartments"] if name in message_lower), None),
+        now=lambda: today
+    )
+
+
+@pytest.mark.parametrize('case', GOLDEN["cases"], ids=lambda case: repr(case["message"])[:40])
+def test_matches_sequential_routing(engine, case):
+    intent, param = engine.analyze(case["message"])
+    assert (intent, serialize(param)) == (case["intent"], case["param"])
+
+
+def test_scan_finds_overlapping_keywords(engine):
+    assert {"cosa fare", "cosa", "fare", "libero", "liber", "test"} <= engine.keywords("cosa fare? libero il test")
+    assert engine.keywords("raccontami una storia") == set()
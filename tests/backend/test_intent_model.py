@@ -0,0 +1,81 @@
+"""
+🐚 Paguro - Test modello di intenti locale (TF-IDF n-grammi + regressione logistica)
+"""
+
+import time
+
+import pytest
+
+from intent_model import IntentModel, accuracy_report, cross_validate, examples_hash, load_examples, load_or_train
+
+
+@pytest.fixture(scope='module')
+def examples():
+    import main
+    return load_examples(main.Config.INTENT_MODEL_EXAMPLES)
+
+
+@pytest.fixture(scope='module')
+def model(examples):
+    return IntentModel.train(*examples)
+
+
+def test_save_and_load_give_same_predictions(model, tmp_path):
+    path = str(tmp_path / 'modello.npz')
+    model.save(path)
+    loaded = IntentModel.load(path)
+    for message in ("c'è posto a luglio?", "avete il wifi?", "chi ha vinto la partita?"):
+        assert loaded.predict(message)[0] == model.predict(message)[0]
+        assert loaded.predict(message)[1] == pytest.approx(model.predict(message)[1], rel=1e-5)
+
+
+def test_load_or_train_retrains_when_examples_change(tmp_path):
+    examples_path = tmp_path / 'esempi.csv'
+    model_path = str(tmp_path / 'cache' / 'modello.npz')
+    examples_path.write_text("message,intent\navete il wifi?,servizi\nc'è posto a luglio?,availability\n", encoding='utf-8')
+    model = load_or_train(model_path, str(examples_path))
+    assert model.source_hash == examples_hash(str(examples_path))
+    assert set(model.labels) == {'availability', 'servizi'}
+    assert load_or_train(model_path, str(examples_path)).labels == model.labels  # riletto dal .npz
+
+    examples_path.write_text(examples_path.read_text(encoding='utf-8') + "prenoto la 2,booking\n", encoding='utf-8')
+    retrained = load_or_train(model_path, str(examples_path))
+    assert 'booking' in retrained.labels
+    assert IntentModel.load(model_path).source_hash == examples_hash(str(examples_path))
+
+
+def test_half_written_model_is_retrained(tmp_path):
+    examples_path = tmp_path / 'esempi.csv'
+    model_path = tmp_path / 'modello.npz'
+    examples_path.write_text("message,intent\navete il wifi?,servizi\nc'è posto a luglio?,availability\n", encoding='utf-8')
+    load_or_train(str(model_path), str(examples_path))
+    model_path.write_bytes(model_path.read_bytes()[:100])  # come letto mentre un altro worker scrive
+
+    assert set(load_or_train(str(model_path), str(examples_path)).labels) == {'availability', 'servizi'}
+    assert IntentModel.load(str(model_path)).source_hash == examples_hash(str(examples_path))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['esempi.csv', 'modello.npz']  # nessun .tmp rimasto
+
+
+def test_prediction_is_well_under_a_millisecond(model):
+    model.predict("c'è ancora posto per la seconda settimana di agosto?")
+    started = time.perf_counter()
+    for _ in range(200):
+        model.predict("c'è ancora posto per la seconda settimana di agosto?")
+    assert (time.perf_counter() - started) / 200 < 0.001
+
+
+def test_routed_predictions_are_precise(examples):
+    report = accuracy_report(cross_validate(*examples, folds=3), threshold=0.7)
+    assert report["precision"] >= 0.9
+    assert report["coverage"] >= 0.3
+
+
+def test_model_routes_missed_phrasings_away_from_ollama(paguro, ollama):
+    paguro.prepare_intent_model()  # come all'avvio del server
+
+    request_type, param = paguro.analyze_message("c'è posto a luglio?")
+    assert request_type == 'availability_request' and param["month"] == 7
+
+    assert paguro.analyze_message("opzione 3") == ('booking_request', 3)
+    assert paguro.analyze_message("avete il wifi?") == ('predefined_response', paguro.PREDEFINED_RESPONSES["servizi"])
+    assert paguro.analyze_message("raccontami una storia")[0] == 'unknown'
@@ -0,0 +1,46 @@
+"""
+🐚 Paguro - Test automa di parole chiave (Aho-Corasick)
+"""
+
+import random
+
+from keyword_automaton import KeywordAutomaton
+
+
+def test_finds_every_contained_keyword_like_substring_search():
+    rng = random.Random(3)
+    for _ in range(200):
+        words = {''.join(rng.choice('ab ') for _ in range(rng.randint(1, 4))) for _ in range(8)}
+        automaton = KeywordAutomaton()
+        automaton.add_all(words, 'k')
+        for _ in range(10):
+            text = ''.join(rng.choice('abc ') for _ in range(rng.randint(0, 20)))
+            assert automaton.scan(text).keywords() == {word for word in words if word in text}
+
+
+def test_categories_and_priorities():
+    automaton = KeywordAutomaton()
+    automaton.add('luglio', 'month', priority=6, value=7)
+    automaton.add('giugno', 'month', priority=5, value=6)
+    automaton.add('villa celi', 'cta')
+    automaton.add('villa celi', 'focus')
+
+    matches = automaton.scan("a villa celi tra luglio e giugno")
+    assert matches.best('month').value == 6  # priorità più alta, non il primo nel testo
+    assert 'cta' in matches and 'focus' in matches
+    assert 'price' not in matches and matches.best('price') is None
+    assert matches.keywords('month') == {'luglio', 'giugno'}
+
+
+def test_classification_and_cta_checks_use_shared_automaton():
+    import main
+    assert main.classify_response_type("Che tempo fa? e cosa mangiare") == "weather"
+    assert main.classify_response_type("dove mangiare bene") == "food"
+    assert main.classify_response_type("cosa vedere") == "activity"
+    assert main.classify_response_type("raccontami una storia") == "generic"
+
+    # CTA e focus già presenti: risposta lasciata com'è
+    assert main.post_process_response("Villa Celi è a Palinuro.", "generic") == "Villa Celi è a Palinuro."
+    adapted = main.post_process_response("Il meteo è buono.", "weather").split('\n')
+    assert adapted[-1] == main.get_cta_for_response_type("weather")
+
@@ -0,0 +1,92 @@
+"""
+🐚 Paguro - Test coda limitata e scarto delle generazioni Ollama
+"""
+
+import threading
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker
+from llm_scheduler import LLMOverloaded, LLMScheduler
+
+
+def test_waiter_gets_slot_released_by_running_generation():
+    scheduler = LLMScheduler(slots=1, max_queue=2, latency_budget=2)
+    scheduler.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        scheduler.acquire()
+        admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    assert not admitted.is_set() and scheduler.stats()["waiting"] == 1
+
+    scheduler.release(0.1)
+    thread.join(1)
+    assert admitted.is_set()
+    stats = scheduler.stats()
+    assert stats["active"] == 1 and stats["waiting"] == 0 and stats["queued"] == 1
+
+
+def test_full_queue_is_shed_immediately():
+    scheduler = LLMScheduler(slots=1, max_queue=0, latency_budget=4)
+    scheduler.acquire()
+    with pytest.raises(LLMOverloaded) as exc:
+        scheduler.acquire()
+    assert exc.value.reason == "queue_full"
+    assert exc.value.retry_after == 4  # nessuna durata osservata: si usa il budget
+    assert scheduler.stats()["shed_queue_full"] == 1
+
+
+def test_shed_when_expected_wait_exceeds_budget():
+    scheduler = LLMScheduler(slots=1, max_queue=8, latency_budget=5)
+    scheduler.acquire()
+    scheduler.release(8.0)  # una generazione dura circa 8s
+    scheduler.acquire()
+
+    started = time.monotonic()
+    with pytest.raises(LLMOverloaded) as exc:
+        scheduler.acquire()
+    assert time.monotonic() - started < 0.1  # nessuna attesa inutile
+    assert exc.value.reason == "budget"
+    assert exc.value.retry_after == 8
+
+
+def test_waiter_gives_up_after_latency_budget():
+    scheduler = LLMScheduler(slots=1, max_queue=4, latency_budget=0.2)
+    scheduler.acquire()
+    with pytest.raises(LLMOverloaded) as exc:
+        scheduler.acquire()
+    assert exc.value.reason == "timeout"
+    assert scheduler.stats()["waiting"] == 0
+
+
+@pytest.fixture
+def saturated(paguro, ollama, monkeypatch):
+    """Unico slot occupato e nessun posto in coda: Ollama non deve essere chiamato"""
+    scheduler = LLMScheduler(slots=1, max_queue=0, latency_budget=3)
+    scheduler.acquire()
+    monkeypatch.setattr(paguro, 'llm_scheduler', scheduler)
+    monkeypatch.setattr(paguro, 'ollama_breaker', CircuitBreaker())
+    return paguro
+
+
+def test_shed_request_gets_immediate_fallback(saturated):
+    response = saturated.app.test_client().post('/api/chat', json={"message": "raccontami una storia", "session_id": "s-coda"})
+    assert response.status_code == 200
+    assert response.get_json()["type"] == "fallback_response"
+    # Il probe del breaker non resta bloccato dalla richiesta scartata
+    assert saturated.ollama_breaker.allow()
+
+
+def test_shed_request_can_get_429_with_retry_after(saturated, monkeypatch):
+    monkeypatch.setattr(saturated.Config, 'LLM_SHED_RESPONSE', '429')
+    response = saturated.app.test_client().post('/api/chat', json={"message": "raccontami una storia", "session_id": "s-coda"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    body = response.get_json()
+    assert body["type"] == "overloaded" and body["message"]
@@ -0,0 +1,88 @@
+"""
+🐚 Paguro - Test migrazioni schema e regressione EXPLAIN QUERY PLAN
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+from datetime import date, timedelta
+
+import availability_materialized
+from migrations import (HOT_QUERIES, MIGRATIONS, apply_migrations, explain_query_plan, full_table_scans,
+                        get_data_version, get_schema_version)
+
+
+def test_migrations_upgrade_legacy_db_once(booking_db):
+    _, conn = booking_db
+    assert get_schema_version(conn) == 0
+
+    assert apply_migrations(conn) == [version for version, _, _ in MIGRATIONS]
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    assert apply_migrations(conn) == []
+
+    indexes = [row[1] for row in conn.execute("PRAGMA index_list(appartamenti);")]
+    assert 'idx_appartamenti_periodo' in indexes
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1';").fetchone()[0] == 1
+
+
+def test_hot_queries_never_scan_bookings_table(booking_db):
+    _, conn = booking_db
+    rng = random.Random(5)
+    rows = []
+    for _ in range(3000):
+        ci = date(2024, 1, 1) + timedelta(days=rng.randrange(730))
+        rows.append((f"Appartamento{rng.randrange(30)}", ci.isoformat(), (ci + timedelta(days=7)).isoformat()))
+    conn.executemany("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES (?, ?, ?)", rows)
+
+    apply_migrations(conn)
+    assert full_table_scans(conn) == {}
+    assert full_table_scans(conn, availability_materialized.HOT_QUERIES) == {}
+
+
+def test_full_table_scan_is_detected_without_index():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE appartamenti (id INTEGER PRIMARY KEY, appartamento TEXT, check_in TEXT, check_out TEXT)")
+    plan = explain_query_plan(conn, "SELECT DISTINCT appartamento FROM appartamenti;")
+    assert any(step.startswith('SCAN appartamenti') for step in plan)
+    legacy = {name: HOT_QUERIES[name] for name in ('elenco_appartamenti', 'periodi_occupati')}
+    assert 'elenco_appartamenti' in full_table_scans(conn, legacy)
+    conn.close()
+
+
+def test_data_version_counts_booking_changes(booking_db):
+    _, conn = booking_db
+    apply_migrations(conn)
+    assert get_data_version(conn) == 0
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2025-07-05', '2025-07-12')")
+    conn.execute("UPDATE appartamenti SET check_out = '2025-07-19'")
+    conn.execute("DELETE FROM appartamenti")
+    assert get_data_version(conn) == 3
+
+
+def test_replaced_db_file_is_migrated_again(tmp_path):
+    import main
+    conn = main.get_db_connection()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # nessun WAL del vecchio file da riapplicare
+    conn.close()
+
+    # Restore di un backup senza migrazioni (come 'docker cp' su affitti2025.db)
+    restored = str(tmp_path / 'backup.db')
+    conn = sqlite3.connect(restored)
+    conn.execute("CREATE TABLE appartamenti (id INTEGER PRIMARY KEY AUTOINCREMENT, appartamento TEXT NOT NULL, "
+                 "check_in TEXT NOT NULL, check_out TEXT NOT NULL)")
+    conn.execute("INSERT INTO appartamenti (appartamento, check_in, check_out) VALUES ('Corallo', '2028-07-01', '2028-07-08')")
+    conn.commit()
+    conn.close()
+    shutil.copy(restored, main.Config.DB_PATH + '.restore')
+    os.replace(main.Config.DB_PATH + '.restore', main.Config.DB_PATH)
+
+    weeks = main.query_appartamenti(7, 2028)
+    assert {apt for _, apt, _, _ in weeks} == {'Corallo'}
+    assert ('2028-07-01', '2028-07-08') not in {(ci, co) for _, _, ci, co in weeks}
+    conn = main.get_db_connection()
+    try:
+        assert get_schema_version(conn) == MIGRATIONS[-1][0]
+        assert conn.execute("SELECT COUNT(*) FROM settimane_libere").fetchone()[0] > 0
+    finally:
+        conn.close()
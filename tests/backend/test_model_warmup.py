@@ -0,0 +1,72 @@
+"""
+🐚 Paguro - Test preriscaldamento e keep-alive del modello Ollama
+"""
+
+from datetime import datetime
+
+from model_warmup import ModelWarmer, parse_hours
+
+
+class FakeClient:
+    def __init__(self, fail=0, loaded=()):
+        self.fail = fail
+        self.loaded = list(loaded)
+        self.payloads = []
+
+    def generate(self, payload, timeout=None):
+        self.payloads.append(payload)
+        if len(self.payloads) <= self.fail:
+            raise ConnectionError("Ollama non ancora avviato")
+        return {"done": True}
+
+    def loaded_models(self):
+        return self.loaded
+
+
+def test_warm_up_sends_prompt_free_keep_alive_request():
+    client = FakeClient(fail=1)
+    warmer = ModelWarmer(client, 'llama3.2:1b', keep_alive='45m')
+    assert not warmer.warm_up()
+    assert warmer.status(check=False)["last_error"] == "Ollama non ancora avviato"
+    assert warmer.warm_up()
+    assert client.payloads[-1] == {"model": "llama3.2:1b", "keep_alive": "45m"}
+    assert warmer.status(check=False)["loaded"] is True
+
+
+def test_background_loop_retries_then_pings():
+    client = FakeClient(fail=2)
+    warmer = ModelWarmer(client, 'llama3.2:1b', ping_interval=0.01, retry_interval=0.01,
+                         now=lambda: datetime(2025, 7, 5, 10, 0))
+    thread = warmer.start()
+    while len(client.payloads) < 5:
+        thread.join(0.01)
+    warmer.stop()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert warmer.status(check=False)["pings"] >= 3
+
+
+def test_keep_warm_only_in_business_hours():
+    warmer = ModelWarmer(FakeClient(), 'llama3.2:1b', business_hours=parse_hours('8-23'),
+                         now=lambda: datetime(2025, 7, 5, 3, 0))
+    assert not warmer.in_business_hours()
+
+
+def test_status_reports_model_loaded_from_ollama():
+    warmer = ModelWarmer(FakeClient(loaded=['llama3.2:1b']), 'llama3.2:1b')
+    assert warmer.status(check=True)["loaded"] is True
+    warmer = ModelWarmer(FakeClient(loaded=[]), 'llama3.2:1b')
+    assert warmer.status(check=True)["loaded"] is False
+
+
+def test_status_reads_cache_without_calling_ollama():
+    client = FakeClient(loaded=['llama3.2:1b'])
+    calls = []
+    client.loaded_models = lambda: calls.append(1) or ['llama3.2:1b']
+    warmer = ModelWarmer(client, 'llama3.2:1b', now=lambda: datetime(2025, 7, 5, 3, 0))
+    assert warmer.status()["loaded"] is False
+    assert warmer.refresh() is True
+    status = warmer.status()
+    assert status["loaded"] is True
+    assert status["checked_at"] == '2025-07-05T03:00:00'
+    assert len(calls) == 1
@@ -0,0 +1,67 @@
+"""
+🐚 Paguro - Test client HTTP Ollama (retry, timeout, metriche)
+"""
+
+import pytest
+import requests
+
+from ollama_client import OllamaClient
+
+
+class FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"response": "Benvenuti a Palinuro"}
+
+    def close(self):
+        pass
+
+
+class FlakySession:
+    """Sessione che fallisce le prime `failures` chiamate con l'eccezione data"""
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.calls = []
+
+    def post(self, url, **kwargs):
+        self.calls.append(kwargs)
+        if len(self.calls) <= self.failures:
+            raise self.error
+        return FakeResponse()
+
+
+def test_retries_connection_resets_with_separate_timeouts():
+    session = FlakySession(2, requests.exceptions.ConnectionError("Connection reset by peer"))
+    client = OllamaClient("http://ollama/api/generate", connect_timeout=2, read_timeout=30,
+                          retries=2, backoff=0, session=session)
+
+    assert client.generate({"prompt": "ciao"}) == {"response": "Benvenuti a Palinuro"}
+    assert len(session.calls) == 3
+    assert session.calls[0]["timeout"] == (2, 30)
+    stats = client.stats()
+    assert stats["calls"] == 1 and stats["retries"] == 2 and stats["failures"] == 0
+    assert set(stats["latency_ms"]) == {"last", "p50", "p95", "max"}
+
+
+def test_read_timeout_is_not_retried():
+    session = FlakySession(1, requests.exceptions.ReadTimeout("lento"))
+    client = OllamaClient("http://ollama/api/generate", retries=2, backoff=0, session=session)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.generate({"prompt": "ciao"})
+    assert len(session.calls) == 1
+    assert client.stats() == {"calls": 1, "failures": 1, "retries": 0}
+
+
+def test_stream_closes_response_and_records_latency():
+    client = OllamaClient("http://ollama/api/generate", session=FlakySession(0, None))
+    with client.stream({"prompt": "ciao", "stream": True}) as response:
+        assert response.status_code == 200
+    assert client.stats()["calls"] == 1
+    assert client.stats()["failures"] == 0
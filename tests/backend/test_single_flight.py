@@ -0,0 +1,82 @@
+"""
+🐚 Paguro - Test coalescenza richieste identiche
+"""
+
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(count, target):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_execution():
+    flights, calls = SingleFlight(), []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "risposta"
+
+    results, errors = run_concurrently(8, lambda: flights.do("k", slow))
+    assert results == ["risposta"] * 8 and errors == []
+    assert len(calls) == 1
+    assert flights.stats() == {"executions": 1, "coalesced": 7, "timeouts": 0, "in_flight": 0}
+
+
+def test_error_propagates_to_every_waiter():
+    flights = SingleFlight()
+
+    def failing():
+        time.sleep(0.2)
+        raise ConnectionError("Ollama giù")
+
+    results, errors = run_concurrently(5, lambda: flights.do("k", failing))
+    assert results == []
+    assert len(errors) == 5 and all(isinstance(e, ConnectionError) for e in errors)
+    # Chiave liberata: la chiamata successiva riesegue
+    assert flights.do("k", lambda: "ok") == "ok"
+
+
+def test_waiter_times_out_without_cancelling_leader():
+    flights = SingleFlight()
+    leader = threading.Thread(target=lambda: flights.do("k", lambda: time.sleep(0.3) or "tardi"))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        flights.do("k", lambda: "mai eseguita", timeout=0.05)
+    leader.join()
+    assert flights.stats()["timeouts"] == 1
+
+
+def test_identical_prompts_call_ollama_once(paguro, ollama):
+    ollama.reply(["Villa Celi ti aspetta a Palinuro."], delay=0.2)
+
+    prompts = iter(["Com'è il Tramonto?", "com'è il  tramonto?", " COM'È IL TRAMONTO? "] * 2)
+    lock = threading.Lock()
+
+    def ask():
+        with lock:
+            prompt = next(prompts)
+        return paguro.generate_ollama_response(prompt)
+
+    results, errors = run_concurrently(6, ask)
+    assert errors == [] and results == ["Villa Celi ti aspetta a Palinuro."] * 6
+    assert len(ollama.prompts) == 1